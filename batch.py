@@ -0,0 +1,240 @@
+from interpreter.ast.optimizer import Optimizer
+from interpreter.ast.inliner import Inliner
+from interpreter.cache import ProgramCache
+from interpreter.exceptions import Error
+from interpreter.stats import NO_STATS
+from main import LEXERS, ENGINES, analyse
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+SOURCE_SUFFIX = '.ns'
+
+# run once by every worker so that the first real program does not pay for
+# filling the visitor dispatch caches
+WARMUP_PROGRAM = '''
+fun warm(n: int) do
+    x: int;
+    x = n * 2 + 1 // 3 ** 2 % 5 - 1;
+    if x > 0 and !(x == 1) or x <= 2 do x = -x end
+end
+fun main do
+    y: float;
+    y = 1.5;
+    warm(3)
+end
+'''
+
+_options = None
+
+
+def warm_up(options):
+    for engine in ENGINES.values():
+        engine(analyse(WARMUP_PROGRAM, options)).run()
+
+
+def init_worker(options):
+    global _options
+    _options = options
+    warm_up(options)
+
+
+def load_program(path, text, options, stats=NO_STATS):
+    cache = None
+    if path is not None and not options.no_cache:
+        cache = ProgramCache(path, options.cache_dir, options.lexer)
+    ast = cache.load(text) if cache else None
+    if ast is None:
+        ast = analyse(text, options, stats=stats)
+        if cache:
+            cache.store(text, ast)
+    if options.optimize:
+        with stats.phase('optimize'):
+            Optimizer(ast).run()
+    if options.optimize >= 2:
+        with stats.phase('inline'):
+            Inliner(ast).run()
+    return ast
+
+
+def run_source(path, text, options, stats=NO_STATS):
+    # programs have no output statement, so the result of a run is the final
+    # value of main's variables; anything printed is captured as stdout
+    result = {'path': path, 'worker': os.getpid()}
+    stdout = io.StringIO()
+    start = time.perf_counter()
+    analysed = None
+    try:
+        with contextlib.redirect_stdout(stdout), stats.instrument():
+            ast = load_program(path, text, options, stats)
+            analysed = time.perf_counter()
+            with stats.phase('execute'):
+                ar = ENGINES[options.engine](ast).run()
+        result['ok'] = True
+        result['globals'] = ar.members
+    except Exception as e:
+        result['ok'] = False
+        result['error'] = error_dict(e)
+    end = time.perf_counter()
+    result['stdout'] = stdout.getvalue()
+    if analysed is None:
+        result['timings'] = {'total': end - start}
+    else:
+        result['timings'] = {
+            'analyse': analysed - start,
+            'execute': end - analysed,
+            'total': end - start,
+        }
+    if stats.enabled:
+        result['stats'] = stats.dict()
+    return result
+
+
+def error_dict(e):
+    message = e.message if isinstance(e, Error) else f'{type(e).__name__}: {e}'
+    return {'type': type(e).__name__, 'message': message}
+
+
+def run_program(path):
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except OSError as e:
+        return {'path': path, 'worker': os.getpid(), 'ok': False, 'error': error_dict(e)}
+    return run_source(path, text, _options)
+
+
+def run_chunk(paths):
+    return [run_program(path) for path in paths]
+
+
+def collect_paths(inputs, manifest):
+    paths = []
+    for name in inputs:
+        if os.path.isdir(name):
+            for root, dirs, files in os.walk(name):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, file) for file in sorted(files)
+                    if file.endswith(SOURCE_SUFFIX)
+                )
+        else:
+            paths.append(name)
+    if manifest:
+        # one path per line, relative to the manifest; '#' starts a comment
+        if manifest == '-':
+            lines, base = sys.stdin.read().splitlines(), ''
+        else:
+            with open(manifest, 'r') as f:
+                lines = f.read().splitlines()
+            base = os.path.dirname(manifest)
+        for line in lines:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                paths.append(os.path.join(base, line))
+    return paths
+
+
+def run_batch(paths, options, workers=None, chunksize=None, ordered=True):
+    # yields one result per path as the chunks complete
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # a few chunks per worker balance the load without a round trip per file
+        chunksize = max(1, min(64, len(paths) // (workers * 4)))
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(options,),
+    ) as pool:
+        futures = [pool.submit(run_chunk, chunk) for chunk in chunks]
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run many programs across a pool of worker processes'
+    )
+    parser.add_argument(
+        'inputs',
+        help='Source files, or directories searched for *.ns files',
+        nargs='*',
+    )
+    parser.add_argument(
+        '--manifest',
+        help='File listing one source path per line (- for stdin)',
+    )
+    parser.add_argument(
+        '--workers',
+        help='Worker processes (default: one per CPU)',
+        type=int,
+    )
+    parser.add_argument(
+        '--chunksize',
+        help='Programs sent to a worker at a time (default: a few chunks per worker)',
+        type=int,
+    )
+    parser.add_argument(
+        '--unordered',
+        help='Write results as they complete instead of in input order',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--output',
+        help='Write the JSON lines to PATH instead of stdout',
+        metavar='PATH',
+    )
+    parser.add_argument('--engine', choices=ENGINES, default='ast')
+    parser.add_argument('--lexer', choices=LEXERS, default='char')
+    parser.add_argument('-O', dest='optimize', type=int, choices=[0, 1, 2], default=0)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--cache-dir')
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error('--chunksize must be at least 1')
+
+    paths = collect_paths(args.inputs, args.manifest)
+    if not paths:
+        parser.error('no programs to run')
+    options = argparse.Namespace(
+        engine=args.engine,
+        lexer=args.lexer,
+        token_buffer=False,
+        optimize=args.optimize,
+        no_cache=args.no_cache,
+        cache_dir=args.cache_dir,
+    )
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    start = time.perf_counter()
+    failed = 0
+    try:
+        results = run_batch(
+            paths, options, args.workers, args.chunksize, ordered=not args.unordered,
+        )
+        for result in results:
+            failed += not result['ok']
+            out.write(json.dumps(result, default=repr) + '\n')
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f'{len(paths)} programs, {failed} failed in {elapsed:.2f} s',
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+
+from interpreter.lexer import Lexer
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.ast.closure import ClosureExecutor
+from interpreter.vm.machine import VirtualMachine
+
+ENGINES = {
+    'ast': Executor,
+    'closure': ClosureExecutor,
+    'vm': VirtualMachine,
+}
+
+
+def calls_program(depth):
+    # binary fan-out: walk(n) makes about 2 ** (depth + 1) calls
+    return f'''
+fun walk(n: int) do
+    if n > 0 do
+        walk(n // 2);
+        walk(n // 2)
+    end
+end
+fun main do
+    x: int;
+    x = 2 ** {depth};
+    walk(x)
+end
+'''
+
+
+def arithmetic_program(depth, statements):
+    body = ';\n'.join(
+        f'    a = (n * {i} + 3) % 7 + n // 2 ** 2 * {i}.5 > {i} and n != {i}'
+        for i in range(statements)
+    )
+    return f'''
+fun work(n: int) do
+    a: int;
+{body};
+    if n > 0 do
+        work(n // 2);
+        work(n // 2)
+    end
+end
+fun main do
+    work(2 ** {depth})
+end
+'''
+
+
+PROGRAMS = {
+    'calls': lambda: calls_program(depth=12),
+    'arithmetic': lambda: arithmetic_program(depth=8, statements=20),
+}
+
+
+def analysed(text):
+    ast = Analyser(Lexer(text)).parse()
+    SemanticAnalyser(ast).run()
+    return ast
+
+
+def best_time(engine, ast, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # without result caching, which would skip most of the calls
+        engine(ast, memo_size=0).run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare execution engines')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--engine', action='append', choices=ENGINES)
+    args = parser.parse_args()
+    engines = args.engine or list(ENGINES)
+    sys.setrecursionlimit(10000)
+
+    print(f'{"program":<12}{"engine":<10}{"best (s)":>12}{"speedup":>10}')
+    for program_name, make_program in PROGRAMS.items():
+        ast = analysed(make_program())
+        reference = best_time(Executor, ast, args.repeat)
+        for engine_name in engines:
+            if engine_name == 'ast':
+                elapsed = reference
+            else:
+                elapsed = best_time(ENGINES[engine_name], ast, args.repeat)
+            print(
+                f'{program_name:<12}{engine_name:<10}'
+                f'{elapsed:>12.4f}{reference / elapsed:>9.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import gc
+import sys
+from collections import Counter
+
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast.objects import walk
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.ast import flat
+from benchmarks.workload import WORKLOADS, generate
+from benchmarks.bench_memory import traced
+from benchmarks.bench_serializer import best_of
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memory, traversal and run time of the flat array-backed tree '
+                    'against the object tree'
+    )
+    parser.add_argument('--workload', action='append', choices=WORKLOADS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    # kinds: counting the nodes of each kind, as --stats does
+    # gc: a full collection while the tree is alive
+    print(
+        f'{"workload":<14}{"nodes":>9}{"objects (B)":>13}{"flat (B)":>10}'
+        f'{"kinds (s)":>11}{"flat (s)":>10}{"gc (s)":>10}{"flat (s)":>10}'
+        f'{"build (s)":>11}{"flat (s)":>10}{"run (s)":>10}{"flat (s)":>10}'
+    )
+    for name in args.workload or list(WORKLOADS):
+        text = generate(WORKLOADS[name], args.seed)
+        ast, ast_bytes = traced(lambda: Analyser(RegexLexer(text)).parse())
+        nodes = sum(1 for _ in walk(ast))
+        kinds = best_of(args.repeat, lambda: Counter(type(node).__name__ for node in walk(ast)))
+        collect = best_of(args.repeat, gc.collect)
+        build = best_of(args.repeat, lambda: Analyser(RegexLexer(text)).parse())
+        SemanticAnalyser(ast).run()
+        run = best_of(args.repeat, lambda: Executor(ast).run())
+        del ast
+
+        tree, tree_bytes = traced(lambda: flat.FlatAnalyser(RegexLexer(text)).parse())
+        flat_kinds = best_of(args.repeat, tree.kind_counts)
+        flat_collect = best_of(args.repeat, gc.collect)
+        flat_build = best_of(args.repeat, lambda: flat.FlatAnalyser(RegexLexer(text)).parse())
+        flat.analyse(tree)
+        flat_run = best_of(args.repeat, lambda: flat.FlatExecutor(tree).run())
+        del tree
+        print(
+            f'{name:<14}{nodes:>9}{ast_bytes / nodes:>13.1f}{tree_bytes / nodes:>10.1f}'
+            f'{kinds:>11.4f}{flat_kinds:>10.4f}{collect:>10.4f}{flat_collect:>10.4f}'
+            f'{build:>11.4f}{flat_build:>10.4f}{run:>10.4f}{flat_run:>10.4f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
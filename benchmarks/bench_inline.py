@@ -0,0 +1,78 @@
+import argparse
+import sys
+import time
+
+from interpreter.ast.optimizer import Optimizer
+from interpreter.ast.inliner import Inliner, DEFAULT_INLINE_BUDGET
+from benchmarks.bench_engines import ENGINES
+from benchmarks.bench_memo import analysed
+
+
+def helpers_program(depth):
+    # every activation of walk calls three one-line helpers
+    return f'''
+fun half(n: int) do
+    return n // 2
+end
+fun clamp(v: int, hi: int) do
+    r: int;
+    r = v;
+    if v > hi do r = hi end;
+    return r
+end
+fun mix(a: int, b: int) do
+    return (a * 31 + b) % 1000003
+end
+fun walk(n: int, acc: int) do
+    h: int;
+    t: int;
+    h = half(n);
+    t = mix(acc, clamp(n, 100));
+    if n > 0 do
+        walk(h, t);
+        walk(h, t + 1)
+    end
+end
+fun main do
+    walk(2 ** {depth}, 0)
+end
+'''
+
+
+def best_time(engine, ast, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        # without result caching, which would skip most of the calls
+        executor = engine(ast, memo_size=0)
+        start = time.perf_counter()
+        executor.run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Running with and without inlined helper calls')
+    parser.add_argument('--depth', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=int, default=DEFAULT_INLINE_BUDGET)
+    parser.add_argument('--engine', action='append', choices=ENGINES)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    text = helpers_program(args.depth)
+    print(f'{"engine":<10}{"-O 1 (s)":>12}{"-O 2 (s)":>12}{"speedup":>10}')
+    for engine_name in args.engine or list(ENGINES):
+        folded = analysed(text)
+        Optimizer(folded).run()
+        inlined = analysed(text)
+        Optimizer(inlined).run()
+        inliner = Inliner(inlined, args.budget)
+        inliner.run()
+        before = best_time(ENGINES[engine_name], folded, args.repeat)
+        after = best_time(ENGINES[engine_name], inlined, args.repeat)
+        print(f'{engine_name:<10}{before:>12.4f}{after:>12.4f}{before / after:>9.1f}x')
+    print(f'{inliner.inlined} call sites inlined')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.tokens_type import TokenType as Tk
+
+LEXERS = {
+    'char': Lexer,
+    'regex': RegexLexer,
+}
+
+CHUNK = '''{ generated function %(i)d }
+fun helper-%(i)d(value-%(i)d: float) do
+    total: float;
+    label: string;
+    total = value-%(i)d * %(i)d + 3 // 2 ** 4 %% 7;
+    label = 'a fairly long string literal number %(i)d, to exercise literal scanning';
+    if total >= %(i)d and label != 'x' or !total do
+        helper-%(i)d(total - 1.25)
+    end
+end
+'''
+
+
+def synthetic_source(size):
+    chunks = []
+    length = 0
+    i = 0
+    while length < size:
+        chunk = CHUNK % {'i': i}
+        chunks.append(chunk)
+        length += len(chunk)
+        i += 1
+    return ''.join(chunks)
+
+
+def count_tokens(lexer_class, text):
+    lexer = lexer_class(text)
+    token = lexer.current_token
+    count = 1
+    while token.type != Tk.EOF:
+        token = lexer.next_token()
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lexer throughput in MB/s')
+    parser.add_argument('--size', type=float, default=4, help='source size in MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--lexer', action='append', choices=LEXERS)
+    args = parser.parse_args()
+
+    text = synthetic_source(int(args.size * 1024 * 1024))
+    megabytes = len(text.encode()) / (1024 * 1024)
+    print(f'source: {megabytes:.2f} MB')
+    print(f'{"lexer":<8}{"tokens":>12}{"best (s)":>12}{"MB/s":>10}')
+    for name in args.lexer or list(LEXERS):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            tokens = count_tokens(LEXERS[name], text)
+            best = min(best, time.perf_counter() - start)
+        print(f'{name:<8}{tokens:>12}{best:>12.3f}{megabytes / best:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from benchmarks.bench_engines import ENGINES
+
+
+def fibonacci_program(n):
+    return f'''
+fun fib(n: int) do
+    if n < 2 do return n end;
+    return fib(n - 1) + fib(n - 2)
+end
+fun main do
+    x: int;
+    x = fib({n})
+end
+'''
+
+
+def analysed(text):
+    ast = Analyser(RegexLexer(text)).parse()
+    SemanticAnalyser(ast).run()
+    return ast
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Recursive Fibonacci with and without the result cache of pure functions'
+    )
+    parser.add_argument('-n', type=int, default=22)
+    parser.add_argument('--size', type=int, action='append',
+                        help='cache sizes to compare (default: 0, 2, 8, 128)')
+    parser.add_argument('--engine', action='append', choices=ENGINES)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    ast = analysed(fibonacci_program(args.n))
+    print(f'{"engine":<10}{"size":>6}{"time (s)":>12}{"hits":>10}{"misses":>10}{"speedup":>10}')
+    for engine_name in args.engine or list(ENGINES):
+        reference = None
+        for size in args.size or [0, 2, 8, 128]:
+            executor = ENGINES[engine_name](ast, memo_size=size)
+            start = time.perf_counter()
+            executor.run()
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = elapsed
+            stats = executor.memo.stats().get('fib', {'hits': 0, 'misses': 0})
+            print(
+                f'{engine_name:<10}{size:>6}{elapsed:>12.4f}'
+                f'{stats["hits"]:>10}{stats["misses"]:>10}{reference / elapsed:>9.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
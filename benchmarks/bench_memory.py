@@ -0,0 +1,71 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast.objects import walk
+from interpreter.tokens_type import TokenType as Tk
+
+STATEMENTS_PER_FUNCTION = 100
+
+
+def synthetic_program(lines):
+    # a fun header, STATEMENTS_PER_FUNCTION body lines and an end per function
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.append(f'fun work-{i}(n: float) do')
+        out.append('    total: float;')
+        for j in range(STATEMENTS_PER_FUNCTION - 2):
+            out.append(f'    total = total * {j} + n // 2 - {j}.5;')
+        out.append('    if total > n do work-%d(total) end' % i)
+        out.append('end')
+        i += 1
+    out.append('fun main do work-0(1) end')
+    return '\n'.join(out) + '\n'
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def lex_all(text):
+    lexer = RegexLexer(text)
+    tokens = [lexer.current_token]
+    while tokens[-1].type != Tk.EOF:
+        tokens.append(lexer.next_token())
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes per token and per AST node')
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    text = synthetic_program(args.lines)
+    source_bytes = len(text.encode())
+    print(f'source: {text.count(chr(10))} lines, {source_bytes / 2 ** 20:.1f} MB')
+
+    tokens, tokens_bytes = traced(lambda: lex_all(text))
+    print(f'tokens: {len(tokens)}, {tokens_bytes / len(tokens):.1f} bytes/token')
+    del tokens
+
+    ast, ast_bytes = traced(lambda: Analyser(RegexLexer(text)).parse())
+    nodes = sum(1 for _ in walk(ast))
+    print(
+        f'ast:    {nodes} nodes, {ast_bytes / nodes:.1f} bytes/node, '
+        f'{ast_bytes / source_bytes:.1f}x source size'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import pickle
+import time
+
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast import serializer
+from benchmarks.workload import WORKLOADS, generate
+
+
+def best_of(repeat, load):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Loading a program from the binary AST format against parsing it'
+    )
+    parser.add_argument('--workload', action='append', choices=WORKLOADS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f'{"workload":<14}{"source":>10}{"binary":>10}{"pickle":>10}'
+        f'{"char (s)":>11}{"regex (s)":>11}{"pickle (s)":>11}{"load (s)":>11}{"speedup":>9}'
+    )
+    for name in args.workload or list(WORKLOADS):
+        text = generate(WORKLOADS[name], args.seed)
+        ast = Analyser(RegexLexer(text)).parse()
+        data = serializer.dumps(ast)
+        pickled = pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL)
+
+        char = best_of(args.repeat, lambda: Analyser(Lexer(text)).parse())
+        regex = best_of(args.repeat, lambda: Analyser(RegexLexer(text)).parse())
+        unpickle = best_of(args.repeat, lambda: pickle.loads(pickled))
+        load = best_of(args.repeat, lambda: serializer.loads(data))
+        print(
+            f'{name:<14}{len(text.encode()):>10}{len(data):>10}{len(pickled):>10}'
+            f'{char:>11.4f}{regex:>11.4f}{unpickle:>11.4f}{load:>11.4f}'
+            f'{regex / load:>8.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import sys
+import time
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.ast.objects import walk
+
+
+class LegacyDispatch:
+    # NodeVisitor.visit and Executor operator evaluation as they were before
+    # the cached dispatch tables, kept here as the "before" measurement
+    def visit(self, node):
+        method_name = 'visit_' + type(node).__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        return visitor(node)
+
+    def visit_BinOpNode(self, node):
+        if node.op.type == Tk.PLUS: return self.visit(node.left) + self.visit(node.right)
+        elif node.op.type == Tk.MINUS: return self.visit(node.left) - self.visit(node.right)
+        elif node.op.type == Tk.MUL: return self.visit(node.left) * self.visit(node.right)
+        elif node.op.type == Tk.DIV: return self.visit(node.left) / self.visit(node.right)
+        elif node.op.type == Tk.MOD: return self.visit(node.left) % self.visit(node.right)
+        elif node.op.type == Tk.FLOORDIV: return self.visit(node.left) // self.visit(node.right)
+        elif node.op.type == Tk.EXPONENT: return self.visit(node.left) ** self.visit(node.right)
+        elif node.op.type == Tk.AND: return self.visit(node.left) and self.visit(node.right)
+        elif node.op.type == Tk.OR: return self.visit(node.left) or self.visit(node.right)
+        elif node.op.type == Tk.GT: return self.visit(node.left) > self.visit(node.right)
+        elif node.op.type == Tk.LT: return self.visit(node.left) < self.visit(node.right)
+        elif node.op.type == Tk.EQ_GT: return self.visit(node.left) >= self.visit(node.right)
+        elif node.op.type == Tk.EQ_LT: return self.visit(node.left) <= self.visit(node.right)
+        elif node.op.type == Tk.EQ: return self.visit(node.left) == self.visit(node.right)
+        elif node.op.type == Tk.NOT_EQ: return self.visit(node.left) != self.visit(node.right)
+
+    def visit_UnaryOpNode(self, node):
+        if node.op.type == Tk.PLUS:
+            return +self.visit(node.expr)
+        elif node.op.type == Tk.MINUS:
+            return -self.visit(node.expr)
+        elif node.op.type == Tk.NOT:
+            return not self.visit(node.expr)
+
+
+class LegacyExecutor(LegacyDispatch, Executor):
+    pass
+
+
+def program(statements):
+    # comparisons come last in the old if/elif chain, so they are included
+    body = ';\n'.join(
+        f'    a = (n * {i} + 3) % 7 + n // 2 ** 2 * {i}.5 != {i} and -n < {i} or n == {i}'
+        for i in range(statements)
+    )
+    return f'''
+fun work(n: int) do
+    a: int;
+{body}
+end
+fun main do
+    n: int;
+    n = 3;
+    work(n)
+end
+'''
+
+
+def per_visit(executor_class, ast, visits, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        executor_class(ast).run()
+        best = min(best, time.perf_counter() - start)
+    return best / visits * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-visit cost of visitor dispatch')
+    parser.add_argument('--statements', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sys.setrecursionlimit(10000)
+
+    ast = Analyser(RegexLexer(program(args.statements))).parse()
+    SemanticAnalyser(ast).run()
+    # every node of the program is visited once per run, plus the body of
+    # work() once more through the call
+    visits = sum(1 for _ in walk(ast)) + sum(1 for _ in walk(ast.utils[0].block_node))
+
+    before = per_visit(LegacyExecutor, ast, visits, args.repeat)
+    after = per_visit(Executor, ast, visits, args.repeat)
+    print(f'visits per run: {visits}')
+    print(f'before: {before:7.1f} ns/visit')
+    print(f'after:  {after:7.1f} ns/visit ({before / after:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.mmap_lexer import MmapLexer
+from interpreter.token_buffer import TokenBuffer
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.ast.closure import ClosureExecutor
+from interpreter.vm.machine import VirtualMachine
+from benchmarks.workload import WORKLOADS, generate
+
+LEXERS = {
+    'char': Lexer,
+    'regex': RegexLexer,
+    'mmap': MmapLexer,
+}
+
+ENGINES = {
+    'ast': Executor,
+    'closure': ClosureExecutor,
+    'vm': VirtualMachine,
+}
+
+STAGES = ('lex', 'parse', 'analyse', 'execute')
+DEFAULT_THRESHOLD = 0.10
+
+
+def time_stages(text, lexer_class, engine):
+    # The tokens are buffered so that parse is timed without the lexer; the
+    # later stages need the output of the earlier ones, so run them in order.
+    timings = {}
+    start = time.perf_counter()
+    tokens = TokenBuffer.from_lexer(lexer_class(text))
+    timings['lex'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ast = Analyser(tokens.stream()).parse()
+    timings['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SemanticAnalyser(ast).run()
+    timings['analyse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine(ast).run()
+    timings['execute'] = time.perf_counter() - start
+    return timings
+
+
+def run_workload(text, lexer_class, engine, repeat):
+    best = dict.fromkeys(STAGES, float('inf'))
+    for _ in range(repeat):
+        for stage, elapsed in time_stages(text, lexer_class, engine).items():
+            best[stage] = min(best[stage], elapsed)
+    return best
+
+
+def run(args):
+    names = args.workload or list(WORKLOADS)
+    results = {}
+    print(f'{"workload":<14}' + ''.join(f'{stage:>12}' for stage in STAGES))
+    for name in names:
+        text = generate(WORKLOADS[name], seed=args.seed)
+        timings = run_workload(text, LEXERS[args.lexer], ENGINES[args.engine], args.repeat)
+        results[name] = timings
+        print(f'{name:<14}' + ''.join(f'{timings[stage]:>12.5f}' for stage in STAGES))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': sys.implementation.name,
+            'machine': platform.machine(),
+            'lexer': args.lexer,
+            'engine': args.engine,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'workloads': {name: WORKLOADS[name].params() for name in names},
+        'results': results,
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=4)
+        print(f'saved {args.save}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return compare_reports(baseline, report, args.threshold)
+    return 0
+
+
+def compare_reports(baseline, current, threshold):
+    # a stage regresses when it is more than threshold slower than baseline
+    regressions = 0
+    print(f'{"workload":<14}{"stage":<10}{"baseline":>12}{"current":>12}{"change":>10}')
+    for name, timings in current['results'].items():
+        base_timings = baseline['results'].get(name)
+        if base_timings is None:
+            continue
+        if baseline.get('workloads', {}).get(name) != current.get('workloads', {}).get(name):
+            print(f'{name:<14}skipped: workload parameters differ from baseline')
+            continue
+        for stage in STAGES:
+            if stage not in base_timings or stage not in timings:
+                continue
+            before, after = base_timings[stage], timings[stage]
+            change = after / before - 1 if before else 0.0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(
+                f'{name:<14}{stage:<10}{before:>12.5f}{after:>12.5f}'
+                f'{change:>+10.1%}{flag}'
+            )
+    if regressions:
+        print(f'{regressions} regression(s) beyond {threshold:.0%}')
+        return 1
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, args.threshold)
+
+
+def write_programs(args):
+    os.makedirs(args.directory, exist_ok=True)
+    for name in args.workload or list(WORKLOADS):
+        path = os.path.join(args.directory, f'{name}.ns')
+        with open(path, 'w') as f:
+            f.write(generate(WORKLOADS[name], seed=args.seed))
+        print(path)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time each pipeline stage on generated programs'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='time the workloads')
+    run_parser.add_argument('--workload', action='append', choices=WORKLOADS)
+    run_parser.add_argument('--lexer', choices=LEXERS, default='char')
+    run_parser.add_argument('--engine', choices=ENGINES, default='ast')
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    run_parser.add_argument('--compare', metavar='PATH', help='compare against a JSON baseline')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser('compare', help='compare two saved results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.set_defaults(handler=compare)
+
+    generate_parser = subparsers.add_parser('generate', help='write the workloads as .ns files')
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('--workload', action='append', choices=WORKLOADS)
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.set_defaults(handler=write_programs)
+
+    args = parser.parse_args()
+    sys.setrecursionlimit(10000)
+    sys.exit(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import random
+
+# Every generated function takes a call budget n and only calls further
+# down the chain while n > 0, so each call fans out CALL_DEPTH levels deep.
+CALL_DEPTH = 3
+MODULUS = 1000003
+BINARY_OPERATORS = ('+', '-', '*')
+
+
+class Workload:
+    def __init__(self, functions=10, statements=10, depth=3, fanout=2, literal_size=2):
+        self.functions = functions
+        self.statements = statements
+        self.depth = depth
+        self.fanout = fanout
+        self.literal_size = literal_size
+
+    def params(self):
+        return {
+            'functions': self.functions,
+            'statements': self.statements,
+            'depth': self.depth,
+            'fanout': self.fanout,
+            'literal_size': self.literal_size,
+        }
+
+    def scaled(self, **params):
+        return Workload(**{**self.params(), **params})
+
+
+def literal(rng, size):
+    return str(rng.randrange(10 ** (size - 1), 10 ** size))
+
+
+def expression(rng, depth, operands, literal_size):
+    if depth == 0:
+        if rng.random() < 0.5:
+            return rng.choice(operands)
+        return literal(rng, literal_size)
+    left = expression(rng, depth - 1, operands, literal_size)
+    right = expression(rng, depth - 1, operands, literal_size)
+    return f'({left} {rng.choice(BINARY_OPERATORS)} {right})'
+
+
+def function_source(rng, workload, index):
+    name = f'work-{index}'
+    operands = ('n', 'acc', 'tmp')
+    lines = [
+        f'fun {name}(n: int) do',
+        '    acc: int;',
+        '    tmp: int;',
+        '    acc = n;',
+        '    tmp = 1;',
+    ]
+    for i in range(workload.statements):
+        target = 'acc' if i % 2 else 'tmp'
+        expr = expression(rng, workload.depth, operands, workload.literal_size)
+        lines.append(f'    {target} = {expr} % {MODULUS};')
+    # functions must be declared before use, so only call earlier ones
+    callees = [f'work-{j}' for j in range(index - 1, max(index - 1 - workload.fanout, -1), -1)]
+    if callees:
+        calls = ';\n'.join(f'        {callee}(n - 1)' for callee in callees)
+        lines.append(f'    if n > 0 do\n{calls}\n    end')
+    else:
+        lines.append('    acc = acc + tmp')
+    lines.append('end')
+    return '\n'.join(lines)
+
+
+def generate(workload, seed=0):
+    rng = random.Random(seed)
+    functions = [
+        function_source(rng, workload, index) for index in range(workload.functions)
+    ]
+    calls = ';\n'.join(
+        f'    work-{index}({CALL_DEPTH})'
+        for index in range(workload.functions - 1, -1, -max(workload.fanout, 1))
+    )
+    functions.append(f'fun main do\n{calls}\nend')
+    return '\n'.join(functions) + '\n'
+
+
+BASE = Workload()
+
+# one workload per scaling axis, each growing a single parameter of BASE
+WORKLOADS = {
+    'base': BASE,
+    'functions': BASE.scaled(functions=200),
+    'statements': BASE.scaled(statements=150),
+    'depth': BASE.scaled(depth=7),
+    'fanout': BASE.scaled(fanout=5),
+    'literal_size': BASE.scaled(literal_size=60),
+}
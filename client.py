@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# kept free of interpreter imports: starting this script should cost no more
+# than starting python itself
+
+SOCKET_ENV = 'NS_SERVER_SOCKET'
+
+
+def default_socket_path():
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'ns-server.sock')
+    return f'/tmp/ns-server-{os.getuid()}.sock'
+
+
+def request(socket_path, message):
+    # one JSON line out, one JSON line back per connection
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError('the server closed the connection without replying')
+    return json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a program on a running server.py'
+    )
+    parser.add_argument('inputfile', help='Source file (- to send stdin)')
+    parser.add_argument('--socket', default=default_socket_path())
+    parser.add_argument('--engine', default='ast')
+    parser.add_argument('--lexer', default='char')
+    parser.add_argument('-O', dest='optimize', type=int, choices=[0, 1, 2], default=0)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--cache-dir')
+    parser.add_argument(
+        '--timeout',
+        help='Seconds the program may run before the server stops it',
+        type=float,
+    )
+    parser.add_argument(
+        '--stats',
+        help='Print the server side statistics as JSON to stderr',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--json',
+        help='Print the whole reply as JSON instead of the program output',
+        action='store_true',
+    )
+    args = parser.parse_args()
+
+    message = {
+        'engine': args.engine,
+        'lexer': args.lexer,
+        'optimize': args.optimize,
+        'no_cache': args.no_cache,
+        'stats': args.stats,
+    }
+    if args.inputfile == '-':
+        message['source'] = sys.stdin.read()
+    else:
+        # the server may run in another directory
+        message['path'] = os.path.abspath(args.inputfile)
+    if args.cache_dir:
+        message['cache_dir'] = os.path.abspath(args.cache_dir)
+    if args.timeout:
+        message['timeout'] = args.timeout
+
+    try:
+        reply = request(args.socket, message)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f'No server listening on {args.socket}, start one with server.py', file=sys.stderr)
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(reply, indent=4))
+    else:
+        sys.stdout.write(reply.get('stdout', ''))
+        if args.stats and 'stats' in reply:
+            print(json.dumps(reply['stats'], indent=4), file=sys.stderr)
+        if not reply['ok']:
+            print(reply['error']['message'], file=sys.stderr)
+    sys.exit(0 if reply['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,53 @@
 from interpreter.tokens_type import TokenType as Tk
-from interpreter.ast.objects import (
-    BinOpNode,
-    FactorNode,
-    UnaryOpNode,
-    AssignNode,
-    NoOpNode,
-    VarNode,
-    BlockNode,
-    FunctionDeclarationNode,
-    ParamNode,
-    TypeNode,
-    VarDeclarationNode,
-    ProgramNode,
-    FunctionCallNode,
-    ConditionalOpNode
-)
+from interpreter.lexer import Token
+from interpreter.ast import objects
+from interpreter.ast.objects import fit_recursion_limit
 
 from interpreter.exceptions import ParserError, ErrorCode 
 
 ADITIVE_OPERATOR = (Tk.PLUS, Tk.MINUS)
 RELATIONAL_OPERATOR = (Tk.EQ, Tk.NOT_EQ, Tk.GT, Tk.LT, Tk.EQ_GT, Tk.EQ_LT)
 MULTIPLICATIVE_OPERATOR = (Tk.MUL, Tk.DIV, Tk.MOD, Tk.FLOORDIV)
+UNARY_OPERATOR = (Tk.PLUS, Tk.MINUS, Tk.NOT)
+# type names lexed as identifiers
+ID_TYPES = ('STRING', 'BOOLEAN')
+
+
+def _build_binary_precedence():
+    levels = (
+        (Tk.OR,),
+        (Tk.AND,),
+        RELATIONAL_OPERATOR,
+        ADITIVE_OPERATOR,
+        MULTIPLICATIVE_OPERATOR,
+        (Tk.EXPONENT,),
+    )
+    return {
+        token_type: precedence
+        for precedence, level in enumerate(levels, start=1)
+        for token_type in level
+    }
+
+BINARY_PRECEDENCE = _build_binary_precedence()
+RIGHT_ASSOCIATIVE = (Tk.EXPONENT,)
+# Grouping does not change their result, so a long run of one of them (as
+# in generated code) is built as a balanced tree instead of a left-leaning
+# chain. Shorter runs keep the usual grouping: float sums round the same.
+ASSOCIATIVE = (Tk.AND, Tk.OR, Tk.PLUS, Tk.MUL)
+LONGEST_CHAIN = 32
+# prefix operators bind tighter than any binary operator: -2 ** 2 == (-2) ** 2
+UNARY_PRECEDENCE = max(BINARY_PRECEDENCE.values()) + 1
 
 
 class Analyser:
+    # the node classes the parser builds; anything with the same
+    # constructors will do
+    nodes = objects
+
     def __init__(self, lexer) -> None:
         self.lexer = lexer
-        pass
+        # depth of the most deeply nested expression parsed so far
+        self.nesting = 0
 
     def parse(self):
         node = self.program()
@@ -45,7 +66,7 @@ class Analyser:
 
     def program(self):
         fun_declarations = self.declarations()
-        init_block = BlockNode()
+        init_block = self.nodes.BlockNode()
         utils = []
         for fun in fun_declarations:
             if fun.fun_name.lower() == 'main':
@@ -54,7 +75,7 @@ class Analyser:
                 init_block = fun.block_node
             else:
                 utils.append(fun)
-        return ProgramNode(init_block=init_block, utils=utils)        
+        return self.nodes.ProgramNode(init_block=init_block, utils=utils, nesting=self.nesting)
 
     def declarations(self):
         declarations = [self.function_declaration()]
@@ -63,7 +84,7 @@ class Analyser:
         return declarations
 
     def variable_declaration(self):
-        var_node = VarNode(self.lexer.current_token)
+        var_node = self.nodes.VarNode(self.lexer.current_token)
         self.eat(Tk.ID)
         self.eat(Tk.COLON)
         type_spec = self.type_spec()
@@ -71,7 +92,7 @@ class Analyser:
         if self.lexer.current_token.type == Tk.ASSIGN:
             self.eat(Tk.ASSIGN)
             var_value = self.expr()
-        return VarDeclarationNode(var_node, type_spec, assign_node=var_value)
+        return self.nodes.VarDeclarationNode(var_node, type_spec, assign_node=var_value)
 
     def function_declaration(self):
         self.eat(Tk.FUN)
@@ -84,12 +105,12 @@ class Analyser:
                 params = self.formal_parameter_list()
             self.eat(Tk.RPAREN)
         block_node = self.block()
-        return FunctionDeclarationNode(fun_name, params, block_node)
+        return self.nodes.FunctionDeclarationNode(fun_name, params, block_node)
 
     def formal_parameter_list(self):
         params = [self.formal_parameter()]
         if self.lexer.current_token.type == Tk.COMMA:
-            self.eat(Tk.SEMICOLON)
+            self.eat(Tk.COMMA)
             params.extend(self.formal_parameter_list())
         return params
 
@@ -97,7 +118,7 @@ class Analyser:
         param_token = self.variable()
         self.eat(Tk.COLON)
         type_node = self.type_spec()
-        return ParamNode(param_token, type_node)
+        return self.nodes.ParamNode(param_token, type_node)
 
     def type_spec(self):
         token = self.lexer.current_token
@@ -105,10 +126,15 @@ class Analyser:
             self.eat(Tk.INT)
         if token.type == Tk.FLOAT:
             self.eat(Tk.FLOAT)
-        return TypeNode(token)
+        if token.type == Tk.ID and token.value.upper() in ID_TYPES:
+            # not reserved, so they stay usable as names; the value is the
+            # name of the builtin type symbol
+            self.eat(Tk.ID)
+            token = Token(Tk.ID, token.value.upper(), token.lineno, token.column)
+        return self.nodes.TypeNode(token)
 
     def variable(self):
-        node = VarNode(self.lexer.current_token)
+        node = self.nodes.VarNode(self.lexer.current_token)
         self.eat(Tk.ID)
         return node
 
@@ -116,10 +142,10 @@ class Analyser:
         self.eat(Tk.DO)
         statement_list = self.statement_list()
         self.eat(Tk.END)
-        return BlockNode(statement_list)
+        return self.nodes.BlockNode(statement_list)
 
     
-    def funcall_statement(self):
+    def function_call(self):
         token = self.lexer.current_token
         fun_name = self.lexer.current_token.value
         self.eat(Tk.ID)
@@ -133,7 +159,7 @@ class Analyser:
             node = self.expr()
             actual_params.append(node)
         self.eat(Tk.RPAREN)
-        node = FunctionCallNode(
+        node = self.nodes.FunctionCallNode(
             fun_name=fun_name,
             actual_params=actual_params,
             token=token,
@@ -148,14 +174,20 @@ class Analyser:
         return results
 
     def statement(self):
-        if self.lexer.current_token.type == Tk.ID and self.lexer.current_char == ':':
+        if self.lexer.current_token.type == Tk.ID:
+            lookahead = self.lexer.peek_token().type
+        else:
+            lookahead = None
+        if lookahead == Tk.COLON:
             node = self.variable_declaration()
-        elif self.lexer.current_token.type == Tk.ID and self.lexer.current_char == '(':
-            node = self.funcall_statement()
+        elif lookahead == Tk.LPAREN:
+            node = self.function_call()
         elif self.lexer.current_token.type == Tk.ID:
             node = self.assignment_statement()
         elif self.lexer.current_token.type == Tk.IF:
             node = self.if_statement()
+        elif self.lexer.current_token.type == Tk.RETURN:
+            node = self.return_statement()
         # elif self.lexer.current_token.type == Tk.FUN:
         #     node = self.function_declaration()
         else:
@@ -166,126 +198,150 @@ class Analyser:
         self.eat(Tk.IF)
         condition_expr = self.expr()
         block_node = self.block()
-        return ConditionalOpNode(condition_expr=condition_expr, block_node=block_node)
+        return self.nodes.ConditionalOpNode(condition_expr=condition_expr, block_node=block_node)
+
+    def return_statement(self):
+        token = self.lexer.current_token
+        self.eat(Tk.RETURN)
+        expr = None
+        if self.lexer.current_token.type not in (Tk.SEMICOLON, Tk.END):
+            expr = self.expr()
+        return self.nodes.ReturnNode(token, expr)
 
     def assignment_statement(self):
         left = self.variable()
         token = self.lexer.current_token
         self.eat(Tk.ASSIGN)
         right = self.expr()
-        node = AssignNode(left, token, right)
+        node = self.nodes.AssignNode(left, token, right)
         return node
 
     def factor(self):
         token = self.lexer.current_token
         if token.type == Tk.INTEGER_VALUE:
             self.eat(Tk.INTEGER_VALUE)
-            return FactorNode(token)
+            return self.nodes.FactorNode(token)
         elif token.type == Tk.REAL_VALUE:
             self.eat(Tk.REAL_VALUE)
-            return FactorNode(token)
+            return self.nodes.FactorNode(token)
         elif self.lexer.current_token.type == Tk.BOOLEAN:
             self.eat(Tk.BOOLEAN)
-            return FactorNode(token)
+            return self.nodes.FactorNode(token)
         elif self.lexer.current_token.type == Tk.STRING:
             self.eat(Tk.STRING)
-            return FactorNode(token)
-        elif token.type == Tk.PLUS:
-            self.eat(Tk.PLUS)
-            node = UnaryOpNode(token, self.factor())
-            return node
-        elif token.type == Tk.MINUS:
-            self.eat(Tk.MINUS)
-            node = UnaryOpNode(token, self.factor())
-            return node
-        elif token.type == Tk.NOT:
-            self.eat(Tk.NOT)
-            node = UnaryOpNode(token, self.factor())
-            return node
-        elif self.lexer.current_token.type == Tk.LPAREN:
-            self.eat(Tk.LPAREN)
-            node = self.expr()
-            self.eat(Tk.RPAREN)
-            return node
+            return self.nodes.FactorNode(token)
         elif self.lexer.current_token.type == Tk.ID:
+            if self.lexer.peek_token().type == Tk.LPAREN:
+                return self.function_call()
             return self.variable()
         elif self.lexer.current_token.type == Tk.NON:
             self.eat(Tk.NON)
-            return FactorNode(token)
+            return self.nodes.FactorNode(token)
+        self.error('expression', token.type)
 
-    def term(self):
-        node = self.factor()
-        token = self.lexer.current_token
-        if token.type == Tk.EXPONENT:
-            self.eat(Tk.EXPONENT)
-            node = BinOpNode(left=node, op=token, right=self.term())
-        return node
+    def nested(self, node, depth):
+        if depth > self.nesting:
+            self.nesting = depth
+            fit_recursion_limit(depth)
+        return node, depth
 
-    def simple_term(self):
-        node = self.term()
-        if self.lexer.current_token.type in MULTIPLICATIVE_OPERATOR:
-            token = self.lexer.current_token
-            if self.lexer.current_token.type == Tk.MUL:
-                self.eat(Tk.MUL)
-            if self.lexer.current_token.type == Tk.DIV:
-                self.eat(Tk.DIV)
-            if self.lexer.current_token.type == Tk.MOD:
-                self.eat(Tk.MOD)
-            if self.lexer.current_token.type == Tk.FLOORDIV:
-                self.eat(Tk.FLOORDIV)
-            node = BinOpNode(left=node, op=token, right=self.simple_term())
-        return node
+    def chain(self, operands, tokens):
+        # operands joined left to right by the tokens between them
+        left, depth = operands[0]
+        for token, (right, right_depth) in zip(tokens, operands[1:]):
+            node = self.nodes.BinOpNode(left=left, op=token, right=right)
+            left, depth = self.nested(node, max(depth, right_depth) + 1)
+        return left, depth
 
-    def simple_expr(self):
-        node = self.simple_term()
-        if self.lexer.current_token.type in ADITIVE_OPERATOR:
-            token = self.lexer.current_token
-            if token.type == Tk.PLUS:
-                self.eat(Tk.PLUS)
-            if token.type == Tk.MINUS:
-                self.eat(Tk.MINUS)
-            node = BinOpNode(left=node, op=token, right=self.simple_expr())
-        return node
+    def balanced(self, operands, tokens, start, end):
+        # operands[start:end] joined by the tokens between them, each half
+        # built first
+        if end - start == 1:
+            return operands[start]
+        middle = (start + end) // 2
+        left, left_depth = self.balanced(operands, tokens, start, middle)
+        right, right_depth = self.balanced(operands, tokens, middle, end)
+        node = self.nodes.BinOpNode(left=left, op=tokens[middle - 1], right=right)
+        return self.nested(node, max(left_depth, right_depth) + 1)
 
-    def relational_expr(self):
-        node = self.simple_expr()
-        if self.lexer.current_token.type in RELATIONAL_OPERATOR:
-            token = self.lexer.current_token
-            if self.lexer.current_token.type == Tk.EQ:
-                self.eat(Tk.EQ)
-            if self.lexer.current_token.type == Tk.NOT_EQ:
-                self.eat(Tk.NOT_EQ)
-            if self.lexer.current_token.type == Tk.GT:
-                self.eat(Tk.GT)
-            if self.lexer.current_token.type == Tk.LT:
-                self.eat(Tk.LT)
-            if self.lexer.current_token.type == Tk.EQ_GT:
-                self.eat(Tk.EQ_GT)
-            if self.lexer.current_token.type == Tk.EQ_LT:
-                self.eat(Tk.EQ_LT)
-            node = BinOpNode(left=node, op=token, right=self.relational_expr())
-        return node
+    def reduce(self, operands, operators):
+        # operands are (node, depth) pairs
+        precedence, token = operators.pop()
+        if precedence == UNARY_PRECEDENCE:
+            expr, depth = operands.pop()
+            operands.append(self.nested(self.nodes.UnaryOpNode(token, expr), depth + 1))
+            return
+        tokens = [token]
+        if token.type in ASSOCIATIVE:
+            # the whole run was held back on the stack
+            while operators and operators[-1][1].type == token.type:
+                tokens.append(operators.pop()[1])
+            tokens.reverse()
+        if len(tokens) == 1:
+            right, right_depth = operands.pop()
+            left, left_depth = operands.pop()
+            node = self.nodes.BinOpNode(left=left, op=token, right=right)
+            operands.append(self.nested(node, max(left_depth, right_depth) + 1))
+            return
+        start = len(operands) - len(tokens) - 1
+        run = operands[start:]
+        del operands[start:]
+        if len(run) > LONGEST_CHAIN:
+            operands.append(self.balanced(run, tokens, 0, len(run)))
+        else:
+            operands.append(self.chain(run, tokens))
 
-    def and_expr(self):
-        node = self.relational_expr()
-        if self.lexer.current_token.type == Tk.AND:
+    def expr(self):
+        # Precedence climbing over explicit operand/operator stacks, so neither
+        # operator chains nor nested parentheses recurse. Operator entries are
+        # (precedence, token); an open parenthesis has precedence 0 and acts as
+        # a barrier for reductions.
+        operands = []
+        operators = []
+        open_parens = 0
+        while True:
             token = self.lexer.current_token
-            if token.type == Tk.AND:
-                self.eat(Tk.AND)
-            node = BinOpNode(left=node, op=token, right=self.and_expr())
-        return node
+            while token.type in UNARY_OPERATOR or token.type == Tk.LPAREN:
+                self.eat(token.type)
+                if token.type == Tk.LPAREN:
+                    operators.append((0, token))
+                    open_parens += 1
+                else:
+                    operators.append((UNARY_PRECEDENCE, token))
+                token = self.lexer.current_token
+            operands.append((self.factor(), 1))
 
-    def or_expr(self):
-        node = self.and_expr()
-        if self.lexer.current_token.type == Tk.OR:
             token = self.lexer.current_token
-            if token.type == Tk.OR:
-                self.eat(Tk.OR)
-            node = BinOpNode(left=node, op=token, right=self.or_expr())
-        return node
+            while token.type == Tk.RPAREN and open_parens:
+                while operators[-1][0] != 0:
+                    self.reduce(operands, operators)
+                operators.pop()
+                open_parens -= 1
+                self.eat(Tk.RPAREN)
+                token = self.lexer.current_token
 
-    def expr(self):
-        return self.or_expr()
+            precedence = BINARY_PRECEDENCE.get(token.type)
+            if precedence is None:
+                break
+            # at the same precedence, the operator on the stack waits for
+            # this one if it is right associative or continues a run
+            held = token.type in RIGHT_ASSOCIATIVE
+            run = not held and token.type in ASSOCIATIVE
+            while operators and (
+                operators[-1][0] > precedence or
+                operators[-1][0] == precedence and not (
+                    held or run and operators[-1][1].type == token.type
+                )
+            ):
+                self.reduce(operands, operators)
+            self.eat(token.type)
+            operators.append((precedence, token))
+
+        if open_parens:
+            self.error(Tk.RPAREN, token.type)
+        while operators:
+            self.reduce(operands, operators)
+        return operands[0][0]
 
     def empty(self):
-        return NoOpNode()
+        return self.nodes.NoOpNode()
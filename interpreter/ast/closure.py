@@ -0,0 +1,314 @@
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.stack import CallStack, ActivationRecord, ARType
+from interpreter.events import EventHooks, CALL_ENTER, CALL_LEAVE, ASSIGN, BRANCH_TAKEN
+from interpreter.memo import Memo, DEFAULT_MEMO_SIZE, MISSING
+from interpreter.operators import BINARY_OPERATORS, UNARY_OPERATORS
+
+# Each entry builds the closure for one operator from its compiled operands,
+# so the operator itself is inlined instead of being looked up on every run.
+_BINARY = {
+    Tk.PLUS: lambda l, r: lambda fr: l(fr) + r(fr),
+    Tk.MINUS: lambda l, r: lambda fr: l(fr) - r(fr),
+    Tk.MUL: lambda l, r: lambda fr: l(fr) * r(fr),
+    Tk.DIV: lambda l, r: lambda fr: l(fr) / r(fr),
+    Tk.MOD: lambda l, r: lambda fr: l(fr) % r(fr),
+    Tk.FLOORDIV: lambda l, r: lambda fr: l(fr) // r(fr),
+    Tk.EXPONENT: lambda l, r: lambda fr: l(fr) ** r(fr),
+    Tk.AND: lambda l, r: lambda fr: l(fr) and r(fr),
+    Tk.OR: lambda l, r: lambda fr: l(fr) or r(fr),
+    Tk.GT: lambda l, r: lambda fr: l(fr) > r(fr),
+    Tk.LT: lambda l, r: lambda fr: l(fr) < r(fr),
+    Tk.EQ_GT: lambda l, r: lambda fr: l(fr) >= r(fr),
+    Tk.EQ_LT: lambda l, r: lambda fr: l(fr) <= r(fr),
+    Tk.EQ: lambda l, r: lambda fr: l(fr) == r(fr),
+    Tk.NOT_EQ: lambda l, r: lambda fr: l(fr) != r(fr),
+}
+
+_UNARY = {
+    Tk.PLUS: lambda e: lambda fr: +e(fr),
+    Tk.MINUS: lambda e: lambda fr: -e(fr),
+    Tk.NOT: lambda e: lambda fr: not e(fr),
+}
+
+
+def _noop(fr):
+    pass
+
+
+# What a statement closure returns once a return statement ran; the value
+# is handed to the call in the compiler's return cell. Nothing runs between
+# the two, so one cell serves every call.
+RETURNED = object()
+
+
+class ClosureCompiler(NodeVisitor):
+    # Event hooks are compiled into the closures only for the events that have
+    # subscribers when compiling, so unobserved programs run unchanged.
+    def __init__(self, ast, call_stack, hooks, memo):
+        self.ast = ast
+        self.call_stack = call_stack
+        self.hooks = hooks
+        self.memo = memo
+        self._bodies = {}
+        self._pending = []
+        self._returned = [None]
+        # whether the block being compiled contains a return
+        self._returns = False
+
+    def compile(self):
+        program = self.visit(self.ast)
+        # function bodies are compiled after their first call site, so that
+        # recursive calls can refer to a body that is still being built
+        while self._pending:
+            fun_symbol, body = self._pending.pop()
+            body[0] = self.visit(fun_symbol.block_ast)
+        return program
+
+    def function_body(self, fun_symbol):
+        body = self._bodies.get(fun_symbol)
+        if body is None:
+            body = self._bodies[fun_symbol] = [None]
+            self._pending.append((fun_symbol, body))
+        return body
+
+    def visit_ProgramNode(self, node):
+        return self.visit(node.init_block)
+
+    def visit_BlockNode(self, node):
+        returns = self._returns
+        self._returns = False
+        statements = tuple(
+            closure for closure in map(self.visit, node.statements)
+            if closure is not _noop
+        )
+        returns, self._returns = self._returns, returns or self._returns
+        if not statements:
+            return _noop
+        if len(statements) == 1:
+            return statements[0]
+
+        if returns:
+            def returning_block(fr):
+                for statement in statements:
+                    if statement(fr) is RETURNED:
+                        return RETURNED
+            return returning_block
+
+        def block(fr):
+            for statement in statements:
+                statement(fr)
+        return block
+
+    def visit_ReturnNode(self, node):
+        self._returns = True
+        returned = self._returned
+        if node.expr is None:
+            def return_none(fr):
+                returned[0] = None
+                return RETURNED
+            return return_none
+        value = self.visit(node.expr)
+
+        def return_value(fr):
+            returned[0] = value(fr)
+            return RETURNED
+        return return_value
+
+    def visit_NoOpNode(self, node):
+        return _noop
+
+    def visit_VarDeclarationNode(self, node):
+        # Executor ignores declarations, including their initial value
+        return _noop
+
+    def visit_FunctionDeclarationNode(self, node):
+        return _noop
+
+    # fr is the slot list of the current activation record
+    def visit_AssignNode(self, node):
+        slot = node.slot
+        right = self.visit(node.right)
+        if self.hooks.assign:
+            return self.traced_assign(node, right)
+
+        def assign(fr):
+            fr[slot] = right(fr)
+        return assign
+
+    def traced_assign(self, node, right):
+        slot = node.slot
+        name = node.left.value
+        emit = self.hooks.emit
+        peek = self.call_stack.peek
+
+        def assign(fr):
+            value = fr[slot] = right(fr)
+            emit(ASSIGN, peek(), name, value)
+        return assign
+
+    def visit_VarNode(self, node):
+        slot = node.slot
+        return lambda fr: fr[slot]
+
+    def visit_FactorNode(self, node):
+        value = node.value
+        return lambda fr: value
+
+    def visit_UnaryOpNode(self, node):
+        expr = self.visit(node.expr)
+        op_fn = node.op_fn
+        if op_fn is not UNARY_OPERATORS[node.op.type]:
+            return lambda fr: op_fn(expr(fr))
+        return _UNARY[node.op.type](expr)
+
+    def visit_BinOpNode(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op_fn = node.op_fn
+        if op_fn is not BINARY_OPERATORS.get(node.op.type):
+            # specialized for the operand types, so it is called instead
+            return lambda fr: op_fn(left(fr), right(fr))
+        return _BINARY[node.op.type](left, right)
+
+    def visit_ConditionalOpNode(self, node):
+        condition = self.visit(node.condition_expr)
+        block = self.visit(node.block_node)
+        if self.hooks.branch_taken:
+            emit = self.hooks.emit
+            peek = self.call_stack.peek
+
+            def traced_conditional(fr):
+                if condition(fr):
+                    emit(BRANCH_TAKEN, peek(), node)
+                    return block(fr)
+            return traced_conditional
+
+        def conditional(fr):
+            if condition(fr):
+                return block(fr)
+        return conditional
+
+    def visit_FunctionCallNode(self, node):
+        fun_name = node.fun_name
+        fun_symbol = node.fun_symbol
+        nesting_level = fun_symbol.scope_level + 1
+        scope = fun_symbol.scope
+        params = tuple(
+            (param_symbol.slot, self.visit(argument_node))
+            for param_symbol, argument_node in zip(
+                fun_symbol.formal_params, node.actual_params
+            )
+        )
+        body = self.function_body(fun_symbol)
+        push = self.call_stack.push
+        pop = self.call_stack.pop
+        returned = self._returned
+        if self.hooks.call_enter or self.hooks.call_leave:
+            return self.traced_call(fun_name, nesting_level, scope, params, body)
+        cache = self.memo.cache(fun_symbol)
+        if cache is not None:
+            return self.memo_call(fun_name, nesting_level, scope, params, body, cache)
+
+        def call(fr):
+            ar = ActivationRecord(
+                name=fun_name,
+                type=ARType.PROCEDURE,
+                nesting_level=nesting_level,
+                scope=scope,
+            )
+            slots = ar.slots
+            for slot, argument in params:
+                slots[slot] = argument(fr)
+            push(ar)
+            if body[0](slots) is RETURNED:
+                pop()
+                return returned[0]
+            pop()
+        return call
+
+    def memo_call(self, fun_name, nesting_level, scope, params, body, cache):
+        push = self.call_stack.push
+        pop = self.call_stack.pop
+        returned = self._returned
+        nparams = len(params)
+        key = cache.key
+        get = cache.get
+        put = cache.put
+
+        def call(fr):
+            ar = ActivationRecord(
+                name=fun_name,
+                type=ARType.PROCEDURE,
+                nesting_level=nesting_level,
+                scope=scope,
+            )
+            slots = ar.slots
+            for slot, argument in params:
+                slots[slot] = argument(fr)
+            # parameters occupy the first slots
+            arguments = key(slots[:nparams])
+            value = get(arguments)
+            if value is MISSING:
+                push(ar)
+                value = returned[0] if body[0](slots) is RETURNED else None
+                pop()
+                put(arguments, value)
+            return value
+        return call
+
+    def traced_call(self, fun_name, nesting_level, scope, params, body):
+        call_stack = self.call_stack
+        hooks = self.hooks
+        returned = self._returned
+
+        def call(fr):
+            ar = ActivationRecord(
+                name=fun_name,
+                type=ARType.PROCEDURE,
+                nesting_level=nesting_level,
+                scope=scope,
+            )
+            slots = ar.slots
+            for slot, argument in params:
+                slots[slot] = argument(fr)
+            call_stack.push(ar)
+            hooks.emit(CALL_ENTER, ar, call_stack)
+            value = returned[0] if body[0](slots) is RETURNED else None
+            hooks.emit(CALL_LEAVE, ar, call_stack)
+            call_stack.pop()
+            return value
+        return call
+
+
+class ClosureExecutor:
+    def __init__(self, ast, hooks=None, memo_size=DEFAULT_MEMO_SIZE):
+        self.ast = ast
+        self.hooks = hooks if hooks is not None else EventHooks()
+        self.call_stack = CallStack()
+        self.memo = Memo(0 if self.hooks.watch_execution() else memo_size)
+        self.program = None
+
+    def compile(self):
+        if self.program is None:
+            self.program = ClosureCompiler(
+                self.ast, self.call_stack, self.hooks, self.memo
+            ).compile()
+        return self.program
+
+    def run(self):
+        program = self.compile()
+        ar = ActivationRecord(
+            name='main',
+            type=ARType.PROGRAM,
+            nesting_level=1,
+            scope=self.ast.scope,
+        )
+        self.call_stack.push(ar)
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        program(ar.slots)
+        if self.hooks.call_leave:
+            self.hooks.emit(CALL_LEAVE, ar, self.call_stack)
+        self.call_stack.pop()
+        return ar
@@ -1,43 +1,56 @@
 from interpreter.tokens_type import TokenType as Tk
 from interpreter.ast.visitor import NodeVisitor
 from interpreter.stack import CallStack, ActivationRecord, ARType
-import json 
-
-_SHOULD_LOG_STACK = False
+from interpreter.events import EventHooks, CALL_ENTER, CALL_LEAVE, ASSIGN, BRANCH_TAKEN
+from interpreter.ast import json_stream
+from interpreter.memo import Memo, DEFAULT_MEMO_SIZE, MISSING
 
 class ASTJsonBuilder():
-    def __init__(self, ast):
+    def __init__(self, ast, indent=4):
         self.ast = ast
-        self.json_obj = {}
+        self.indent = indent
 
     def run(self):
-        return json.dumps(self.ast.dict(), indent = 4)
+        return ''.join(json_stream.iterencode(self.ast, self.indent))
+
+    def write(self, file):
+        json_stream.dump(self.ast, file, self.indent)
+
+class ReturnSignal(Exception):
+    # raised by a return statement and caught by the call it returns from
+    def __init__(self, value):
+        self.value = value
+
 
 class Executor(NodeVisitor):
-    def __init__(self, ast):
+    def __init__(self, ast, hooks=None, memo_size=DEFAULT_MEMO_SIZE):
         self.ast = ast
+        self.hooks = hooks if hooks is not None else EventHooks()
         self.call_stack = CallStack()
+        self.memo = Memo(0 if self.hooks.watch_execution() else memo_size)
 
     def run(self):
         return self.visit(self.ast)
-    
-    def log(self, msg):
-        if _SHOULD_LOG_STACK:
-            print(msg)
 
     def visit_ProgramNode(self, node):
-        self.log(f'ENTER: main')
         ar = ActivationRecord(
             name='main',
             type=ARType.PROGRAM,
             nesting_level=1,
+            scope=node.scope,
         )
         self.call_stack.push(ar)
-        self.log(str(self.call_stack))
-        self.visit(node.init_block)
-        self.log(f'LEAVE: main')
-        self.log(str(self.call_stack))
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        try:
+            self.visit(node.init_block)
+        except ReturnSignal:
+            # a return in main ends the program
+            pass
+        if self.hooks.call_leave:
+            self.hooks.emit(CALL_LEAVE, ar, self.call_stack)
         self.call_stack.pop()
+        return ar
 
     def visit_VarDeclarationNode(self, node):
         # Do nothing
@@ -48,32 +61,18 @@ class Executor(NodeVisitor):
         pass
 
     def visit_BinOpNode(self, node):
-        if node.op.type == Tk.PLUS: return self.visit(node.left) + self.visit(node.right)
-        elif node.op.type == Tk.MINUS: return self.visit(node.left) - self.visit(node.right)
-        elif node.op.type == Tk.MUL: return self.visit(node.left) * self.visit(node.right)
-        elif node.op.type == Tk.DIV: return self.visit(node.left) / self.visit(node.right)
-        elif node.op.type == Tk.MOD: return self.visit(node.left) % self.visit(node.right)
-        elif node.op.type == Tk.FLOORDIV: return self.visit(node.left) // self.visit(node.right)
-        elif node.op.type == Tk.EXPONENT: return self.visit(node.left) ** self.visit(node.right)
-        elif node.op.type == Tk.AND: return self.visit(node.left) and self.visit(node.right)
-        elif node.op.type == Tk.OR: return self.visit(node.left) or self.visit(node.right)
-        elif node.op.type == Tk.GT: return self.visit(node.left) > self.visit(node.right)
-        elif node.op.type == Tk.LT: return self.visit(node.left) < self.visit(node.right)
-        elif node.op.type == Tk.EQ_GT: return self.visit(node.left) >= self.visit(node.right)
-        elif node.op.type == Tk.EQ_LT: return self.visit(node.left) <= self.visit(node.right)
-        elif node.op.type == Tk.EQ: return self.visit(node.left) == self.visit(node.right)
-        elif node.op.type == Tk.NOT_EQ: return self.visit(node.left) != self.visit(node.right)
+        op_fn = node.op_fn
+        if op_fn is not None:
+            return op_fn(self.visit(node.left), self.visit(node.right))
+        if node.op.type == Tk.AND:
+            return self.visit(node.left) and self.visit(node.right)
+        return self.visit(node.left) or self.visit(node.right)
 
     def visit_FactorNode(self, node):
         return node.value
     
     def visit_UnaryOpNode(self, node):
-        if node.op.type == Tk.PLUS:
-            return +self.visit(node.expr)
-        elif node.op.type == Tk.MINUS:
-            return -self.visit(node.expr)
-        elif node.op.type == Tk.NOT:
-            return not self.visit(node.expr)
+        return node.op_fn(self.visit(node.expr))
         
     def visit_BlockNode(self, node):
         for statement in node.statements:
@@ -82,43 +81,72 @@ class Executor(NodeVisitor):
     def visit_NoOpNode(self, node):
         pass
 
+    # Functions cannot reach the records of enclosing scopes, so a variable
+    # always lives in the record on top of the stack and node.depth is not
+    # needed to find it.
     def visit_AssignNode(self, node):
-        var_name = node.left.value
         var_value = self.visit(node.right)
         ar = self.call_stack.peek()
-        ar[var_name] = var_value
+        ar.slots[node.slot] = var_value
+        if self.hooks.assign:
+            self.hooks.emit(ASSIGN, ar, node.left.value, var_value)
 
     def visit_VarNode(self, node):
-        var_name = node.value
         ar = self.call_stack.peek()
-        var_value = ar.get(var_name)
-        return var_value
+        return ar.slots[node.slot]
         
     def visit_FunctionDeclarationNode(self, node):
         pass
 
     def visit_FunctionCallNode(self, node):
-        fun_name = node.fun_name
         fun_symbol = node.fun_symbol
         ar = ActivationRecord(
-            name=fun_name,
+            name=node.fun_name,
             type=ARType.PROCEDURE,
             nesting_level=fun_symbol.scope_level + 1,
+            scope=fun_symbol.scope,
         )
         formal_params = fun_symbol.formal_params
         actual_params = node.actual_params
         for param_symbol, argument_node in zip(formal_params, actual_params):
-            ar[param_symbol.name] = self.visit(argument_node)
-        self.call_stack.push(ar) 
-        self.log(f'ENTER: PROCEDURE {fun_name}')
-        self.log(str(self.call_stack))
-
-        self.visit(fun_symbol.block_ast)  
-        self.log(f'LEAVE: PROCEDURE {fun_name}')
-        self.log(str(self.call_stack))
+            ar.slots[param_symbol.slot] = self.visit(argument_node)
+        cache = self.memo.cache(fun_symbol)
+        if cache is None:
+            return self.call(node, ar)
+        # parameters occupy the first slots
+        key = cache.key(ar.slots[:len(formal_params)])
+        value = cache.get(key)
+        if value is MISSING:
+            value = self.call(node, ar)
+            cache.put(key, value)
+            return value
+        return self.memo_hit(node, value)
+
+    # a call answered by the memo, which never reaches call()
+    def memo_hit(self, node, value):
+        return value
+
+    # runs the body once the arguments are evaluated in the caller's record
+    def call(self, node, ar):
+        self.call_stack.push(ar)
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        try:
+            self.visit(node.fun_symbol.block_ast)
+            value = None
+        except ReturnSignal as signal:
+            value = signal.value
+        if self.hooks.call_leave:
+            self.hooks.emit(CALL_LEAVE, ar, self.call_stack)
         self.call_stack.pop()
+        return value
+
+    def visit_ReturnNode(self, node):
+        raise ReturnSignal(None if node.expr is None else self.visit(node.expr))
 
     def visit_ConditionalOpNode(self, node):
         condition_result = bool(self.visit(node.condition_expr))
         if condition_result:
+            if self.hooks.branch_taken:
+                self.hooks.emit(BRANCH_TAKEN, self.call_stack.peek(), node)
             self.visit(node.block_node)
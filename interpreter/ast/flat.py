@@ -0,0 +1,568 @@
+from array import array
+from collections import Counter
+import sys
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Token
+from interpreter.regex_lexer import OffsetToken
+from interpreter.analyser import Analyser
+from interpreter.operators import OPERATOR_FUNCTIONS, OPERATOR_INDEX
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import ReturnSignal
+from interpreter.memo import Memo, DEFAULT_MEMO_SIZE, MISSING
+from interpreter.stack import CallStack, ActivationRecord, ARType
+from interpreter.events import EventHooks, CALL_ENTER, CALL_LEAVE, BRANCH_TAKEN
+# ASSIGN is taken by the node kind
+from interpreter.events import ASSIGN as ASSIGN_EVENT
+
+# Node kinds, named after the classes of interpreter.ast.objects
+KIND_NAMES = (
+    'ProgramNode',
+    'FunctionDeclarationNode',
+    'FunctionCallNode',
+    'BlockNode',
+    'TypeNode',
+    'BinOpNode',
+    'FactorNode',
+    'UnaryOpNode',
+    'AssignNode',
+    'VarDeclarationNode',
+    'VarNode',
+    'NoOpNode',
+    'ParamNode',
+    'ConditionalOpNode',
+    'ReturnNode',
+)
+(PROGRAM, FUNCTION_DECLARATION, FUNCTION_CALL, BLOCK, TYPE, BIN_OP, FACTOR,
+ UNARY_OP, ASSIGN, VAR_DECLARATION, VAR, NO_OP, PARAM, CONDITIONAL_OP,
+ RETURN) = range(len(KIND_NAMES))
+
+TOKEN_TYPES = list(Tk)
+TOKEN_TYPE_INDEX = {token_type: index for index, token_type in enumerate(TOKEN_TYPES)}
+NO_TOKEN = 0xff
+NONE = -1
+
+
+class FlatTree:
+    # A whole program as parallel columns indexed by node number, built by
+    # FlatAnalyser through the same constructor calls the parser makes for
+    # the node classes (each returns the number of the new node). The
+    # children of a node are first_child, then next_sibling from there on.
+    #   kind:    one of the kinds above
+    #   op:      index in TOKEN_TYPES of the node's token (operator, literal
+    #            or type), NO_TOKEN if it has none
+    #   value:   index in values of its name or literal, NONE if it has none
+    #   line, column: position of its token, 0 when unknown. For the
+    #            offset tokens of the regex lexers, line is 0 and column the
+    #            source offset plus one, resolved through lines only when a
+    #            token is asked for.
+    #   slot:    filled in by the analysis: the record slot of a variable,
+    #            for a call the index in functions of its FunctionSymbol,
+    #            for an operator the index in OPERATOR_FUNCTIONS of its op_fn
+    def __init__(self):
+        self.kind = array('B')
+        self.op = array('B')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.value = array('i')
+        self.line = array('I')
+        self.column = array('I')
+        self.slot = array('i')
+        self.values = []
+        self._value_index = {}
+        self.functions = []
+        self._function_index = {}
+        self.root = NONE
+        self.scope = None
+        self.nesting = 0
+        self.lines = None
+
+    def __len__(self):
+        return len(self.kind)
+
+    def nbytes(self):
+        columns = (
+            self.kind, self.op, self.first_child, self.next_sibling,
+            self.value, self.line, self.column, self.slot,
+        )
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def kind_counts(self):
+        return Counter({KIND_NAMES[kind]: count for kind, count in Counter(self.kind).items()})
+
+    def add(self, kind, children=(), token=None, value=NONE):
+        index = len(self.kind)
+        self.kind.append(kind)
+        if token is None:
+            self.op.append(NO_TOKEN)
+            self.line.append(0)
+            self.column.append(0)
+        elif type(token) is OffsetToken:
+            self.op.append(TOKEN_TYPE_INDEX[token.type])
+            self.lines = token.lines
+            self.line.append(0)
+            self.column.append(token.offset + 1)
+        else:
+            self.op.append(TOKEN_TYPE_INDEX[token.type])
+            self.line.append(token.lineno or 0)
+            self.column.append(token.column or 0)
+        self.value.append(value)
+        self.next_sibling.append(NONE)
+        # about half of the nodes are leaves
+        if not children:
+            self.first_child.append(NONE)
+            return index
+        next_sibling = self.next_sibling
+        previous = NONE
+        for child in children:
+            if child is None:
+                continue
+            if previous == NONE:
+                self.first_child.append(child)
+            else:
+                next_sibling[previous] = child
+            previous = child
+        if previous == NONE:
+            self.first_child.append(NONE)
+        return index
+
+    def intern(self, value):
+        # keyed with the type, so that 1, 1.0 and True stay apart
+        key = (type(value), value)
+        index = self._value_index.get(key)
+        if index is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            index = self._value_index[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def function_index(self, fun_symbol):
+        index = self._function_index.get(id(fun_symbol))
+        if index is None:
+            index = self._function_index[id(fun_symbol)] = len(self.functions)
+            self.functions.append(fun_symbol)
+        return index
+
+    def children(self, index):
+        child = self.first_child[index]
+        next_sibling = self.next_sibling
+        while child != NONE:
+            yield child
+            child = next_sibling[child]
+
+    def token(self, index):
+        token_type = TOKEN_TYPES[self.op[index]]
+        value = self.value[index]
+        value = token_type.value if value == NONE else self.values[value]
+        line = self.line[index]
+        column = self.column[index]
+        if not line and column:
+            return OffsetToken(token_type, value, column - 1, self.lines)
+        return Token(token_type, value, line or None, column or None)
+
+    def view(self, index):
+        return VIEWS[self.kind[index]](self, index)
+
+    def program(self):
+        return self.view(self.root)
+
+    # constructors with the signatures of the node classes
+
+    def ProgramNode(self, init_block, utils=[], nesting=0):
+        self.nesting = nesting
+        self.root = self.add(PROGRAM, [init_block, *utils])
+        # the tree is complete: the slots the analysis fills in are made at
+        # once rather than node by node
+        self.slot = array('i', [NONE]) * len(self.kind)
+        return self.root
+
+    def FunctionDeclarationNode(self, fun_name, formal_params, block_node):
+        return self.add(FUNCTION_DECLARATION, [*formal_params, block_node], value=self.intern(fun_name))
+
+    def FunctionCallNode(self, fun_name, actual_params, token):
+        return self.add(FUNCTION_CALL, actual_params, token, self.intern(fun_name))
+
+    def BlockNode(self, statements=[]):
+        return self.add(BLOCK, statements)
+
+    def TypeNode(self, token):
+        value = NONE if token.value == token.type.value else self.intern(token.value)
+        return self.add(TYPE, (), token, value)
+
+    def BinOpNode(self, left, op, right):
+        return self.add(BIN_OP, (left, right), op)
+
+    def FactorNode(self, token):
+        return self.add(FACTOR, (), token, self.intern(token.value))
+
+    def UnaryOpNode(self, op, expr):
+        return self.add(UNARY_OP, (expr,), op)
+
+    def AssignNode(self, left, op, right):
+        return self.add(ASSIGN, (left, right), op)
+
+    def VarDeclarationNode(self, var_node, type_node, assign_node=None):
+        return self.add(VAR_DECLARATION, (var_node, type_node, assign_node))
+
+    def VarNode(self, token):
+        return self.add(VAR, (), token, self.intern(token.value))
+
+    def NoOpNode(self):
+        return self.add(NO_OP)
+
+    def ParamNode(self, var_node, type_node):
+        return self.add(PARAM, (var_node, type_node))
+
+    def ConditionalOpNode(self, condition_expr, block_node):
+        return self.add(CONDITIONAL_OP, (condition_expr, block_node))
+
+    def ReturnNode(self, token, expr=None):
+        return self.add(RETURN, (expr,), token)
+
+
+class FlatAnalyser(Analyser):
+    # the parser, building a FlatTree instead of node objects
+    def __init__(self, lexer) -> None:
+        self.nodes = FlatTree()
+        super().__init__(lexer)
+
+    def parse(self):
+        super().parse()
+        return self.nodes
+
+    def program(self):
+        tree = self.nodes
+        fun_declarations = self.declarations()
+        init_block = None
+        utils = []
+        for fun in fun_declarations:
+            if tree.values[tree.value[fun]].lower() == 'main':
+                if init_block is not None and tree.first_child[init_block] != NONE:
+                    raise Exception('Two "main" functions is not permitted')
+                # the block is moved under the program node
+                *params, init_block = tree.children(fun)
+            else:
+                utils.append(fun)
+        if init_block is None:
+            init_block = tree.BlockNode([])
+        return tree.ProgramNode(init_block=init_block, utils=utils, nesting=self.nesting)
+
+
+# Views present a node of a FlatTree with the attributes of its node class,
+# so that visitors written for node objects (SemanticAnalyser) walk a flat
+# tree unchanged; attributes the analysis sets are stored in the columns.
+
+class FlatNode:
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def child(self, n):
+        for i, child in enumerate(self.tree.children(self.index)):
+            if i == n:
+                return self.tree.view(child)
+        return None
+
+    def child_views(self):
+        tree = self.tree
+        return [tree.view(child) for child in tree.children(self.index)]
+
+    @property
+    def token(self):
+        return self.tree.token(self.index)
+
+    @property
+    def _value(self):
+        return self.tree.values[self.tree.value[self.index]]
+
+    # a variable always lives in the record on top of the stack, so its
+    # depth is not kept
+    @property
+    def depth(self):
+        return None
+
+    @depth.setter
+    def depth(self, depth):
+        pass
+
+    @property
+    def slot(self):
+        return self.tree.slot[self.index]
+
+    @slot.setter
+    def slot(self, slot):
+        self.tree.slot[self.index] = slot
+
+
+def _child(n):
+    return property(lambda self: self.child(n))
+
+
+class ProgramNode(FlatNode):
+    __slots__ = ()
+    init_block = _child(0)
+    utils = property(lambda self: self.child_views()[1:])
+
+    @property
+    def scope(self):
+        return self.tree.scope
+
+    @scope.setter
+    def scope(self, scope):
+        self.tree.scope = scope
+
+
+class FunctionDeclarationNode(FlatNode):
+    __slots__ = ()
+    fun_name = FlatNode._value
+    formal_params = property(lambda self: self.child_views()[:-1])
+    block_node = property(lambda self: self.child_views()[-1])
+
+
+class FunctionCallNode(FlatNode):
+    __slots__ = ()
+    fun_name = FlatNode._value
+    actual_params = property(FlatNode.child_views)
+
+    @property
+    def fun_symbol(self):
+        slot = self.slot
+        return None if slot == NONE else self.tree.functions[slot]
+
+    @fun_symbol.setter
+    def fun_symbol(self, fun_symbol):
+        self.slot = self.tree.function_index(fun_symbol)
+
+
+class BlockNode(FlatNode):
+    __slots__ = ()
+    statements = property(FlatNode.child_views)
+
+
+class TypeNode(FlatNode):
+    __slots__ = ()
+    value = property(lambda self: self.token.value)
+
+
+class BinOpNode(FlatNode):
+    __slots__ = ()
+    left = _child(0)
+    right = _child(1)
+    op = FlatNode.token
+
+    @property
+    def op_fn(self):
+        return OPERATOR_FUNCTIONS[self.slot]
+
+    @op_fn.setter
+    def op_fn(self, op_fn):
+        self.slot = OPERATOR_INDEX[op_fn]
+
+
+class FactorNode(FlatNode):
+    __slots__ = ()
+    value = FlatNode._value
+
+
+class UnaryOpNode(FlatNode):
+    __slots__ = ()
+    op = FlatNode.token
+    expr = _child(0)
+    op_fn = BinOpNode.op_fn
+
+
+class AssignNode(FlatNode):
+    __slots__ = ()
+    left = _child(0)
+    right = _child(1)
+    op = FlatNode.token
+
+
+class VarDeclarationNode(FlatNode):
+    __slots__ = ()
+    var_node = _child(0)
+    type_node = _child(1)
+    assign_node = _child(2)
+
+
+class VarNode(FlatNode):
+    __slots__ = ()
+    value = FlatNode._value
+
+
+class NoOpNode(FlatNode):
+    __slots__ = ()
+
+
+class ParamNode(FlatNode):
+    __slots__ = ()
+    var_node = _child(0)
+    type_node = _child(1)
+
+
+class ConditionalOpNode(FlatNode):
+    __slots__ = ()
+    condition_expr = _child(0)
+    block_node = _child(1)
+
+
+class ReturnNode(FlatNode):
+    __slots__ = ()
+    expr = _child(0)
+
+
+VIEWS = tuple(globals()[name] for name in KIND_NAMES)
+
+
+def analyse(tree, hooks=None):
+    SemanticAnalyser(tree.program(), hooks).run()
+    return tree
+
+
+class FlatVisitor:
+    # NodeVisitor for node numbers: visit(index) calls visit_<kind name>
+    def __init__(self, tree):
+        self.tree = tree
+        self._visitors = [
+            getattr(self, 'visit_' + name, self.generic_visit) for name in KIND_NAMES
+        ]
+
+    def visit(self, index):
+        return self._visitors[self.tree.kind[index]](index)
+
+    def generic_visit(self, index):
+        raise Exception('No visit_{} method'.format(KIND_NAMES[self.tree.kind[index]]))
+
+
+class FlatExecutor(FlatVisitor):
+    # Executor over the columns of an analysed FlatTree
+    def __init__(self, tree, hooks=None, memo_size=DEFAULT_MEMO_SIZE):
+        super().__init__(tree)
+        self.hooks = hooks if hooks is not None else EventHooks()
+        self.call_stack = CallStack()
+        self.memo = Memo(0 if self.hooks.watch_execution() else memo_size)
+
+    def run(self):
+        return self.visit(self.tree.root)
+
+    def visit_ProgramNode(self, index):
+        ar = ActivationRecord(
+            name='main',
+            type=ARType.PROGRAM,
+            nesting_level=1,
+            scope=self.tree.scope,
+        )
+        self.call_stack.push(ar)
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        try:
+            self.visit(self.tree.first_child[index])
+        except ReturnSignal:
+            pass
+        if self.hooks.call_leave:
+            self.hooks.emit(CALL_LEAVE, ar, self.call_stack)
+        self.call_stack.pop()
+        return ar
+
+    def visit_BlockNode(self, index):
+        visit = self.visit
+        next_sibling = self.tree.next_sibling
+        statement = self.tree.first_child[index]
+        while statement != NONE:
+            visit(statement)
+            statement = next_sibling[statement]
+
+    def visit_BinOpNode(self, index):
+        tree = self.tree
+        left = tree.first_child[index]
+        right = tree.next_sibling[left]
+        op_fn = OPERATOR_FUNCTIONS[tree.slot[index]]
+        if op_fn is not None:
+            return op_fn(self.visit(left), self.visit(right))
+        if TOKEN_TYPES[tree.op[index]] == Tk.AND:
+            return self.visit(left) and self.visit(right)
+        return self.visit(left) or self.visit(right)
+
+    def visit_FactorNode(self, index):
+        return self.tree.values[self.tree.value[index]]
+
+    def visit_UnaryOpNode(self, index):
+        tree = self.tree
+        return OPERATOR_FUNCTIONS[tree.slot[index]](self.visit(tree.first_child[index]))
+
+    def visit_AssignNode(self, index):
+        tree = self.tree
+        left = tree.first_child[index]
+        var_value = self.visit(tree.next_sibling[left])
+        ar = self.call_stack.peek()
+        ar.slots[tree.slot[index]] = var_value
+        if self.hooks.assign:
+            self.hooks.emit(ASSIGN_EVENT, ar, tree.values[tree.value[left]], var_value)
+
+    def visit_VarNode(self, index):
+        return self.call_stack.peek().slots[self.tree.slot[index]]
+
+    def visit_VarDeclarationNode(self, index):
+        pass
+
+    def visit_TypeNode(self, index):
+        pass
+
+    def visit_NoOpNode(self, index):
+        pass
+
+    def visit_FunctionDeclarationNode(self, index):
+        pass
+
+    def visit_FunctionCallNode(self, index):
+        tree = self.tree
+        fun_symbol = tree.functions[tree.slot[index]]
+        ar = ActivationRecord(
+            name=tree.values[tree.value[index]],
+            type=ARType.PROCEDURE,
+            nesting_level=fun_symbol.scope_level + 1,
+            scope=fun_symbol.scope,
+        )
+        slots = ar.slots
+        argument = tree.first_child[index]
+        for param_symbol in fun_symbol.formal_params:
+            slots[param_symbol.slot] = self.visit(argument)
+            argument = tree.next_sibling[argument]
+        cache = self.memo.cache(fun_symbol)
+        if cache is None:
+            return self.call(fun_symbol, ar)
+        key = cache.key(slots[:len(fun_symbol.formal_params)])
+        value = cache.get(key)
+        if value is MISSING:
+            value = self.call(fun_symbol, ar)
+            cache.put(key, value)
+        return value
+
+    def call(self, fun_symbol, ar):
+        self.call_stack.push(ar)
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        try:
+            self.visit(fun_symbol.block_ast.index)
+            value = None
+        except ReturnSignal as signal:
+            value = signal.value
+        if self.hooks.call_leave:
+            self.hooks.emit(CALL_LEAVE, ar, self.call_stack)
+        self.call_stack.pop()
+        return value
+
+    def visit_ReturnNode(self, index):
+        expr = self.tree.first_child[index]
+        raise ReturnSignal(None if expr == NONE else self.visit(expr))
+
+    def visit_ConditionalOpNode(self, index):
+        tree = self.tree
+        condition = tree.first_child[index]
+        if bool(self.visit(condition)):
+            if self.hooks.branch_taken:
+                self.hooks.emit(BRANCH_TAKEN, self.call_stack.peek(), tree.view(index))
+            self.visit(tree.next_sibling[condition])
@@ -0,0 +1,227 @@
+import copy
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Token
+from interpreter.stack import INLINED_SEPARATOR
+from interpreter.ast.symbol import VarSymbol
+from interpreter.ast.objects import (
+    AssignNode,
+    ConditionalOpNode,
+    FactorNode,
+    FunctionCallNode,
+    ReturnNode,
+    VarDeclarationNode,
+    VarNode,
+    walk,
+)
+
+# largest function body, in nodes, that is inlined
+DEFAULT_INLINE_BUDGET = 40
+
+
+class Candidate:
+    # what a call of an inlinable function expands to
+    __slots__ = ('fun_symbol', 'statements', 'result', 'resets')
+
+    def __init__(self, fun_symbol, statements, result, resets):
+        self.fun_symbol = fun_symbol
+        self.statements = statements  # the body without its final return
+        self.result = result  # the expression it returns, None if none
+        # local slots a body may read before it assigns them, which a real
+        # call would find empty
+        self.resets = resets
+
+
+def reads(node):
+    # slots of the variables node reads
+    nodes = list(walk(node))
+    targets = set()
+    for n in nodes:
+        if isinstance(n, AssignNode):
+            targets.add(id(n.left))
+        elif isinstance(n, VarDeclarationNode):
+            targets.add(id(n.var_node))
+    return {
+        n.slot for n in nodes
+        if isinstance(n, VarNode) and id(n) not in targets
+    }
+
+
+def none_literal(token):
+    return FactorNode(Token(Tk.NON, None, token.lineno, token.column))
+
+
+class Inliner:
+    # Runs after SemanticAnalyser (and Optimizer). Calls of small, pure,
+    # non-recursive functions are replaced by a copy of the callee's body
+    # in the caller's block, where the call is a statement, the right side
+    # of an assignment or a returned value. The variables of the callee get
+    # slots in the caller's record named function.variable; the copied nodes
+    # keep the callee's tokens, so their positions still point at its source.
+    def __init__(self, tree, budget=DEFAULT_INLINE_BUDGET):
+        self.tree = tree
+        self.budget = budget
+        self.inlined = 0
+        self._candidates = {}
+
+    def run(self):
+        program = self.tree
+        # callees are declared before their callers, so a function is
+        # rewritten before it is inlined anywhere
+        for util in program.utils:
+            fun_symbol = program.scope.lookup(util.fun_name)
+            if fun_symbol is not None and fun_symbol.block_ast is util.block_node:
+                self.rewrite_block(util.block_node, fun_symbol.scope)
+        self.rewrite_block(program.init_block, program.scope)
+        return program
+
+    def rewrite_block(self, block, scope):
+        statements = []
+        # The statements an inlined call expands to are looked at again: a
+        # call passed as an argument is now assigned to a parameter. Each
+        # comes with the functions whose parameters are being assigned, as
+        # inlining one of those again would overwrite them.
+        pending = [(statement, frozenset()) for statement in reversed(block.statements)]
+        while pending:
+            statement, active = pending.pop()
+            if isinstance(statement, ConditionalOpNode):
+                self.rewrite_block(statement.block_node, scope)
+            inlined = self.inline(statement, scope, active)
+            if inlined is None:
+                statements.append(statement)
+                continue
+            self.inlined += 1
+            fun_symbol, params, rest = inlined
+            pending.extend((statement, active) for statement in reversed(rest))
+            active = active | {fun_symbol}
+            pending.extend((statement, active) for statement in reversed(params))
+        block.statements = statements
+
+    def candidate(self, fun_symbol):
+        if fun_symbol in self._candidates:
+            return self._candidates[fun_symbol]
+        candidate = self._candidates[fun_symbol] = self.analyse(fun_symbol)
+        return candidate
+
+    def analyse(self, fun_symbol):
+        if not fun_symbol.pure or fun_symbol.block_ast is None:
+            return None
+        body = fun_symbol.block_ast.statements
+        nodes = list(walk(fun_symbol.block_ast))
+        if len(nodes) > self.budget:
+            return None
+        result = None
+        if body and isinstance(body[-1], ReturnNode):
+            result = body[-1].expr
+            body = body[:-1]
+        for node in nodes:
+            if isinstance(node, FunctionCallNode) and node.fun_symbol is fun_symbol:
+                return None
+            # an early return would have to skip the rest of the caller's code
+            if isinstance(node, ReturnNode) and node is not fun_symbol.block_ast.statements[-1]:
+                return None
+
+        assigned = {param.slot for param in fun_symbol.formal_params}
+        resets = set()
+        for statement in body:
+            if isinstance(statement, AssignNode):
+                resets |= reads(statement.right) - assigned
+                assigned.add(statement.slot)
+            else:
+                resets |= reads(statement) - assigned
+        if result is not None:
+            resets |= reads(result) - assigned
+        return Candidate(fun_symbol, body, result, sorted(resets))
+
+    def inline(self, statement, scope, active=frozenset()):
+        # -> (callee, parameter assignments, the other statements)
+        if isinstance(statement, FunctionCallNode):
+            call = statement
+        elif isinstance(statement, AssignNode) and isinstance(statement.right, FunctionCallNode):
+            call = statement.right
+        elif isinstance(statement, ReturnNode) and isinstance(statement.expr, FunctionCallNode):
+            call = statement.expr
+        else:
+            return None
+        if call.fun_symbol in active:
+            return None
+        candidate = self.candidate(call.fun_symbol)
+        if candidate is None:
+            return None
+        result = candidate.result
+        if call is statement and not isinstance(result, (VarNode, FactorNode, type(None))):
+            # the value is dropped, but computing it may still fail
+            return None
+
+        slots, names = self.slots(candidate.fun_symbol, scope)
+        token = call.token
+        params = [
+            self.assign(slots[param.slot], names[param.slot], argument, token, scope)
+            for param, argument in zip(candidate.fun_symbol.formal_params, call.actual_params)
+        ]
+        statements = [
+            self.assign(slots[slot], names[slot], none_literal(token), token, scope)
+            for slot in candidate.resets
+        ]
+        statements.extend(
+            self.copy(node, slots, names, scope) for node in candidate.statements
+        )
+        if result is None:
+            value = none_literal(token)
+        else:
+            value = self.copy(result, slots, names, scope)
+        if isinstance(statement, AssignNode):
+            statement.right = value
+            statements.append(statement)
+        elif isinstance(statement, ReturnNode):
+            statement.expr = value
+            statements.append(statement)
+        return candidate.fun_symbol, params, statements
+
+    def slots(self, fun_symbol, scope):
+        # callee slot -> caller slot and name, shared by every call of the
+        # same function in the caller; the calls never overlap
+        slots = []
+        names = []
+        for name in fun_symbol.scope.slot_names:
+            inlined_name = f'{fun_symbol.name}{INLINED_SEPARATOR}{name}'
+            symbol = scope.lookup(inlined_name, current_scope_only=True)
+            if symbol is None:
+                var_type = fun_symbol.scope.lookup(name, current_scope_only=True).type
+                symbol = VarSymbol(inlined_name, var_type)
+                scope.insert(symbol)
+            slots.append(symbol.slot)
+            names.append(inlined_name)
+        return slots, names
+
+    def assign(self, slot, name, value, token, scope):
+        var_node = VarNode(Token(Tk.ID, name, token.lineno, token.column))
+        var_node.depth = scope.scope_level
+        var_node.slot = slot
+        node = AssignNode(var_node, Token(Tk.ASSIGN, Tk.ASSIGN.value, token.lineno, token.column), value)
+        node.depth = scope.scope_level
+        node.slot = slot
+        return node
+
+    def copy(self, node, slots, names, scope):
+        # bodies are within the budget, so this recursion stays shallow
+        clone = copy.copy(node)
+        for field in node._fields:
+            child = getattr(node, field)
+            if isinstance(child, list):
+                setattr(clone, field, [self.copy(c, slots, names, scope) for c in child])
+            elif child is not None:
+                setattr(clone, field, self.copy(child, slots, names, scope))
+        # the target of an assignment has no slot of its own: the
+        # assignment holds it
+        if isinstance(node, AssignNode):
+            var_node = clone.left
+        elif isinstance(node, VarNode) and node.slot is not None:
+            var_node = clone
+        else:
+            return clone
+        token = var_node.token
+        var_node.token = Token(Tk.ID, names[node.slot], token.lineno, token.column)
+        clone.slot = slots[node.slot]
+        clone.depth = scope.scope_level
+        return clone
@@ -0,0 +1,86 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+from interpreter.ast.objects import AST
+
+# chunks joined per write() when dumping to a file
+WRITE_BATCH = 4096
+
+_END = object()
+
+
+def _scalar(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+def iterencode(node, indent=4):
+    # The JSON of node.dict() in chunks, as json.dumps(node.dict(), indent=
+    # indent) would write it (indent=None: no whitespace at all). The tree is
+    # walked with an explicit stack holding one iterator per open object or
+    # array, so only the path to the current node is ever materialised.
+    if indent is None:
+        key_separator = ':'
+        newline = ''
+        indent = ''
+    else:
+        key_separator = ': '
+        newline = '\n'
+        indent = ' ' * indent
+    # [iterator, closing bracket, first item]
+    stack = []
+    value = node
+    while True:
+        while isinstance(value, AST):
+            value = value.json_shape()
+        if isinstance(value, dict) and value:
+            yield '{'
+            stack.append([iter(value.items()), '}', True])
+        elif isinstance(value, list) and value:
+            yield '['
+            stack.append([iter(value), ']', True])
+        elif isinstance(value, (dict, list)):
+            yield '{}' if isinstance(value, dict) else '[]'
+        else:
+            yield _scalar(value)
+
+        while stack:
+            frame = stack[-1]
+            item = next(frame[0], _END)
+            if item is _END:
+                stack.pop()
+                yield newline + indent * len(stack) + frame[1]
+                continue
+            prefix = newline + indent * len(stack)
+            if not frame[2]:
+                prefix = ',' + prefix
+            frame[2] = False
+            if frame[1] == '}':
+                key, value = item
+                yield prefix + encode_basestring_ascii(key) + key_separator
+            else:
+                value = item
+                yield prefix
+            break
+        else:
+            return
+
+
+def dump(node, file, indent=4):
+    chunks = []
+    for chunk in iterencode(node, indent):
+        chunks.append(chunk)
+        if len(chunks) >= WRITE_BATCH:
+            file.write(''.join(chunks))
+            chunks.clear()
+    chunks.append('\n')
+    file.write(''.join(chunks))
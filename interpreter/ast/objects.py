@@ -1,146 +1,298 @@
+import sys
+
+from interpreter.operators import BINARY_OPERATORS, UNARY_OPERATORS
+
+# The passes and engines recurse once or twice per level of an expression;
+# the parser raises the recursion limit to fit the deepest one it builds.
+FRAMES_PER_LEVEL = 4
+BASE_RECURSION_LIMIT = sys.getrecursionlimit()
+
 class AST():
-    pass
+    # Nodes use __slots__: large programs hold millions of them. Attributes
+    # filled in by later passes (symbols, slots) have their slots here too.
+    __slots__ = ()
+    # names of the attributes holding child nodes (or lists of them)
+    _fields = ()
+
+    def json_shape(self):
+        # this node as JSON data, with child nodes left in place; dict() and
+        # the streaming encoder expand them. By default the children by
+        # field name, or for a leaf the value of its token.
+        if self._fields:
+            return {name: getattr(self, name) for name in self._fields}
+        token = getattr(self, 'token', None)
+        return None if token is None else token.value
+
+    def dict(self):
+        return to_dict(self)
+
+
+def iter_child_nodes(node):
+    for name in node._fields:
+        child = getattr(node, name)
+        if isinstance(child, list):
+            yield from child
+        elif child is not None:
+            yield child
+
+
+def walk(node):
+    # preorder, with an explicit stack so deep trees do not recurse
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = list(iter_child_nodes(node))
+        children.reverse()
+        stack.extend(children)
+
+def to_dict(node):
+    # json_shape() applied all the way down, with an explicit stack
+    root = [node]
+    stack = [(root, 0)]
+    while stack:
+        container, key = stack.pop()
+        value = container[key]
+        while isinstance(value, AST):
+            value = value.json_shape()
+        if isinstance(value, dict):
+            value = dict(value)
+            stack.extend((value, k) for k in value)
+        elif isinstance(value, list):
+            value = list(value)
+            stack.extend((value, i) for i in range(len(value)))
+        container[key] = value
+    return root[0]
+
+def fit_recursion_limit(nesting):
+    # never lowered: trees parsed earlier may still be running
+    limit = BASE_RECURSION_LIMIT + FRAMES_PER_LEVEL * nesting
+    if sys.getrecursionlimit() < limit:
+        sys.setrecursionlimit(limit)
 
 class ProgramNode(AST):
-    def __init__(self, init_block, utils = []):
+    __slots__ = ('init_block', 'utils', 'scope', 'nesting')
+    _fields = ('init_block', 'utils')
+
+    def __init__(self, init_block, utils = [], nesting=0):
         self.init_block = init_block
         self.utils = utils
+        self.scope = None
+        # depth of the most deeply nested expression
+        self.nesting = nesting
 
-    def dict(self):
+    def json_shape(self):
         return {
-            'init_block': self.init_block.dict(),
-            'utils': [stt.dict() for stt in self.utils] 
+            'init_block': self.init_block,
+            'utils': self.utils,
         }
     
 class FunctionDeclarationNode(AST):
+    __slots__ = ('fun_name', 'formal_params', 'block_node')
+    _fields = ('formal_params', 'block_node')
+
     def __init__(self, fun_name, formal_params, block_node):
         self.fun_name = fun_name
         self.formal_params = formal_params  # a list of Param nodes
         self.block_node = block_node
 
-    def dict(self):
+    def json_shape(self):
         return {
             'fun_name': self.fun_name,
-            'formal_params': [param.dict() for param in self.formal_params],
-            'block': self.block_node.dict()
+            'formal_params': self.formal_params,
+            'block': self.block_node,
         }
 
 class FunctionCallNode(AST):
+    __slots__ = ('fun_name', 'actual_params', 'token', 'fun_symbol')
+    _fields = ('actual_params',)
+
     def __init__(self, fun_name, actual_params, token):
         self.fun_name = fun_name
         self.actual_params = actual_params  # a list of AST nodes
         self.token = token
-        self.proc_symbol = None
+        self.fun_symbol = None
 
-    def dict(self):
+    def json_shape(self):
         return {
             'fun_name': self.fun_name,
-            'params': [param.dict() for param in self.actual_params]
+            'params': self.actual_params,
         }
 
 class BlockNode(AST):
+    __slots__ = ('statements',)
+    _fields = ('statements',)
+
     def __init__(self, statements = []):
         self.statements = statements
 
-    def dict(self):
-        return [stt.dict() for stt in self.statements]
+    def json_shape(self):
+        return self.statements
 
 class TypeNode(AST):
+    __slots__ = ('token',)
+
     def __init__(self, token):
         self.token = token
-        self.value = token.value
 
-    def dict(self):
+    @property
+    def value(self):
+        return self.token.value
+
+    def json_shape(self):
         return str(self.value)
     
 class BinOpNode(AST):
+    __slots__ = ('left', 'op', 'right', 'op_fn')
+    _fields = ('left', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        # None for the short-circuit AND/OR
+        self.op_fn = BINARY_OPERATORS.get(op.type)
+
+    @property
+    def token(self):
+        return self.op
     
-    def dict(self):
+    def json_shape(self):
         return {
-            'left': self.left.dict(),
+            'left': self.left,
             'op': self.op.value,
-            'right': self.right.dict()
+            'right': self.right,
         }
     
 class FactorNode(AST):
+    __slots__ = ('token',)
+
     def __init__(self, token):
         self.token = token
-        self.value = token.value
 
-    def dict(self):
+    @property
+    def value(self):
+        return self.token.value
+
+    def json_shape(self):
         return self.value
     
 class UnaryOpNode(AST):
+    __slots__ = ('op', 'expr', 'op_fn')
+    _fields = ('expr',)
+
     def __init__(self, op, expr):
         self.op = op
         self.expr = expr
-        
-    def dict(self):
+        self.op_fn = UNARY_OPERATORS[op.type]
+
+    @property
+    def token(self):
         return self.op
+        
+    def json_shape(self):
+        return {
+            'op': self.op.value,
+            'expr': self.expr,
+        }
 
 class AssignNode(AST):
+    __slots__ = ('left', 'op', 'right', 'depth', 'slot')
+    _fields = ('left', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        self.depth = self.slot = None
+
+    @property
+    def token(self):
+        return self.op
     
-    def dict(self):
+    def json_shape(self):
         return {
             'var': self.left.value,
             'op': self.op.value,
-            'value': self.right.dict()
+            'value': self.right,
         }
 
 class VarDeclarationNode(AST):
+    __slots__ = ('var_node', 'type_node', 'assign_node')
+    _fields = ('var_node', 'type_node', 'assign_node')
+
     def __init__(self, var_node, type_node, assign_node=None):
         self.var_node = var_node
         self.type_node = type_node
         self.assign_node = assign_node
 
-    def dict(self):
+    def json_shape(self):
         return {
             'var': self.var_node.value,
             'type' : self.type_node.value,
-            'value' : self.assign_node.dict() if self.assign_node else None
+            'value' : self.assign_node,
         }
 
 class VarNode(AST):
+    __slots__ = ('token', 'depth', 'slot')
+
     def __init__(self, token):
         self.token = token
-        self.value = token.value
+        self.depth = self.slot = None
 
-    def dict(self):
+    @property
+    def value(self):
+        return self.token.value
+
+    def json_shape(self):
         return {
             'var': self.value,
             'value' : self.value
         }
 
 class NoOpNode(AST):
-    def dict(self):
+    __slots__ = ()
+
+    def json_shape(self):
         return 'empty'
     
 class ParamNode(AST):
+    __slots__ = ('var_node', 'type_node')
+    _fields = ('var_node', 'type_node')
+
     def __init__(self, var_node, type_node):
         self.var_node = var_node
         self.type_node = type_node
     
-    def dict(self): 
+    def json_shape(self):
         return {
             'var' : self.var_node.value,
             'type' : self.type_node.value
         }
     
+class ReturnNode(AST):
+    __slots__ = ('token', 'expr')
+    _fields = ('expr',)
+
+    def __init__(self, token, expr=None):
+        self.token = token
+        self.expr = expr  # None for a bare return
+
+    def json_shape(self):
+        return {
+            'return': self.expr,
+        }
+
 class ConditionalOpNode(AST):
+    __slots__ = ('condition_expr', 'block_node')
+    _fields = ('condition_expr', 'block_node')
+
     def __init__(self, condition_expr, block_node):
         self.condition_expr = condition_expr
         self.block_node = block_node
 
-    def dict(self):
+    def json_shape(self):
         return {
-            'condition_expr': self.condition_expr.dict(),
-            'block': self.block_node.dict()
+            'condition_expr': self.condition_expr,
+            'block': self.block_node,
         }
\ No newline at end of file
@@ -0,0 +1,153 @@
+import math
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Token
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.ast.objects import (
+    BlockNode,
+    FactorNode,
+    NoOpNode,
+    ReturnNode,
+    walk,
+)
+
+_LITERAL_TYPES = {
+    bool: Tk.BOOLEAN,
+    int: Tk.INTEGER_VALUE,
+    float: Tk.REAL_VALUE,
+    str: Tk.STRING,
+}
+
+# Folded literals are kept in the tree (and in caches and .nsb files), so
+# powers with more digits and repeated strings with more characters than
+# this are left to be computed at run time.
+MAX_FOLDED_SIZE = 1000
+
+
+def too_large(op_type, left, right):
+    if op_type == Tk.EXPONENT:
+        if isinstance(left, int) and isinstance(right, int) and right > 0 and abs(left) > 1:
+            return right * math.log10(abs(left)) > MAX_FOLDED_SIZE
+    elif op_type == Tk.MUL:
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, str) and isinstance(count, int):
+                return len(sequence) * count > MAX_FOLDED_SIZE
+    return False
+
+
+def count_nodes(node):
+    return sum(1 for _ in walk(node))
+
+
+class Optimizer(NodeVisitor):
+    # Runs after SemanticAnalyser. Every visit returns the node that replaces
+    # the visited one; blocks are rewritten in place so that FunctionSymbol
+    # .block_ast keeps pointing at the optimized body.
+    def __init__(self, tree):
+        self.tree = tree
+        self.eliminated = 0
+
+    def run(self):
+        before = count_nodes(self.tree)
+        self.visit(self.tree)
+        self.eliminated = before - count_nodes(self.tree)
+        return self.tree
+
+    def literal(self, value, token):
+        token_type = _LITERAL_TYPES.get(type(value))
+        if token_type is None:
+            return None
+        return FactorNode(Token(token_type, value, token.lineno, token.column))
+
+    def visit_ProgramNode(self, node):
+        for util in node.utils:
+            self.visit(util)
+        self.visit(node.init_block)
+        return node
+
+    def visit_FunctionDeclarationNode(self, node):
+        self.visit(node.block_node)
+        return node
+
+    def visit_BlockNode(self, node):
+        statements = []
+        for statement in node.statements:
+            statement = self.visit(statement)
+            if isinstance(statement, NoOpNode):
+                continue
+            if isinstance(statement, BlockNode):
+                # body of an always-true conditional
+                statements.extend(statement.statements)
+            else:
+                statements.append(statement)
+            if statements and isinstance(statements[-1], ReturnNode):
+                # the rest of the block is unreachable
+                break
+        node.statements = statements
+        return node
+
+    def visit_NoOpNode(self, node):
+        return node
+
+    def visit_VarDeclarationNode(self, node):
+        if node.assign_node:
+            node.assign_node = self.visit(node.assign_node)
+        return node
+
+    def visit_AssignNode(self, node):
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_VarNode(self, node):
+        return node
+
+    def visit_FactorNode(self, node):
+        return node
+
+    def visit_ReturnNode(self, node):
+        if node.expr is not None:
+            node.expr = self.visit(node.expr)
+        return node
+
+    def visit_FunctionCallNode(self, node):
+        node.actual_params = [self.visit(param) for param in node.actual_params]
+        return node
+
+    def visit_ConditionalOpNode(self, node):
+        node.condition_expr = self.visit(node.condition_expr)
+        node.block_node = self.visit(node.block_node)
+        if not isinstance(node.condition_expr, FactorNode):
+            return node
+        if node.condition_expr.value:
+            return node.block_node
+        return NoOpNode()
+
+    def visit_UnaryOpNode(self, node):
+        node.expr = self.visit(node.expr)
+        if not isinstance(node.expr, FactorNode):
+            return node
+        try:
+            value = node.op_fn(node.expr.value)
+        except Exception:
+            # leave the error to be raised at run time
+            return node
+        return self.literal(value, node.op) or node
+
+    def visit_BinOpNode(self, node):
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        left, right = node.left, node.right
+        if not isinstance(left, FactorNode):
+            return node
+        op_type = node.op.type
+        if op_type == Tk.AND:
+            return node.right if left.value else left
+        if op_type == Tk.OR:
+            return left if left.value else node.right
+        if not isinstance(right, FactorNode) or too_large(op_type, left.value, right.value):
+            return node
+        try:
+            value = node.op_fn(left.value, right.value)
+        except Exception:
+            return node
+        return self.literal(value, node.op) or node
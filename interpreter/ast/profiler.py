@@ -0,0 +1,129 @@
+import marshal
+import time
+
+from interpreter.ast.executor import Executor
+from interpreter.memo import DEFAULT_MEMO_SIZE
+
+
+class CallStats:
+    __slots__ = ('calls', 'primitive_calls', 'inclusive', 'exclusive')
+
+    def __init__(self):
+        self.calls = 0
+        self.primitive_calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+    def record(self, inclusive, exclusive, recursive):
+        self.calls += 1
+        self.exclusive += exclusive
+        # like cProfile, time spent in a recursive activation is already part
+        # of the outermost one
+        if not recursive:
+            self.primitive_calls += 1
+            self.inclusive += inclusive
+
+    def pstats_entry(self):
+        return (self.primitive_calls, self.calls, self.exclusive, self.inclusive)
+
+
+class ProfilingExecutor(Executor):
+    # Deterministic profiler over the functions of the interpreted program:
+    # the program itself is profiled as 'main'.
+    def __init__(self, ast, hooks=None, filename='<program>', timer=time.perf_counter,
+                 memo_size=DEFAULT_MEMO_SIZE):
+        super().__init__(ast, hooks, memo_size)
+        self.filename = filename
+        self.timer = timer
+        self.functions = {}
+        # (caller, callee) -> CallStats
+        self.edges = {}
+        self._frames = []
+        self._active = {}
+
+    def enter(self, name):
+        self._active[name] = self._active.get(name, 0) + 1
+        self._frames.append([name, self.timer(), 0.0])
+
+    def leave(self):
+        name, start, children = self._frames.pop()
+        inclusive = self.timer() - start
+        exclusive = inclusive - children
+        self._active[name] -= 1
+        recursive = self._active[name] > 0
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = CallStats()
+        stats.record(inclusive, exclusive, recursive)
+        if self._frames:
+            caller = self._frames[-1]
+            caller[2] += inclusive
+            edge = self.edges.get((caller[0], name))
+            if edge is None:
+                edge = self.edges[caller[0], name] = CallStats()
+            edge.record(inclusive, exclusive, recursive)
+
+    def visit_ProgramNode(self, node):
+        self.enter('main')
+        try:
+            return super().visit_ProgramNode(node)
+        finally:
+            self.leave()
+
+    def call(self, node, ar):
+        self.enter(node.fun_name)
+        try:
+            return super().call(node, ar)
+        finally:
+            self.leave()
+
+    def memo_hit(self, node, value):
+        # still a call of the function, one that only takes the lookup
+        self.enter(node.fun_name)
+        self.leave()
+        return value
+
+    def report(self, limit=None):
+        rows = sorted(
+            self.functions.items(), key=lambda item: item[1].exclusive, reverse=True
+        )[:limit]
+        lines = [
+            f'{"calls":>12}{"exclusive":>12}{"per call":>12}'
+            f'{"inclusive":>12}{"per call":>12}  function'
+        ]
+        for name, stats in rows:
+            calls = str(stats.calls)
+            if stats.primitive_calls != stats.calls:
+                calls = f'{stats.calls}/{stats.primitive_calls}'
+            lines.append(
+                f'{calls:>12}{stats.exclusive:>12.6f}'
+                f'{stats.exclusive / stats.calls:>12.6f}'
+                f'{stats.inclusive:>12.6f}'
+                f'{stats.inclusive / max(stats.primitive_calls, 1):>12.6f}  {name}'
+            )
+        lines.append('')
+        lines.append(f'{"calls":>12}{"inclusive":>12}  caller -> callee')
+        edges = sorted(
+            self.edges.items(), key=lambda item: item[1].inclusive, reverse=True
+        )[:limit]
+        for (caller, callee), stats in edges:
+            lines.append(f'{stats.calls:>12}{stats.inclusive:>12.6f}  {caller} -> {callee}')
+        return '\n'.join(lines)
+
+    def pstats(self):
+        # the layout pstats.Stats loads: {function: (cc, nc, tt, ct, callers)}
+        # with functions named by (filename, line, name)
+        def key(name):
+            return (self.filename, 0, name)
+
+        callers = {name: {} for name in self.functions}
+        for (caller, callee), stats in self.edges.items():
+            callers[callee][key(caller)] = stats.pstats_entry()
+        return {
+            key(name): stats.pstats_entry() + (callers[name],)
+            for name, stats in self.functions.items()
+        }
+
+    def dump_stats(self, path):
+        with open(path, 'wb') as f:
+            marshal.dump(self.pstats(), f)
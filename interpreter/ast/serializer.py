@@ -0,0 +1,400 @@
+import re
+import struct
+import sys
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Token
+from interpreter.ast.objects import (
+    BinOpNode,
+    FactorNode,
+    UnaryOpNode,
+    AssignNode,
+    NoOpNode,
+    VarNode,
+    BlockNode,
+    FunctionDeclarationNode,
+    ParamNode,
+    TypeNode,
+    VarDeclarationNode,
+    ProgramNode,
+    FunctionCallNode,
+    ConditionalOpNode,
+    ReturnNode,
+    fit_recursion_limit,
+    iter_child_nodes,
+)
+
+# Binary form of a parsed program:
+#
+#   MAGIC
+#   string table:   count, then (byte length, UTF-8 bytes) per string
+#   constant pool:  count, then (kind, payload) per constant
+#   nodes:          count, then one record per node in postorder
+#
+# Every integer is an unsigned LEB128 varint (signed ones zigzag encoded)
+# and floats are 8-byte IEEE doubles. A node record is its tag followed by
+# its operands; its children were written before it, so the loader pops them
+# from a stack and never recurses. A token is (type, value, line, column):
+# its value is 0 when it equals the type's own value (operators, keywords)
+# or else 1 + its index in the constant pool. Lines are stored as the
+# difference to the previous token's line (zigzag encoded, plus one) and
+# columns as they are; 0 stands for an unknown position.
+# Only what the parser produces is written: load() returns a tree for
+# SemanticAnalyser, as Analyser.parse() does.
+
+MAGIC = b'NSB\x03'
+BINARY_SUFFIX = '.nsb'
+
+TOKEN_TYPES = list(Tk)
+TOKEN_VALUES = [token_type.value for token_type in TOKEN_TYPES]
+TOKEN_TYPE_INDEX = {token_type: index for index, token_type in enumerate(TOKEN_TYPES)}
+
+(PROGRAM, FUNCTION_DECLARATION, FUNCTION_CALL, BLOCK, TYPE, BIN_OP, FACTOR,
+ UNARY_OP, ASSIGN, VAR_DECLARATION, VAR_DECLARATION_ASSIGN, VAR, NO_OP,
+ PARAM, CONDITIONAL_OP, RETURN, RETURN_VALUE) = range(17)
+
+NODE_TAGS = {
+    ProgramNode: PROGRAM,
+    FunctionDeclarationNode: FUNCTION_DECLARATION,
+    FunctionCallNode: FUNCTION_CALL,
+    BlockNode: BLOCK,
+    TypeNode: TYPE,
+    BinOpNode: BIN_OP,
+    FactorNode: FACTOR,
+    UnaryOpNode: UNARY_OP,
+    AssignNode: ASSIGN,
+    VarDeclarationNode: VAR_DECLARATION,
+    VarNode: VAR,
+    NoOpNode: NO_OP,
+    ParamNode: PARAM,
+    ConditionalOpNode: CONDITIONAL_OP,
+    ReturnNode: RETURN,
+}
+
+CONST_INT, CONST_FLOAT, CONST_STR, CONST_TRUE, CONST_FALSE, CONST_NONE = range(6)
+
+_DOUBLE = struct.Struct('<d')
+_CONTINUATION_BYTE = re.compile(rb'[\x80-\xff]')
+_MULTI_BYTE_VARINT = re.compile(rb'[\x80-\xff]+[\x00-\x7f]')
+
+
+class SerializationError(Exception):
+    pass
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varints(data, pos):
+    # Most operands fit in one byte: runs of those are copied as ints in one
+    # go and only the multi-byte varints between them are decoded here.
+    ints = []
+    for match in _MULTI_BYTE_VARINT.finditer(data, pos):
+        ints.extend(data[pos:match.start()])
+        value = 0
+        for shift, byte in enumerate(match.group()):
+            value |= (byte & 0x7f) << 7 * shift
+        ints.append(value)
+        pos = match.end()
+    if _CONTINUATION_BYTE.search(data, pos):
+        raise ValueError('truncated varint')
+    ints.extend(data[pos:])
+    return ints
+
+
+class ASTWriter:
+    def __init__(self):
+        self.strings = {}
+        self.constants = {}
+        self.nodes = bytearray()
+        self.count = 0
+        self.lineno = 1
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def constant(self, value):
+        # keyed with the type, so that 1, 1.0 and True stay apart
+        key = (type(value), value)
+        index = self.constants.get(key)
+        if index is None:
+            if isinstance(value, str):
+                self.string(value)
+            elif value is not None and not isinstance(value, (bool, int, float)):
+                raise SerializationError(f'Cannot serialize constant {value!r}')
+            index = self.constants[key] = len(self.constants)
+        return index
+
+    def token(self, token):
+        out = self.nodes
+        _write_varint(out, TOKEN_TYPE_INDEX[token.type])
+        if token.value == token.type.value and isinstance(token.value, str):
+            out.append(0)
+        else:
+            _write_varint(out, self.constant(token.value) + 1)
+        lineno = token.lineno
+        if lineno is None:
+            out.append(0)
+        else:
+            delta = lineno - self.lineno
+            self.lineno = lineno
+            _write_varint(out, (delta << 1 if delta >= 0 else (-delta << 1) - 1) + 1)
+        _write_varint(out, token.column or 0)
+
+    def write(self, program):
+        # iterative postorder: a node is written once all of its children are
+        stack = [(program, False)]
+        while stack:
+            node, children_written = stack.pop()
+            if children_written:
+                self.node(node)
+                continue
+            stack.append((node, True))
+            children = list(iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, False) for child in children)
+        return self
+
+    def node(self, node):
+        out = self.nodes
+        self.count += 1
+        tag = NODE_TAGS.get(type(node))
+        if tag is None:
+            raise SerializationError(f'Cannot serialize {type(node).__name__}')
+        if tag == VAR_DECLARATION and node.assign_node is not None:
+            tag = VAR_DECLARATION_ASSIGN
+        elif tag == RETURN and node.expr is not None:
+            tag = RETURN_VALUE
+        out.append(tag)
+        if tag == PROGRAM:
+            _write_varint(out, len(node.utils))
+            _write_varint(out, node.nesting)
+        elif tag == FUNCTION_DECLARATION:
+            _write_varint(out, self.string(node.fun_name))
+            _write_varint(out, len(node.formal_params))
+        elif tag == FUNCTION_CALL:
+            _write_varint(out, self.string(node.fun_name))
+            _write_varint(out, len(node.actual_params))
+            self.token(node.token)
+        elif tag == BLOCK:
+            _write_varint(out, len(node.statements))
+        elif tag in (TYPE, FACTOR, VAR, RETURN, RETURN_VALUE):
+            self.token(node.token)
+        elif tag in (BIN_OP, UNARY_OP, ASSIGN):
+            self.token(node.op)
+
+    def getvalue(self):
+        out = bytearray(MAGIC)
+        _write_varint(out, len(self.strings))
+        for value in self.strings:
+            encoded = value.encode('utf-8', 'surrogatepass')
+            _write_varint(out, len(encoded))
+            out += encoded
+        _write_varint(out, len(self.constants))
+        for value_type, value in self.constants:
+            if value_type is str:
+                out.append(CONST_STR)
+                _write_varint(out, self.strings[value])
+            elif value is None:
+                out.append(CONST_NONE)
+            elif value_type is bool:
+                out.append(CONST_TRUE if value else CONST_FALSE)
+            elif value_type is float:
+                out.append(CONST_FLOAT)
+                out += _DOUBLE.pack(value)
+            else:
+                out.append(CONST_INT)
+                _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        _write_varint(out, self.count)
+        out += self.nodes
+        return bytes(out)
+
+
+class ASTReader:
+    def __init__(self, data):
+        if not data.startswith(MAGIC):
+            raise SerializationError('Not a serialized program')
+        self.data = data
+        self.pos = len(MAGIC)
+        self.strings = None
+        self.constants = None
+        self.stack = None
+
+    def varint(self):
+        data = self.data
+        pos = self.pos
+        byte = data[pos]
+        pos += 1
+        if byte < 0x80:
+            self.pos = pos
+            return byte
+        value = byte & 0x7f
+        shift = 7
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return value
+            shift += 7
+
+    def read(self):
+        try:
+            return self._read()
+        except (IndexError, KeyError, ValueError, StopIteration, struct.error) as e:
+            raise SerializationError(f'Corrupt serialized program: {e!r}')
+
+    def _read(self):
+        data = self.data
+        varint = self.varint
+
+        strings = self.strings = []
+        for _ in range(varint()):
+            length = varint()
+            end = self.pos + length
+            if end > len(data):
+                raise ValueError('string table overruns the data')
+            strings.append(sys.intern(bytes(data[self.pos:end]).decode('utf-8', 'surrogatepass')))
+            self.pos = end
+
+        constants = self.constants = []
+        for _ in range(varint()):
+            kind = data[self.pos]
+            self.pos += 1
+            if kind == CONST_INT:
+                value = varint()
+                constants.append(-(value + 1 >> 1) if value & 1 else value >> 1)
+            elif kind == CONST_FLOAT:
+                constants.append(_DOUBLE.unpack_from(data, self.pos)[0])
+                self.pos += _DOUBLE.size
+            elif kind == CONST_STR:
+                constants.append(strings[varint()])
+            elif kind == CONST_TRUE:
+                constants.append(True)
+            elif kind == CONST_FALSE:
+                constants.append(False)
+            elif kind == CONST_NONE:
+                constants.append(None)
+            else:
+                raise ValueError(f'unknown constant kind {kind}')
+
+        # the node records are all varints: decode them in one pass and read
+        # them back as a plain iterator
+        ints = _decode_varints(data, self.pos)
+        operands = iter(ints)
+        next_int = operands.__next__
+        lineno = 1
+
+        def token():
+            nonlocal lineno
+            type_index = next_int()
+            value = next_int()
+            value = TOKEN_VALUES[type_index] if value == 0 else constants[value - 1]
+            line = next_int()
+            if line:
+                line -= 1
+                lineno += -(line + 1 >> 1) if line & 1 else line >> 1
+                line = lineno
+            else:
+                line = None
+            return Token(TOKEN_TYPES[type_index], value, line, next_int() or None)
+
+        stack = self.stack = []
+        push = stack.append
+        pop = stack.pop
+        pop_many = self.pop_many
+        for _ in range(next_int()):
+            tag = next_int()
+            if tag == VAR:
+                push(VarNode(token()))
+            elif tag == FACTOR:
+                push(FactorNode(token()))
+            elif tag == BIN_OP:
+                right = pop()
+                push(BinOpNode(pop(), token(), right))
+            elif tag == ASSIGN:
+                right = pop()
+                push(AssignNode(pop(), token(), right))
+            elif tag == UNARY_OP:
+                push(UnaryOpNode(token(), pop()))
+            elif tag == TYPE:
+                push(TypeNode(token()))
+            elif tag == VAR_DECLARATION:
+                type_node = pop()
+                push(VarDeclarationNode(pop(), type_node))
+            elif tag == VAR_DECLARATION_ASSIGN:
+                assign_node = pop()
+                type_node = pop()
+                push(VarDeclarationNode(pop(), type_node, assign_node))
+            elif tag == BLOCK:
+                push(BlockNode(pop_many(next_int())))
+            elif tag == FUNCTION_CALL:
+                fun_name = strings[next_int()]
+                actual_params = pop_many(next_int())
+                push(FunctionCallNode(fun_name, actual_params, token()))
+            elif tag == CONDITIONAL_OP:
+                block_node = pop()
+                push(ConditionalOpNode(pop(), block_node))
+            elif tag == NO_OP:
+                push(NoOpNode())
+            elif tag == RETURN:
+                push(ReturnNode(token()))
+            elif tag == RETURN_VALUE:
+                push(ReturnNode(token(), pop()))
+            elif tag == PARAM:
+                type_node = pop()
+                push(ParamNode(pop(), type_node))
+            elif tag == FUNCTION_DECLARATION:
+                fun_name = strings[next_int()]
+                block_node = pop()
+                formal_params = pop_many(next_int())
+                push(FunctionDeclarationNode(fun_name, formal_params, block_node))
+            elif tag == PROGRAM:
+                utils = pop_many(next_int())
+                nesting = next_int()
+                # the tree was not parsed here, so the parser did not
+                # make room for it
+                fit_recursion_limit(nesting)
+                push(ProgramNode(init_block=pop(), utils=utils, nesting=nesting))
+            else:
+                raise ValueError(f'unknown node tag {tag}')
+
+        if next(operands, None) is not None:
+            raise ValueError('trailing data')
+        if len(stack) != 1 or not isinstance(stack[0], ProgramNode):
+            raise ValueError('unbalanced nodes')
+        return stack[0]
+
+    def pop_many(self, count):
+        stack = self.stack
+        if count > len(stack):
+            raise ValueError('node stack underflow')
+        if count == 0:
+            return []
+        nodes = stack[-count:]
+        del stack[-count:]
+        return nodes
+
+
+def dumps(program):
+    return ASTWriter().write(program).getvalue()
+
+
+def loads(data):
+    return ASTReader(data).read()
+
+
+def dump(program, file):
+    file.write(dumps(program))
+
+
+def load(file):
+    return loads(file.read())
@@ -1,15 +1,43 @@
+from functools import reduce
+
 from interpreter.ast.visitor import NodeVisitor
 from interpreter.exceptions import SemanticError, ErrorCode
+from interpreter.events import EventHooks, SCOPE_OPEN, SCOPE_CLOSE
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.operators import (
+    BINARY_OPERATORS,
+    UNARY_OPERATORS,
+    FLOAT,
+    INT,
+    NON,
+    LITERAL_TYPES,
+    NATURAL_LITERALS,
+    SPECIALIZED_BINARY,
+    SPECIALIZED_UNARY,
+    assignable,
+    join,
+)
+
+# the type of a recursive call made before any return of its function was
+# analysed; the body is analysed again once the return type is known
+PENDING = 'PENDING'
+# analyses of one function body before its return type must have settled:
+# each one after the first widens it
+MAX_FUNCTION_ANALYSES = 5
+# operators giving a number that is not negative from two that are not
+NATURAL_OPERATORS = (Tk.PLUS, Tk.MUL, Tk.EXPONENT, Tk.FLOORDIV, Tk.MOD, Tk.AND, Tk.OR)
 
 class Symbol(object):
+    __slots__ = ('name', 'type', 'scope_level')
+
     def __init__(self, name, type=None):
         self.name = name
         self.type = type
         self.scope_level = 0
 
-_SHOULD_LOG_SCOPE = False
-
 class BuiltinTypeSymbol(Symbol):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
@@ -20,20 +48,37 @@ class BuiltinTypeSymbol(Symbol):
 
 
 class VarSymbol(Symbol):
+    __slots__ = ('slot',)
+
     def __init__(self, name, type):
         super().__init__(name, type)
+        # index into the slots of the activation record of its scope
+        self.slot = None
 
     def __str__(self):
         return '<{name}:{type}>'.format(name=self.name, type=self.type)
 
     __repr__ = __str__
 
+    @property
+    def type_name(self):
+        # the static type of the variable, None when it is not declared
+        return None if self.type is None else self.type.name
+
 
 class FunctionSymbol(Symbol):
+    __slots__ = ('formal_params', 'block_ast', 'scope', 'pure', 'return_type')
+
     def __init__(self, name, formal_params=None):
         super(FunctionSymbol, self).__init__(name)
         self.formal_params = [] if formal_params is None else formal_params
         self.block_ast = None
+        self.scope = None
+        # no effect beyond its result: it only touches its own record and
+        # only calls pure functions (set by SemanticAnalyser)
+        self.pure = True
+        # static type of its result, None if it may not return a value
+        self.return_type = None
 
     def __str__(self):
         return '<{class_name}(name={name}, params={params} block_ast={block_ast})>'.format(
@@ -49,6 +94,7 @@ class FunctionSymbol(Symbol):
 class ScopedSymbolTable(object):
     def __init__(self, scope_name, scope_level, enclosing_scope=None):
         self._symbols = {}
+        self.slot_names = []
         self.scope_name = scope_name
         self.scope_level = scope_level
         self.enclosing_scope = enclosing_scope
@@ -85,37 +131,50 @@ class ScopedSymbolTable(object):
 
     __repr__ = __str__
 
-    def log(self, msg):
-        if _SHOULD_LOG_SCOPE:
-            print(msg)
-
     def insert(self, symbol):
         # print('Insert: %s' % symbol)
         symbol.scope_level = self.scope_level
+        if isinstance(symbol, VarSymbol):
+            symbol.slot = len(self.slot_names)
+            self.slot_names.append(symbol.name)
         self._symbols[symbol.name] = symbol
 
     def lookup(self, name, current_scope_only=False):
         # print('Lookup: %s. (Scope name: %s)' % (name, self.scope_name))
-        symbol = self._symbols.get(name)
-        if symbol is not None:
-            return symbol
-        if current_scope_only:
-            return None
-        if self.enclosing_scope is not None:
-            return self.enclosing_scope.lookup(name)
+        scope = self
+        while scope is not None:
+            symbol = scope._symbols.get(name)
+            if symbol is not None:
+                return symbol
+            if current_scope_only:
+                return None
+            scope = scope.enclosing_scope
+        return None
 
 
 class SemanticAnalyser(NodeVisitor):
-    def __init__(self, tree):
+    # Visiting an expression returns its static type (see operators.py), and
+    # operator nodes get the function specialized for their operand types.
+    def __init__(self, tree, hooks=None):
         self.tree = tree
+        self.hooks = hooks if hooks is not None else EventHooks()
         self.current_scope = ScopedSymbolTable('init', scope_level=0)
+        # the FunctionSymbol whose body is being visited, None in main
+        self.current_function = None
+        # for that body: the types of its return statements so far, the
+        # (type, token) of its recursive calls, whether a return statement
+        # always runs by the current point, and whether the return type is
+        # assumed from an earlier analysis of the body
+        self.return_types = []
+        self.recursive_calls = []
+        self.returned = False
+        self.assumed = False
+        # whether the expression visited last can only be a number that is
+        # not negative: it is made of literals by NATURAL_OPERATORS
+        self.natural = False
 
     def run(self):
         return self.visit(self.tree)
-    
-    def log(self, msg):
-        if _SHOULD_LOG_SCOPE:
-            print(msg)
 
     def error(self, error_code, token):
         raise SemanticError(
@@ -125,33 +184,72 @@ class SemanticAnalyser(NodeVisitor):
         )
 
     def visit_ProgramNode(self, node):
-        self.log('ENTER scope: global')
         scope = ScopedSymbolTable(
             scope_name='global',
             scope_level=1,
             enclosing_scope=self.current_scope
         )
         self.current_scope = scope
+        if self.hooks.scope_open:
+            self.hooks.emit(SCOPE_OPEN, scope)
+        # accessed by the interpreter to size and print the main record
+        node.scope = scope
 
         for util in node.utils:
             self.visit(util)
         self.visit(node.init_block)
+        if self.hooks.scope_close:
+            self.hooks.emit(SCOPE_CLOSE, scope)
         self.current_scope = self.current_scope.enclosing_scope
-        self.log('LEAVE scope: global')
 
     def visit_BlockNode(self, node):
         for statement in node.statements:
             self.visit(statement)
 
+    def check_assignable(self, target, value, token):
+        # a pending call is checked when the body is analysed again
+        if value != PENDING and not assignable(target, value):
+            self.error(error_code=ErrorCode.TYPE_MISMATCH, token=token)
+
     def visit_BinOpNode(self, node):
-        self.visit(node.left)
-        self.visit(node.right)
+        op_type = node.op.type
+        left = self.visit(node.left)
+        left_natural = self.natural
+        right = self.visit(node.right)
+        right_natural = self.natural
+        self.natural = False
+        if PENDING in (left, right):
+            node.op_fn = BINARY_OPERATORS.get(op_type)
+            return PENDING
+        specialized = SPECIALIZED_BINARY.get((op_type, left, right))
+        if specialized is None:
+            self.error(error_code=ErrorCode.TYPE_MISMATCH, token=node.op)
+        node.op_fn, result = specialized
+        if op_type == Tk.EXPONENT and right_natural and left != FLOAT:
+            # an int to a power that cannot be negative stays an int
+            result = INT
+        self.natural = (
+            left_natural and right_natural and op_type in NATURAL_OPERATORS
+            and result == INT
+        )
+        return result
 
     def visit_FactorNode(self, node):
-        pass
+        token_type = node.token.type
+        self.natural = token_type in NATURAL_LITERALS
+        return LITERAL_TYPES.get(token_type)
 
     def visit_UnaryOpNode(self, node):
-        self.visit(node.expr)
+        operand = self.visit(node.expr)
+        self.natural = False
+        if operand == PENDING:
+            node.op_fn = UNARY_OPERATORS[node.op.type]
+            return PENDING
+        specialized = SPECIALIZED_UNARY.get((node.op.type, operand))
+        if specialized is None:
+            self.error(error_code=ErrorCode.TYPE_MISMATCH, token=node.op)
+        node.op_fn, result = specialized
+        return result
 
     def visit_NoOpNode(self, node):
         pass
@@ -167,36 +265,92 @@ class SemanticAnalyser(NodeVisitor):
                 token=node.var_node.token,
             )
         self.current_scope.insert(var_symbol)
+        node.var_node.depth = var_symbol.scope_level
+        node.var_node.slot = var_symbol.slot
         if node.assign_node:
-            self.visit(node.assign_node)
+            self.check_assignable(
+                var_symbol.type_name,
+                self.visit(node.assign_node),
+                node.var_node.token,
+            )
+
 
+    def impure(self, var_symbol):
+        # a function that reaches a variable of an enclosing scope depends
+        # on (or changes) more than its arguments
+        function = self.current_function
+        if function is not None and var_symbol.scope_level <= function.scope_level:
+            function.pure = False
 
     def visit_AssignNode(self, node):
         var_name = node.left.value
         var_symbol = self.current_scope.lookup(var_name)
-        if var_symbol is None:
+        if not isinstance(var_symbol, VarSymbol):
             self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.token)
-        self.visit(node.right)
+        self.impure(var_symbol)
+        # (depth, slot) address used by the interpreter instead of the name
+        node.depth = var_symbol.scope_level
+        node.slot = var_symbol.slot
+        self.check_assignable(var_symbol.type_name, self.visit(node.right), node.token)
 
     def visit_VarNode(self, node):
         var_name = node.value
         var_symbol = self.current_scope.lookup(var_name)
-        if var_symbol is None:
+        if not isinstance(var_symbol, VarSymbol):
             self.error(error_code=ErrorCode.ID_NOT_FOUND, token=node.token)
+        self.impure(var_symbol)
+        node.depth = var_symbol.scope_level
+        node.slot = var_symbol.slot
+        self.natural = False
+        return var_symbol.type_name
+
+    def function_symbol(self, fun_name):
+        return FunctionSymbol(fun_name)
 
     def visit_FunctionDeclarationNode(self, node):
-        fun_name = node.fun_name
-        fun_symbol = FunctionSymbol(fun_name)
+        fun_symbol = self.function_symbol(node.fun_name)
         self.current_scope.insert(fun_symbol)
-
-        self.log(f'ENTER scope: {fun_name}')
+        enclosing_function = self.current_function
+        enclosing = (self.return_types, self.recursive_calls, self.returned, self.assumed)
+        self.current_function = fun_symbol
+        hooks = self.hooks
+
+        # A recursive call has the type of the returns analysed before it,
+        # PENDING before the first one. If that is not the return type found
+        # in the end, the body is analysed again with the calls assuming it.
+        fun_symbol.return_type = PENDING
+        self.assumed = False
+        for _ in range(MAX_FUNCTION_ANALYSES):
+            return_type = self.function_body(node, fun_symbol)
+            if all(call_type == return_type for call_type, _ in self.recursive_calls):
+                break
+            fun_symbol.return_type = return_type
+            fun_symbol.formal_params = []
+            fun_symbol.pure = True
+            self.assumed = True
+            # the scopes were reported by the first analysis
+            self.hooks = EventHooks()
+        else:
+            for call_type, token in self.recursive_calls:
+                if call_type != return_type:
+                    self.error(ErrorCode.TYPE_MISMATCH, token)
+        fun_symbol.return_type = return_type
+
+        self.hooks = hooks
+        self.current_function = enclosing_function
+        self.return_types, self.recursive_calls, self.returned, self.assumed = enclosing
+
+    def function_body(self, node, fun_symbol):
         # Scope for parameters and local variables
         function_scope = ScopedSymbolTable(
-            scope_name=fun_name,
+            scope_name=fun_symbol.name,
             scope_level=self.current_scope.scope_level + 1,
             enclosing_scope=self.current_scope
         )
         self.current_scope = function_scope
+        self.return_types, self.recursive_calls, self.returned = [], [], False
+        if self.hooks.scope_open:
+            self.hooks.emit(SCOPE_OPEN, function_scope)
 
         # Insert parameters into the function scope
         for param in node.formal_params:
@@ -207,14 +361,21 @@ class SemanticAnalyser(NodeVisitor):
             fun_symbol.formal_params.append(var_symbol)
 
         self.visit(node.block_node)
-
-        self.log(function_scope)
-
+        if not self.returned:
+            # the end of the body can be reached, giving no value
+            self.return_types.append(NON)
+        # the returns of pending calls only repeat the others
+        return_types = [t for t in self.return_types if t != PENDING]
+        return_type = reduce(join, return_types) if return_types else None
+
+        if self.hooks.scope_close:
+            self.hooks.emit(SCOPE_CLOSE, function_scope)
         self.current_scope = self.current_scope.enclosing_scope
-        self.log(f'LEAVE scope: {fun_name}')
 
         # accessed by the interpreter when executing function call
         fun_symbol.block_ast = node.block_node
+        fun_symbol.scope = function_scope
+        return return_type
         
     def visit_FunctionCallNode(self, node):
         function = self.current_scope.lookup(node.fun_name)
@@ -223,14 +384,36 @@ class SemanticAnalyser(NodeVisitor):
 
         if len(function.formal_params) != len(node.actual_params):
             raise self.error(ErrorCode.UNEXPECTED_TOKEN, node.token)
-        for param_node in node.actual_params:
-            self.visit(param_node)
+        for param_symbol, param_node in zip(function.formal_params, node.actual_params):
+            self.check_assignable(param_symbol.type_name, self.visit(param_node), param_node.token)
         fun_symbol = self.current_scope.lookup(node.fun_name)
         # accessed by the interpreter when executing function call
         node.fun_symbol = fun_symbol
+        # a recursive call is made while the symbol is still assumed pure,
+        # which holds unless the rest of the body says otherwise
+        if not fun_symbol.pure and self.current_function is not None:
+            self.current_function.pure = False
+        # and likewise typed with the returns seen so far
+        if fun_symbol is self.current_function:
+            self.recursive_calls.append((fun_symbol.return_type, node.token))
+        self.natural = False
+        return fun_symbol.return_type
+
+    def visit_ReturnNode(self, node):
+        value_type = NON if node.expr is None else self.visit(node.expr)
+        function = self.current_function
+        if function is not None:
+            self.return_types.append(value_type)
+            self.returned = True
+            if not self.assumed and value_type != PENDING:
+                returned = [t for t in self.return_types if t != PENDING]
+                function.return_type = reduce(join, returned)
     
     def visit_ConditionalOpNode(self, node):
         self.visit(node.condition_expr)
+        # the block may not run
+        returned = self.returned
         self.visit(node.block_node)
+        self.returned = returned
 
 
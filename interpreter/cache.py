@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from interpreter.ast.objects import fit_recursion_limit
+
+# Bump when the layout of cached programs changes in a way the interpreter
+# fingerprint below would not notice.
+CACHE_VERSION = 1
+MAGIC = b'NSC\x00'
+CACHE_DIRNAME = '__nscache__'
+CACHE_SUFFIX = '.nsc'
+# Pickling recurses in C for every level of the tree. Under the limits the
+# parser sets for deep expressions it would overflow the C stack, so such
+# programs are pickled under this one, and are not cached if it is too low.
+PICKLE_RECURSION_LIMIT = 10000
+
+
+def interpreter_fingerprint():
+    # Cached programs are pickled node and symbol objects, so any change to
+    # the interpreter sources must invalidate them.
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    digest.update(f'{CACHE_VERSION}:{sys.implementation.cache_tag}'.encode())
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            if name.endswith('.py'):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.digest()
+
+
+class ProgramCache:
+    def __init__(self, source_path, cache_dir=None, lexer='char'):
+        # lexers differ in their token classes and column units, so a
+        # program cached under one is not reused by another
+        self.lexer = lexer
+        source_path = os.path.abspath(source_path)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(source_path), CACHE_DIRNAME)
+        self.cache_dir = cache_dir
+        # a --cache-dir is shared by sources from many directories, so the
+        # name tells apart files with the same base name
+        location = hashlib.sha256(os.fsencode(source_path)).hexdigest()[:16]
+        self.path = os.path.join(
+            cache_dir,
+            f'{os.path.basename(source_path)}.{location}.{sys.implementation.cache_tag}{CACHE_SUFFIX}',
+        )
+        self._fingerprint = None
+        try:
+            self.mode = os.stat(source_path).st_mode & 0o666
+        except OSError:
+            self.mode = 0o644
+
+    def key(self, text):
+        if self._fingerprint is None:
+            self._fingerprint = interpreter_fingerprint()
+        digest = hashlib.sha256(self._fingerprint)
+        digest.update(f'{self.lexer};'.encode())
+        # the source as text or, from the mmap lexer, as the mapped bytes
+        digest.update(text.encode() if isinstance(text, str) else text)
+        return digest.digest()
+
+    def load(self, text):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        header = MAGIC + self.key(text)
+        if not data.startswith(header):
+            return None
+        try:
+            program = pickle.loads(data[len(header):])
+        except Exception:
+            # unreadable entry: treat as a miss, the next store replaces it
+            return None
+        fit_recursion_limit(program.nesting)
+        return program
+
+    def store(self, text, program):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(min(limit, PICKLE_RECURSION_LIMIT))
+        try:
+            payload = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            return False
+        finally:
+            sys.setrecursionlimit(limit)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a private temporary file and rename it over the entry,
+            # so concurrent launches only ever see a complete file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(MAGIC + self.key(text))
+                    f.write(payload)
+                os.chmod(tmp_path, self.mode)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            return False
+        return True
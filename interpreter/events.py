@@ -0,0 +1,83 @@
+import sys
+
+CALL_ENTER = 'call-enter'
+CALL_LEAVE = 'call-leave'
+ASSIGN = 'assign'
+BRANCH_TAKEN = 'branch-taken'
+SCOPE_OPEN = 'scope-open'
+SCOPE_CLOSE = 'scope-close'
+
+EVENTS = (CALL_ENTER, CALL_LEAVE, ASSIGN, BRANCH_TAKEN, SCOPE_OPEN, SCOPE_CLOSE)
+
+
+class EventHooks:
+    # Subscribers per event, kept as one list attribute per event so that an
+    # emitter can test `if hooks.assign:` and skip building the event
+    # arguments altogether when nobody listens. Callbacks receive:
+    #   call-enter, call-leave: (ar, call_stack)
+    #   assign:                 (ar, name, value)
+    #   branch-taken:           (ar, node)
+    #   scope-open, scope-close: (scope)
+    def __init__(self):
+        self.call_enter = []
+        self.call_leave = []
+        self.assign = []
+        self.branch_taken = []
+        self.scope_open = []
+        self.scope_close = []
+
+    def _subscribers(self, event):
+        if event not in EVENTS:
+            raise ValueError(f'Unknown event {event!r}')
+        return getattr(self, event.replace('-', '_'))
+
+    def subscribe(self, event, callback):
+        self._subscribers(event).append(callback)
+        return callback
+
+    def unsubscribe(self, event, callback):
+        self._subscribers(event).remove(callback)
+
+    def emit(self, event, *args):
+        for callback in self._subscribers(event):
+            callback(*args)
+
+    def __bool__(self):
+        return any(self._subscribers(event) for event in EVENTS)
+
+    def watch_execution(self):
+        # whether any event emitted while the program runs has subscribers
+        return bool(self.call_enter or self.call_leave or self.assign or self.branch_taken)
+
+
+def _ar_label(ar):
+    if ar.nesting_level == 1:
+        return ar.name
+    return f'{ar.type.value} {ar.name}'
+
+
+def print_stack(hooks, file=sys.stdout):
+    # the call stack dump of --stack
+    def enter(ar, call_stack):
+        print(f'ENTER: {_ar_label(ar)}', file=file)
+        print(call_stack, file=file)
+
+    def leave(ar, call_stack):
+        print(f'LEAVE: {_ar_label(ar)}', file=file)
+        print(call_stack, file=file)
+
+    hooks.subscribe(CALL_ENTER, enter)
+    hooks.subscribe(CALL_LEAVE, leave)
+
+
+def print_scopes(hooks, file=sys.stdout):
+    # the symbol table dump of --scope
+    def open_scope(scope):
+        print(f'ENTER scope: {scope.scope_name}', file=file)
+
+    def close_scope(scope):
+        print(scope, file=file)
+        print(f'LEAVE scope: {scope.scope_name}', file=file)
+
+    hooks.subscribe(SCOPE_OPEN, open_scope)
+    hooks.subscribe(SCOPE_CLOSE, close_scope)
@@ -4,6 +4,7 @@ class ErrorCode(Enum):
     UNEXPECTED_TOKEN = 'Unexpected token'
     ID_NOT_FOUND     = 'Identifier not found'
     DUPLICATE_ID     = 'Duplicate id found'
+    TYPE_MISMATCH    = 'Type mismatch'
 
 class Error(Exception):
     def __init__(self, error_code=None, token=None, message=None):
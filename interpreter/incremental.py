@@ -0,0 +1,279 @@
+from bisect import bisect_right
+import hashlib
+import re
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Lexer
+from interpreter.analyser import Analyser
+from interpreter.ast.objects import BlockNode, FunctionCallNode, ProgramNode, walk
+from interpreter.ast.symbol import (
+    FunctionSymbol,
+    ScopedSymbolTable,
+    SemanticAnalyser,
+    VarSymbol,
+)
+
+# 'fun' as a whole word; the lookbehind sits after the first letter so that
+# it is only tried where an 'f' was found
+_FUN_KEYWORD = re.compile(r'[fF](?<![\w-].)[uU][nN](?![\w-])')
+
+
+def skipped_ranges(text):
+    # (start, end) of every string and comment, found with str.find
+    ranges = []
+    next_quote = text.find("'")
+    next_brace = text.find('{')
+    while next_quote != -1 or next_brace != -1:
+        if next_brace == -1 or next_quote != -1 and next_quote < next_brace:
+            start, close = next_quote, "'"
+        else:
+            start, close = next_brace, '}'
+        end = text.find(close, start + 1)
+        end = len(text) if end == -1 else end + 1
+        ranges.append((start, end))
+        if next_quote != -1 and next_quote < end:
+            next_quote = text.find("'", end)
+        if next_brace != -1 and next_brace < end:
+            next_brace = text.find('{', end)
+    return ranges
+
+
+def split_functions(text):
+    # -> (prefix, [(start, lineno, chunk)]), one chunk per declaration from
+    # its 'fun' keyword up to the next one
+    ranges = skipped_ranges(text)
+    range_starts = [start for start, end in ranges]
+    starts = []
+    for match in _FUN_KEYWORD.finditer(text):
+        start = match.start()
+        index = bisect_right(range_starts, start) - 1
+        if index < 0 or ranges[index][1] <= start:
+            starts.append(start)
+    if not starts:
+        return text, []
+    chunks = []
+    lineno = 1
+    previous = 0
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        lineno += text.count('\n', previous, start)
+        previous = start
+        chunks.append((start, lineno, text[start:end]))
+    return text[:starts[0]], chunks
+
+
+def parameter_types(fun_symbol):
+    return tuple(param.type_name for param in fun_symbol.formal_params)
+
+
+class FunctionUnit:
+    def __init__(self, fingerprint, node, lineno, lines=None):
+        self.fingerprint = fingerprint
+        self.node = node
+        # first line of the declaration, and the LineTable its tokens take
+        # their positions from (None for lexers whose tokens store lines)
+        self.lineno = lineno
+        self.lines = lines
+        # callee name -> (parameter types, pure) when this unit was analysed
+        self.callees = None
+        # main only: the variables it declares in the global scope
+        self.variables = None
+
+    @property
+    def name(self):
+        return self.node.fun_name
+
+    def move(self, lineno):
+        # the same text further up or down the source: its tokens keep
+        # their columns, and their lines shift with it
+        delta = lineno - self.lineno
+        if not delta:
+            return
+        self.lineno = lineno
+        if self.lines is not None:
+            self.lines.first_line += delta
+            return
+        tokens = {}
+        for node in walk(self.node):
+            token = getattr(node, 'token', None)
+            if token is not None and token.lineno is not None:
+                tokens[id(token)] = token
+        for token in tokens.values():
+            token.lineno += delta
+
+    def record_callees(self):
+        self.callees = {
+            node.fun_name: (
+                parameter_types(node.fun_symbol),
+                node.fun_symbol.pure,
+                node.fun_symbol.return_type,
+            )
+            for node in walk(self.node.block_node)
+            if isinstance(node, FunctionCallNode)
+        }
+
+
+class IncrementalSemanticAnalyser(SemanticAnalyser):
+    # Re-declaring a function updates its existing symbol in place, so the
+    # call nodes of functions that are not re-analysed stay valid.
+    def __init__(self, symbols, hooks=None):
+        super().__init__(None, hooks)
+        self.symbols = symbols
+
+    def function_symbol(self, fun_name):
+        fun_symbol = self.symbols.get(fun_name)
+        if fun_symbol is None:
+            fun_symbol = self.symbols[fun_name] = FunctionSymbol(fun_name)
+        else:
+            fun_symbol.formal_params = []
+            fun_symbol.pure = True
+            fun_symbol.return_type = None
+        return fun_symbol
+
+
+class IncrementalProgram:
+    # Keeps the analysed program between edits of its source. update() only
+    # re-lexes and re-parses the declarations whose text changed, and only
+    # re-analyses those plus the functions whose calls they may invalidate.
+    # Unchanged declarations keep the token positions they were parsed with.
+    def __init__(self, lexer_class=Lexer, hooks=None):
+        self.lexer_class = lexer_class
+        self.hooks = hooks
+        self.reset()
+
+    def reset(self):
+        self.units = {}
+        self.symbols = {}
+        self.builtins = None
+        self.global_scope = None
+        self.program = None
+        self.reparsed = 0
+        self.reanalysed = 0
+
+    def update(self, text):
+        self.reparsed = self.reanalysed = 0
+        prefix, chunks = split_functions(text)
+        if not chunks or prefix and self.lexer_class(prefix).current_token.type != Tk.EOF:
+            return self.full_analysis(text)
+
+        units = []
+        seen = set()
+        dirty = set()
+        for start, lineno, chunk in chunks:
+            fingerprint = hashlib.sha1(chunk.encode()).digest()
+            unit = self.units.get(fingerprint)
+            if unit is None or fingerprint in seen:
+                unit = self.parse_unit(chunk, lineno, fingerprint)
+                # kept even if the update fails further on
+                self.units[fingerprint] = unit
+                dirty.add(unit)
+                self.reparsed += 1
+            else:
+                unit.move(lineno)
+            seen.add(fingerprint)
+            units.append(unit)
+
+        try:
+            program = self.analyse(text, units, dirty)
+        except Exception:
+            self.invalidate()
+            raise
+        self.units = {unit.fingerprint: unit for unit in units}
+        return program
+
+    def invalidate(self):
+        # a failed analysis may leave the shared symbols half updated, so the
+        # next update analyses every declaration again (but parses none)
+        for unit in self.units.values():
+            unit.callees = None
+            unit.variables = None
+
+    def parse_unit(self, chunk, lineno, fingerprint):
+        lexer = self.lexer_class(chunk, lineno)
+        analyser = Analyser(lexer)
+        node = analyser.function_declaration()
+        if lexer.current_token.type != Tk.EOF:
+            analyser.error(Tk.EOF, lexer.current_token.type)
+        return FunctionUnit(fingerprint, node, lineno, getattr(lexer, 'lines', None))
+
+    def full_analysis(self, text):
+        # for sources the incremental path does not handle; also reports
+        # syntax errors outside of any declaration
+        self.reset()
+        program = Analyser(self.lexer_class(text)).parse()
+        SemanticAnalyser(program, self.hooks).run()
+        self.program = program
+        return program
+
+    def analyse(self, text, units, dirty):
+        main = None
+        utils = []
+        for unit in units:
+            if unit.name.lower() == 'main':
+                if main is not None and main.node.block_node.statements:
+                    raise Exception('Two "main" functions is not permitted')
+                main = unit
+            else:
+                utils.append(unit)
+        names = [unit.name for unit in utils]
+        if len(set(names)) != len(names):
+            # symbols are reused by name, which redeclarations would share
+            return self.full_analysis(text)
+
+        if self.global_scope is None:
+            self.builtins = ScopedSymbolTable('init', scope_level=0)
+            self.global_scope = ScopedSymbolTable(
+                'global', scope_level=1, enclosing_scope=self.builtins,
+            )
+        scope = self.global_scope
+        # rebuilt in declaration order, so that lookups only see the
+        # functions declared before the one being checked
+        scope._symbols.clear()
+        scope.slot_names.clear()
+        self.symbols = {name: self.symbols[name] for name in names if name in self.symbols}
+        analyser = IncrementalSemanticAnalyser(self.symbols, self.hooks)
+
+        for unit in utils:
+            if unit in dirty or self.is_stale(unit):
+                analyser.current_scope = scope
+                analyser.visit(unit.node)
+                unit.record_callees()
+                self.reanalysed += 1
+            else:
+                scope.insert(self.symbols[unit.name])
+
+        init_block = main.node.block_node if main else BlockNode()
+        if main is None or main in dirty or main.variables is None or self.is_stale(main):
+            analyser.current_scope = scope
+            analyser.visit(init_block)
+            if main is not None:
+                main.record_callees()
+                main.variables = [
+                    symbol for symbol in scope._symbols.values()
+                    if isinstance(symbol, VarSymbol)
+                ]
+                self.reanalysed += 1
+        else:
+            for symbol in main.variables:
+                scope.insert(symbol)
+
+        program = ProgramNode(init_block=init_block, utils=[unit.node for unit in utils])
+        program.scope = scope
+        self.program = program
+        return program
+
+    def is_stale(self, unit):
+        # a callee that is no longer declared before the unit, or whose
+        # parameters, purity or return type changed, must be checked again
+        if unit.callees is None:
+            return True
+        for name, (param_types, pure, return_type) in unit.callees.items():
+            fun_symbol = self.global_scope.lookup(name)
+            if fun_symbol is None or fun_symbol is not self.symbols.get(name):
+                return True
+            if (
+                parameter_types(fun_symbol) != param_types
+                or fun_symbol.pure != pure
+                or fun_symbol.return_type != return_type
+            ):
+                return True
+        return False
@@ -2,6 +2,8 @@ from interpreter.tokens_type import TokenType as Tk
 from interpreter.exceptions import LexerError
 
 class Token():
+    __slots__ = ('type', 'value', 'lineno', 'column')
+
     def __init__(self, type, value, lineno=None, column=None):
         self.type = type
         self.value = value
@@ -32,12 +34,15 @@ def _build_reserved_keywords():
 RESERVED_KEYWORDS = _build_reserved_keywords()
 
 class Lexer():
-    def __init__(self, text) -> None:
-        self.lineno = 1
+    def __init__(self, text, lineno=1) -> None:
+        self.lineno = lineno
         self.column = 1
         self.text = text
         self.pos = 0
         self.current_char = self.text[self.pos]
+        # (token, lexer state after it) for each token lexed by peek_token()
+        # but not yet returned by next_token()
+        self._peeked = []
         self.current_token = self.next_token()
 
     def error(self):
@@ -54,6 +59,7 @@ class Lexer():
             self.column = 0
 
         self.pos += 1
+        self.column += 1
         if not self.pos > len(self.text) - 1:
             self.current_char = self.text[self.pos]
         else:
@@ -66,6 +72,25 @@ class Lexer():
         else:
             return self.text[peek_pos]
 
+    def _state(self):
+        return self.pos, self.current_char, self.lineno, self.column
+
+    def _restore(self, state):
+        self.pos, self.current_char, self.lineno, self.column = state
+
+    def peek_token(self, k=1):
+        # each token is lexed once: next_token() takes the peeked ones
+        peeked = self._peeked
+        if len(peeked) < k:
+            state = self._state()
+            if peeked:
+                self._restore(peeked[-1][1])
+            while len(peeked) < k:
+                token = self.lex_token()
+                peeked.append((token, self._state()))
+            self._restore(state)
+        return peeked[k - 1][0]
+
     def get_number_tk(self):
         result = ''
         while self.current_char is not None and self.current_char.isdigit():
@@ -96,7 +121,7 @@ class Lexer():
     def _id(self):
         token = Token(type=None, value=None, lineno=self.lineno, column=self.column)
         value = ''
-        while self.current_char is not None and self.current_char.isalnum() or self.current_char == '-':
+        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '-'):
             value += self.current_char
             self.next_char()
         token_type = RESERVED_KEYWORDS.get(value.upper())
@@ -120,10 +145,19 @@ class Lexer():
     
     def skip_comment(self):
         while self.current_char != '}':
+            if self.current_char is None:
+                self.error()
             self.next_char()
         self.next_char() 
 
     def next_token(self):
+        if self._peeked:
+            token, state = self._peeked.pop(0)
+            self._restore(state)
+            return token
+        return self.lex_token()
+
+    def lex_token(self):
         while self.current_char is not None:
 
             if self.current_char.isspace():
@@ -136,10 +170,11 @@ class Lexer():
                 continue
 
             if self.current_char == '>' and self.peek() == '=':
+                self.next_char()
                 self.next_char()
                 return Token(Tk.EQ_GT, '>=')
             
-            if self.current_char == '<' == self.peek() == '=':
+            if self.current_char == '<' and self.peek() == '=':
                 self.next_char()
                 self.next_char()
                 return Token(Tk.EQ_LT, '<=')
@@ -170,7 +205,8 @@ class Lexer():
             if self.current_char == "'":
                 return self.get_string_tk()
             
-            if self.current_char.isalpha() or self.current_char == '-':
+            # '-' may continue an identifier (var-name) but never starts one
+            if self.current_char.isalpha():
                 return self._id()
 
             try:
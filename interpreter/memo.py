@@ -0,0 +1,75 @@
+from collections import OrderedDict
+
+# results kept per pure function; 0 turns memoization off
+DEFAULT_MEMO_SIZE = 128
+
+MISSING = object()
+
+
+class LRUCache:
+    __slots__ = ('name', 'maxsize', 'hits', 'misses', '_entries')
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(arguments):
+        # with the types, so that f(1), f(1.0) and f(TRUE) stay apart
+        return (*arguments, *map(type, arguments))
+
+    def get(self, key):
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        entries = self._entries
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Memo:
+    # The result caches of one run, one per pure function that is called.
+    # A memoized call skips the body altogether, so an engine only uses
+    # the caches while nobody watches the run through its events.
+    def __init__(self, maxsize=DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.caches = {}
+
+    def cache(self, fun_symbol):
+        # the cache for calls of fun_symbol, None if they are not memoized
+        if not self.maxsize or not fun_symbol.pure:
+            return None
+        cache = self.caches.get(fun_symbol)
+        if cache is None:
+            cache = self.caches[fun_symbol] = LRUCache(fun_symbol.name, self.maxsize)
+        return cache
+
+    def stats(self):
+        return {
+            cache.name: {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache)}
+            for cache in self.caches.values()
+        }
+
+    def report(self):
+        lines = [f'{"hits":>12}{"misses":>12}{"hit rate":>10}{"size":>8}  function']
+        caches = sorted(self.caches.values(), key=lambda cache: cache.hits, reverse=True)
+        for cache in caches:
+            calls = cache.hits + cache.misses
+            lines.append(
+                f'{cache.hits:>12}{cache.misses:>12}'
+                f'{cache.hits / max(calls, 1):>10.1%}{len(cache):>8}  {cache.name}'
+            )
+        return '\n'.join(lines)
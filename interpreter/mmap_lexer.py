@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+import mmap
+import os
+import re
+import sys
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.exceptions import LexerError
+from interpreter.lexer import RESERVED_KEYWORDS
+from interpreter.regex_lexer import OPERATORS, LineTable, OffsetToken
+
+# The master pattern of RegexLexer over bytes. Letters are ASCII letters or
+# any byte of a multi-byte UTF-8 sequence, so non-ASCII names are matched
+# whole and only checked when they are decoded.
+_LETTER = rb'A-Za-z\x80-\xff'
+_SKIP = rb'\s*(?:\{[^}]*\}\s*)*'
+_OPERATOR = b'|'.join(
+    re.escape(op.encode()) for op in sorted(OPERATORS, key=len, reverse=True)
+)
+MASTER_PATTERN = re.compile(
+    _SKIP + rb'''(?:
+        (?P<ID>[''' + _LETTER + rb'''][''' + _LETTER + rb'''0-9]*(?:-+[''' + _LETTER + rb'''0-9]*)*)
+      | (?P<NUMBER>\d+(?P<FRACTION>\.\d*)?)
+      | (?P<OPERATOR>''' + _OPERATOR + rb''')
+      | '(?P<STRING>[^']*)'?
+    )''',
+    re.VERBOSE,
+)
+SKIP_PATTERN = re.compile(_SKIP)
+BYTE_OPERATORS = {op.encode(): token_type for op, token_type in OPERATORS.items()}
+
+
+@contextmanager
+def open_source(path):
+    # the file mapped read-only; its pages are loaded by the OS as the lexer
+    # reaches them instead of being copied into a str up front
+    with open(path, 'rb') as f:
+        # empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            data = None
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data is None:
+        yield b''
+        return
+    with data:
+        yield data
+
+
+class MmapLexer():
+    # RegexLexer over a bytes-like source (bytes, or an mmap from
+    # open_source()). Only identifier and string values are decoded; token
+    # offsets, and so columns, are byte offsets.
+    def __init__(self, data, lineno=1) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+        self.data = data
+        self.pos = 0
+        self.lines = LineTable(data, lineno)
+        self._match = MASTER_PATTERN.match
+        self._identifiers = {}
+        self.current_token = self.next_token()
+
+    def peek_token(self, k=1):
+        pos = self.pos
+        for _ in range(k):
+            token = self.next_token()
+        self.pos = pos
+        return token
+
+    def error(self, offset):
+        lineno, column = self.lines.position(offset)
+        s = "Lexer error on '{lexeme}' line: {lineno} column: {column}".format(
+            lexeme=self.data[offset:offset + 1].decode('utf-8', 'replace'),
+            lineno=lineno,
+            column=column,
+        )
+        raise LexerError(message=s)
+
+    def _decode(self, raw, offset):
+        try:
+            return raw.decode()
+        except UnicodeDecodeError as e:
+            self.error(offset + e.start)
+
+    def _identifier(self, raw, offset):
+        # keyed by the raw bytes, so a name is decoded once per lexer
+        entry = self._identifiers.get(raw)
+        if entry is None:
+            name = self._decode(raw, offset)
+            if not name[0].isalpha() or not name.replace('-', '').isalnum():
+                self.error(offset)
+            token_type = RESERVED_KEYWORDS.get(name.upper())
+            if token_type is None:
+                entry = (Tk.ID, sys.intern(name))
+            else:
+                entry = (token_type, token_type.value)
+            self._identifiers[raw] = entry
+        return entry
+
+    def next_token(self):
+        match = self._match(self.data, self.pos)
+        if match is None:
+            offset = SKIP_PATTERN.match(self.data, self.pos).end()
+            self.pos = offset
+            if offset < len(self.data):
+                self.error(offset)
+            return OffsetToken(Tk.EOF, None, offset, self.lines)
+
+        kind = match.lastgroup
+        value = match.group(kind)
+        offset = match.start(kind)
+        self.pos = match.end()
+        if kind == 'ID':
+            token_type, value = self._identifier(value, offset)
+            return OffsetToken(token_type, value, offset, self.lines)
+        if kind == 'OPERATOR':
+            token_type = BYTE_OPERATORS[value]
+            return OffsetToken(token_type, token_type.value, offset, self.lines)
+        if kind == 'STRING':
+            # the opening quote is the token start
+            return OffsetToken(Tk.STRING, self._decode(value, offset), offset - 1, self.lines)
+        # int() and float() parse the digits without decoding them
+        if match.start('FRACTION') != -1:
+            return OffsetToken(Tk.REAL_VALUE, float(value), offset, self.lines)
+        return OffsetToken(Tk.INTEGER_VALUE, int(value), offset, self.lines)
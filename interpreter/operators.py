@@ -0,0 +1,138 @@
+import math
+import operator
+
+from interpreter.tokens_type import TokenType as Tk
+
+# AND/OR are not listed: they short-circuit, so every engine handles them
+# explicitly instead of calling a function on two evaluated operands.
+BINARY_OPERATORS = {
+    Tk.PLUS: operator.add,
+    Tk.MINUS: operator.sub,
+    Tk.MUL: operator.mul,
+    Tk.DIV: operator.truediv,
+    Tk.MOD: operator.mod,
+    Tk.FLOORDIV: operator.floordiv,
+    Tk.EXPONENT: operator.pow,
+    Tk.GT: operator.gt,
+    Tk.LT: operator.lt,
+    Tk.EQ_GT: operator.ge,
+    Tk.EQ_LT: operator.le,
+    Tk.EQ: operator.eq,
+    Tk.NOT_EQ: operator.ne,
+}
+
+UNARY_OPERATORS = {
+    Tk.PLUS: operator.pos,
+    Tk.MINUS: operator.neg,
+    Tk.NOT: operator.not_,
+}
+
+# Static types are the names of the builtin type symbols. NON is the type of
+# 'non' and of a missing return value; like a variable that was never
+# assigned, it fits any declared type. None stands for a type that cannot be
+# known, such as the result of a function returning both strings and numbers.
+INT = 'INT'
+FLOAT = 'FLOAT'
+STRING = 'STRING'
+BOOLEAN = 'BOOLEAN'
+NON = 'NON'
+# narrowest first: a value fits any number type to its right
+NUMBERS = (BOOLEAN, INT, FLOAT)
+
+LITERAL_TYPES = {
+    Tk.INTEGER_VALUE: INT,
+    Tk.REAL_VALUE: FLOAT,
+    Tk.STRING: STRING,
+    Tk.BOOLEAN: BOOLEAN,
+    Tk.NON: NON,
+}
+
+ORDERINGS = (Tk.GT, Tk.LT, Tk.EQ_GT, Tk.EQ_LT)
+# literal exponents that keep an int power an int: they are never negative
+NATURAL_LITERALS = (Tk.INTEGER_VALUE, Tk.BOOLEAN)
+# the static types of an operand, None included
+OPERAND_TYPES = NUMBERS + (STRING, NON, None)
+
+
+def join(left, right):
+    # the type of a value that is either a left or a right, None if no
+    # type holds both
+    if left == right or right == NON:
+        return left
+    if left == NON:
+        return right
+    if left in NUMBERS and right in NUMBERS:
+        return max(left, right, key=NUMBERS.index)
+    return None
+
+
+def _specialize_binary():
+    # (operator, left type, right type) -> (function, result type), with no
+    # entry for the operand types an operator cannot combine
+    table = {}
+    for left in OPERAND_TYPES:
+        for right in OPERAND_TYPES:
+            for op_type in (Tk.EQ, Tk.NOT_EQ):
+                table[op_type, left, right] = (BINARY_OPERATORS[op_type], BOOLEAN)
+            # the result is one of the operands
+            result = join(left, right)
+            if result is not None:
+                table[Tk.AND, left, right] = (None, result)
+                table[Tk.OR, left, right] = (None, result)
+    for left in NUMBERS:
+        for right in NUMBERS:
+            number = FLOAT if FLOAT in (left, right) else INT
+            for op_type in (Tk.PLUS, Tk.MINUS, Tk.MUL, Tk.MOD, Tk.FLOORDIV):
+                table[op_type, left, right] = (BINARY_OPERATORS[op_type], number)
+            table[Tk.DIV, left, right] = (operator.truediv, FLOAT)
+            # an int power is a float for a negative exponent, so it is only
+            # an int when SemanticAnalyser sees a literal exponent; math.pow
+            # never gives a complex (it raises on a negative base)
+            table[Tk.EXPONENT, left, right] = (
+                math.pow if number == FLOAT else operator.pow, FLOAT,
+            )
+            for op_type in ORDERINGS:
+                table[op_type, left, right] = (BINARY_OPERATORS[op_type], BOOLEAN)
+    table[Tk.PLUS, STRING, STRING] = (operator.concat, STRING)
+    for op_type in ORDERINGS:
+        table[op_type, STRING, STRING] = (BINARY_OPERATORS[op_type], BOOLEAN)
+    for count in (BOOLEAN, INT):
+        table[Tk.MUL, STRING, count] = (operator.mul, STRING)
+        table[Tk.MUL, count, STRING] = (operator.mul, STRING)
+    return table
+
+
+def _specialize_unary():
+    table = {(Tk.NOT, operand): (operator.not_, BOOLEAN) for operand in OPERAND_TYPES}
+    for op_type in (Tk.PLUS, Tk.MINUS):
+        for operand in NUMBERS:
+            table[op_type, operand] = (
+                UNARY_OPERATORS[op_type], FLOAT if operand == FLOAT else INT,
+            )
+    return table
+
+
+# looked up by SemanticAnalyser for every operator node
+SPECIALIZED_BINARY = _specialize_binary()
+SPECIALIZED_UNARY = _specialize_unary()
+
+# every function an operator node can hold (None for AND/OR); the vm and the
+# flat tree refer to them by index
+OPERATOR_FUNCTIONS = tuple(dict.fromkeys(
+    [None, *BINARY_OPERATORS.values(), *UNARY_OPERATORS.values()]
+    + [function for function, _ in SPECIALIZED_BINARY.values()]
+    + [function for function, _ in SPECIALIZED_UNARY.values()]
+))
+OPERATOR_INDEX = {function: index for index, function in enumerate(OPERATOR_FUNCTIONS)}
+
+
+def assignable(target, value):
+    if value is None:
+        return False
+    if target == value or value == NON:
+        return True
+    # numbers widen: a boolean is an int, an int converts to a float
+    return (
+        target in NUMBERS and value in NUMBERS
+        and NUMBERS.index(value) < NUMBERS.index(target)
+    )
@@ -0,0 +1,155 @@
+from array import array
+from bisect import bisect_right
+import re
+import sys
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.exceptions import LexerError
+from interpreter.lexer import Token, RESERVED_KEYWORDS
+
+
+def _build_operators():
+    tt_list = list(Tk)
+    start_index = tt_list.index(Tk.COLON)
+    end_index = tt_list.index(Tk.NOT_EQ)
+    return {
+        token_type.value: token_type
+        for token_type in tt_list[start_index:end_index + 1]
+    }
+
+OPERATORS = _build_operators()
+
+# Whitespace and comments are skipped by the same match that reads the token,
+# so every token costs exactly one regex call.
+_SKIP = r'\s*(?:\{[^}]*\}\s*)*'
+_OPERATOR = '|'.join(
+    re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True)
+)
+MASTER_PATTERN = re.compile(
+    _SKIP + r'''(?:
+        (?P<ID>[^\W\d_][^\W_]*(?:-+[^\W_]*)*)
+      | (?P<NUMBER>\d+(?P<FRACTION>\.\d*)?)
+      | (?P<OPERATOR>''' + _OPERATOR + r''')
+      | '(?P<STRING>[^']*)'?
+    )''',
+    re.VERBOSE,
+)
+SKIP_PATTERN = re.compile(_SKIP)
+
+
+class LineTable:
+    def __init__(self, text, first_line=1):
+        self.text = text
+        self.first_line = first_line
+        self._starts = None
+
+    def starts(self):
+        if self._starts is None:
+            # an array keeps one machine word per line of very large sources
+            newline = '\n' if isinstance(self.text, str) else b'\n'
+            self._starts = array('q', [0])
+            self._starts.extend(m.end() for m in re.finditer(newline, self.text))
+        return self._starts
+
+    def __getstate__(self):
+        # cached programs keep token positions without a copy of the source
+        return {'text': None, 'first_line': self.first_line, '_starts': self.starts()}
+
+    def position(self, offset):
+        starts = self.starts()
+        index = bisect_right(starts, offset)
+        return index + self.first_line - 1, offset - starts[index - 1] + 1
+
+
+class OffsetToken():
+    # Same interface as Token, but lineno/column are derived from the source
+    # offset only when asked for. Not a Token subclass so that it does not
+    # carry Token's unused lineno/column slots.
+    __slots__ = ('type', 'value', 'offset', 'lines')
+
+    def __init__(self, type, value, offset, lines):
+        self.type = type
+        self.value = value
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def lineno(self):
+        return self.lines.position(self.offset)[0]
+
+    @property
+    def column(self):
+        return self.lines.position(self.offset)[1]
+
+    __str__ = Token.__str__
+    __repr__ = Token.__repr__
+
+
+class RegexLexer():
+    def __init__(self, text, lineno=1) -> None:
+        self.text = text
+        self.pos = 0
+        self.lines = LineTable(text, lineno)
+        self._match = MASTER_PATTERN.match
+        self._identifiers = {}
+        self.current_token = self.next_token()
+
+    @property
+    def current_char(self):
+        if self.pos < len(self.text):
+            return self.text[self.pos]
+        return None
+
+    def peek_token(self, k=1):
+        pos = self.pos
+        for _ in range(k):
+            token = self.next_token()
+        self.pos = pos
+        return token
+
+    def error(self, offset):
+        lineno, column = self.lines.position(offset)
+        s = "Lexer error on '{lexeme}' line: {lineno} column: {column}".format(
+            lexeme=self.text[offset],
+            lineno=lineno,
+            column=column,
+        )
+        raise LexerError(message=s)
+
+    def _identifier(self, name):
+        # one lookup for every identifier seen before; keywords are resolved
+        # and names interned only on the first occurrence
+        entry = self._identifiers.get(name)
+        if entry is None:
+            token_type = RESERVED_KEYWORDS.get(name.upper())
+            if token_type is None:
+                entry = (Tk.ID, sys.intern(name))
+            else:
+                entry = (token_type, token_type.value)
+            self._identifiers[name] = entry
+        return entry
+
+    def next_token(self):
+        match = self._match(self.text, self.pos)
+        if match is None:
+            offset = SKIP_PATTERN.match(self.text, self.pos).end()
+            self.pos = offset
+            if offset < len(self.text):
+                self.error(offset)
+            return OffsetToken(Tk.EOF, None, offset, self.lines)
+
+        kind = match.lastgroup
+        value = match.group(kind)
+        offset = match.start(kind)
+        self.pos = match.end()
+        if kind == 'ID':
+            token_type, value = self._identifier(value)
+            return OffsetToken(token_type, value, offset, self.lines)
+        if kind == 'OPERATOR':
+            return OffsetToken(OPERATORS[value], value, offset, self.lines)
+        if kind == 'STRING':
+            # the opening quote is the token start
+            return OffsetToken(Tk.STRING, value, offset - 1, self.lines)
+        if match.start('FRACTION') != -1:
+            return OffsetToken(Tk.REAL_VALUE, float(value), offset, self.lines)
+        return OffsetToken(Tk.INTEGER_VALUE, int(value), offset, self.lines)
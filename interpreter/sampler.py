@@ -0,0 +1,73 @@
+import sys
+import threading
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+
+
+class Sampler:
+    # Snapshots the call stack of the interpreted program from a background
+    # thread every interval seconds. A sample is the chain of activation
+    # record names, followed by the node type being visited when the engine
+    # walks the tree.
+    def __init__(self, call_stack, interval=DEFAULT_INTERVAL):
+        self.call_stack = call_stack
+        self.interval = interval
+        self.samples = Counter()
+        self._target = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self._target)
+        stack = tuple(ar.name for ar in list(self.call_stack._records))
+        if not stack:
+            return
+        node = self.current_node(frame)
+        if node is not None:
+            stack += (node,)
+        self.samples[stack] += 1
+
+    def current_node(self, frame):
+        # the innermost visit_<Node> method on the interpreter thread
+        while frame is not None:
+            name = frame.f_code.co_name
+            if name.startswith('visit_'):
+                return name[6:]
+            frame = frame.f_back
+        return None
+
+    def collapsed(self):
+        # one 'frame;frame;... count' line per distinct stack, the input
+        # format of flamegraph.pl and compatible viewers
+        return '\n'.join(
+            f'{";".join(stack)} {count}' for stack, count in sorted(self.samples.items())
+        ) + '\n'
+
+    def report(self, limit=20):
+        total = sum(self.samples.values())
+        lines = [f'{total} samples every {self.interval * 1000:g} ms']
+        for stack, count in self.samples.most_common(limit):
+            lines.append(f'{count:>8}{count / total:>8.1%}  {";".join(stack)}')
+        return '\n'.join(lines)
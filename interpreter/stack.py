@@ -1,5 +1,9 @@
 from enum import Enum
 
+# joins a function and variable name into the name of a slot the inliner
+# adds to a caller; no variable of the source has it in its name
+INLINED_SEPARATOR = '.'
+
 class CallStack:
     def __init__(self):
         self._records = []
@@ -26,20 +30,40 @@ class ARType(Enum):
     PROCEDURE = 'PROCEDURE'
 
 class ActivationRecord:
-    def __init__(self, name, type, nesting_level):
+    # Locals live in a fixed-size list indexed by the slots that
+    # SemanticAnalyser assigned; names are only looked up through the scope
+    # (the ScopedSymbolTable of the function) when a record is printed.
+    __slots__ = ('name', 'type', 'nesting_level', 'scope', 'slots')
+
+    def __init__(self, name, type, nesting_level, scope):
         self.name = name
         self.type = type
         self.nesting_level = nesting_level
-        self.members = {}
+        self.scope = scope
+        self.slots = [None] * len(scope.slot_names)
+
+    def _slot(self, key):
+        return self.scope.slot_names.index(key)
 
     def __setitem__(self, key, value):
-        self.members[key] = value
+        self.slots[self._slot(key)] = value
 
     def __getitem__(self, key):
-        return self.members[key]
+        return self.slots[self._slot(key)]
 
     def get(self, key):
-        return self.members.get(key)
+        if key in self.scope.slot_names:
+            return self[key]
+        return None
+
+    @property
+    def members(self):
+        # the variables of the source: the slots of inlined functions are
+        # left out
+        return {
+            name: value for name, value in zip(self.scope.slot_names, self.slots)
+            if INLINED_SEPARATOR not in name
+        }
 
     def __str__(self):
         lines = [
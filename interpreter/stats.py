@@ -0,0 +1,168 @@
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.ast.symbol import ScopedSymbolTable
+from interpreter.stack import ActivationRecord
+from interpreter.ast.objects import walk
+
+
+class PhaseStats:
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = 0
+        self.tokens = None
+        self.nodes = None
+        self.lookups = 0
+        self.activation_records = 0
+        self.visits = Counter()
+
+    def dict(self):
+        result = {
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'peak_memory': self.peak_memory,
+            'lookups': self.lookups,
+            'activation_records': self.activation_records,
+            'visits': dict(self.visits.most_common()),
+        }
+        if self.tokens is not None:
+            result['tokens'] = self.tokens
+        if self.nodes is not None:
+            result['nodes'] = dict(self.nodes.most_common())
+        return result
+
+
+class Stats:
+    # Counters are hooked into the interpreter classes only while
+    # instrument() is active, so nothing is counted (or paid for) otherwise.
+    enabled = True
+
+    def __init__(self):
+        self.phases = []
+        self.current = None
+
+    @contextmanager
+    def instrument(self):
+        stats = self
+        visit = NodeVisitor.visit
+        lookup = ScopedSymbolTable.lookup
+        ar_init = ActivationRecord.__init__
+
+        def counted_visit(visitor, node):
+            if stats.current is not None:
+                stats.current.visits[node.__class__.__name__] += 1
+            return visit(visitor, node)
+
+        def counted_lookup(scope, name, current_scope_only=False):
+            if stats.current is not None:
+                stats.current.lookups += 1
+            return lookup(scope, name, current_scope_only)
+
+        def counted_ar_init(ar, *args, **kwargs):
+            if stats.current is not None:
+                stats.current.activation_records += 1
+            ar_init(ar, *args, **kwargs)
+
+        NodeVisitor.visit = counted_visit
+        ScopedSymbolTable.lookup = counted_lookup
+        ActivationRecord.__init__ = counted_ar_init
+        tracemalloc.start()
+        try:
+            yield self
+        finally:
+            tracemalloc.stop()
+            NodeVisitor.visit = visit
+            ScopedSymbolTable.lookup = lookup
+            ActivationRecord.__init__ = ar_init
+
+    @contextmanager
+    def phase(self, name):
+        phase = self.current = PhaseStats(name)
+        self.phases.append(phase)
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield phase
+        finally:
+            phase.cpu = time.process_time() - start_cpu
+            phase.wall = time.perf_counter() - start_wall
+            phase.peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+            self.current = None
+
+    def count_tokens(self, count):
+        self.phases[-1].tokens = count
+
+    def count_nodes(self, tree):
+        self.phases[-1].nodes = Counter(node.__class__.__name__ for node in walk(tree))
+
+    def count_kinds(self, tree):
+        # count_nodes() for a FlatTree
+        self.phases[-1].nodes = tree.kind_counts()
+
+    def dict(self):
+        return {
+            'phases': {phase.name: phase.dict() for phase in self.phases},
+            'total': {
+                'wall': sum(phase.wall for phase in self.phases),
+                'cpu': sum(phase.cpu for phase in self.phases),
+            },
+        }
+
+    def json(self):
+        return json.dumps(self.dict(), indent=4)
+
+    def report(self):
+        lines = [
+            'times include the overhead of tracing memory allocations',
+            f'{"phase":<10}{"wall (s)":>12}{"cpu (s)":>12}{"peak (KiB)":>12}'
+            f'{"lookups":>10}{"ARs":>8}{"visits":>10}'
+        ]
+        for phase in self.phases:
+            lines.append(
+                f'{phase.name:<10}{phase.wall:>12.6f}{phase.cpu:>12.6f}'
+                f'{phase.peak_memory / 1024:>12.1f}{phase.lookups:>10}'
+                f'{phase.activation_records:>8}{sum(phase.visits.values()):>10}'
+            )
+        for phase in self.phases:
+            if phase.tokens is not None:
+                lines.append(f'{phase.name}: {phase.tokens} tokens')
+            if phase.nodes is not None:
+                lines.append(f'{phase.name}: {sum(phase.nodes.values())} nodes')
+                for name, count in phase.nodes.most_common():
+                    lines.append(f'    {name:<28}{count:>10}')
+            if phase.visits:
+                lines.append(f'{phase.name}: visits')
+                for name, count in phase.visits.most_common():
+                    lines.append(f'    {name:<28}{count:>10}')
+        return '\n'.join(lines)
+
+
+class NoStats:
+    # stands in for Stats when --stats is off
+    enabled = False
+
+    def instrument(self):
+        return nullcontext(self)
+
+    def phase(self, name):
+        return nullcontext()
+
+    def count_tokens(self, count):
+        pass
+
+    def count_nodes(self, tree):
+        pass
+
+    def count_kinds(self, tree):
+        pass
+
+
+NO_STATS = NoStats()
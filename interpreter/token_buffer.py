@@ -0,0 +1,95 @@
+from array import array
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Token
+from interpreter.regex_lexer import OffsetToken
+
+TOKEN_TYPES = list(Tk)
+_TOKEN_TYPE_INDEX = {token_type: index for index, token_type in enumerate(TOKEN_TYPES)}
+
+
+class TokenBuffer:
+    # The whole token stream in parallel arrays: kinds[i] indexes TOKEN_TYPES,
+    # values[i] is the token value and offsets[i] its source offset. Lexers
+    # that do not report offsets (the char lexer) keep linenos[i] and
+    # columns[i] instead, 0 where the token has none. The last token is
+    # always EOF.
+    def __init__(self, kinds, values, offsets, lines=None, linenos=None, columns=None):
+        self.kinds = kinds
+        self.values = values
+        self.offsets = offsets
+        self.lines = lines
+        self.linenos = linenos
+        self.columns = columns
+
+    @classmethod
+    def from_lexer(cls, lexer):
+        kinds = array('B')
+        values = []
+        type_index = _TOKEN_TYPE_INDEX
+        lines = getattr(lexer, 'lines', None)
+        if lines is None:
+            offsets = None
+            linenos = array('q')
+            columns = array('q')
+        else:
+            offsets = array('q')
+            linenos = columns = None
+        token = lexer.current_token
+        while True:
+            kinds.append(type_index[token.type])
+            values.append(token.value)
+            if lines is None:
+                linenos.append(token.lineno or 0)
+                columns.append(token.column or 0)
+            else:
+                offsets.append(token.offset)
+            if token.type == Tk.EOF:
+                break
+            token = lexer.next_token()
+        return cls(kinds, values, offsets, lines, linenos, columns)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, index):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def token(self, index):
+        token_type = TOKEN_TYPES[self.kinds[index]]
+        if self.lines is None:
+            return Token(
+                token_type,
+                self.values[index],
+                self.linenos[index] or None,
+                self.columns[index] or None,
+            )
+        return OffsetToken(token_type, self.values[index], self.offsets[index], self.lines)
+
+    def stream(self):
+        return TokenStream(self)
+
+
+class TokenStream:
+    # Lexer-compatible cursor over a TokenBuffer, with k-token lookahead and
+    # mark/reset backtracking.
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.index = 0
+        self._last = len(buffer) - 1
+        self.current_token = buffer.token(0)
+
+    def next_token(self):
+        if self.index < self._last:
+            self.index += 1
+        return self.buffer.token(self.index)
+
+    def peek_token(self, k=1):
+        return self.buffer.token(min(self.index + k, self._last))
+
+    def mark(self):
+        return self.index
+
+    def reset(self, mark):
+        self.index = mark
+        self.current_token = self.buffer.token(mark)
@@ -35,6 +35,7 @@ class TokenType(Enum):
     OR = 'OR'
     NON = 'NON'
     DO = 'DO'
+    RETURN = 'RETURN'
     END = 'END'
     #types
     INTEGER_VALUE = 'INTEGER_VALUE'
@@ -0,0 +1,192 @@
+from array import array
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.ast.objects import FunctionCallNode
+from interpreter.operators import OPERATOR_FUNCTIONS, OPERATOR_INDEX
+from interpreter.vm.opcodes import Opcode as Op
+
+
+class CodeObject:
+    def __init__(self, name, nparams, nesting_level, scope):
+        self.name = name
+        self.nparams = nparams  # parameters occupy the first slots
+        self.nesting_level = nesting_level
+        self.scope = scope
+        self.ops = array('B')
+        self.args = array('l')
+        self.consts = []
+        self._const_index = {}
+
+    def emit(self, op, arg=0):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def patch(self, index, target):
+        self.args[index] = target
+
+    def here(self):
+        return len(self.ops)
+
+    def add_const(self, value):
+        # keyed by type too, so 1, 1.0 and True stay distinct constants
+        key = (type(value), value)
+        index = self._const_index.get(key)
+        if index is None:
+            index = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    def disassemble(self):
+        params = self.scope.slot_names[:self.nparams]
+        lines = [f'code {self.name}({", ".join(params)})']
+        for pc, (op, arg) in enumerate(zip(self.ops, self.args)):
+            op = Op(op)
+            if op == Op.LOAD_CONST:
+                detail = repr(self.consts[arg])
+            elif op in (Op.LOAD_FAST, Op.STORE_FAST, Op.TRACE_ASSIGN):
+                detail = self.scope.slot_names[arg]
+            elif op in (Op.BINARY_OP, Op.UNARY_OP):
+                # the function SemanticAnalyser picked for the operand types
+                detail = OPERATOR_FUNCTIONS[arg].__name__
+            else:
+                detail = ''
+            lines.append(f'{pc:>6} {op.name:<22}{arg:>6} {detail}'.rstrip())
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.disassemble()
+
+    __repr__ = __str__
+
+
+class Program:
+    def __init__(self, main, functions, nodes=(), symbols=()):
+        self.main = main
+        self.functions = functions
+        # the FunctionSymbol of each code object in functions
+        self.symbols = symbols
+        # the nodes TRACE_BRANCH operands index
+        self.nodes = nodes
+
+    def disassemble(self):
+        return '\n\n'.join(
+            code.disassemble() for code in [self.main] + self.functions
+        )
+
+
+class BytecodeCompiler(NodeVisitor):
+    def __init__(self, ast, hooks=None):
+        self.ast = ast
+        self.trace_assign = bool(hooks and hooks.assign)
+        self.trace_branch = bool(hooks and hooks.branch_taken)
+        self.functions = []
+        self.symbols = []
+        self._function_index = {}
+        self._pending = []
+        self.nodes = []
+        self.code = None
+
+    def compile(self):
+        main = CodeObject('main', nparams=0, nesting_level=1, scope=self.ast.scope)
+        self.code = main
+        self.visit(self.ast)
+        # function bodies are compiled on first reference, which may queue more
+        while self._pending:
+            fun_symbol, code = self._pending.pop()
+            self.code = code
+            self.visit(fun_symbol.block_ast)
+            self.emit_return()
+        return Program(main, self.functions, self.nodes, self.symbols)
+
+    def function_index(self, fun_symbol):
+        index = self._function_index.get(fun_symbol)
+        if index is None:
+            code = CodeObject(
+                name=fun_symbol.name,
+                nparams=len(fun_symbol.formal_params),
+                nesting_level=fun_symbol.scope_level + 1,
+                scope=fun_symbol.scope,
+            )
+            index = self._function_index[fun_symbol] = len(self.functions)
+            self.functions.append(code)
+            self.symbols.append(fun_symbol)
+            self._pending.append((fun_symbol, code))
+        return index
+
+    def emit_return(self):
+        # the implicit return at the end of a body
+        self.code.emit(Op.LOAD_CONST, self.code.add_const(None))
+        self.code.emit(Op.RETURN)
+
+    def visit_ProgramNode(self, node):
+        self.visit(node.init_block)
+        self.emit_return()
+
+    def visit_BlockNode(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+            if isinstance(statement, FunctionCallNode):
+                # a call statement drops its result
+                self.code.emit(Op.POP_TOP)
+
+    def visit_ReturnNode(self, node):
+        if node.expr is None:
+            self.code.emit(Op.LOAD_CONST, self.code.add_const(None))
+        else:
+            self.visit(node.expr)
+        self.code.emit(Op.RETURN)
+
+    def visit_NoOpNode(self, node):
+        pass
+
+    def visit_VarDeclarationNode(self, node):
+        # Executor ignores declarations, including their initial value
+        pass
+
+    def visit_FunctionDeclarationNode(self, node):
+        pass
+
+    def visit_AssignNode(self, node):
+        self.visit(node.right)
+        self.code.emit(Op.STORE_FAST, node.slot)
+        if self.trace_assign:
+            self.code.emit(Op.TRACE_ASSIGN, node.slot)
+
+    def visit_VarNode(self, node):
+        self.code.emit(Op.LOAD_FAST, node.slot)
+
+    def visit_FactorNode(self, node):
+        self.code.emit(Op.LOAD_CONST, self.code.add_const(node.value))
+
+    def visit_UnaryOpNode(self, node):
+        self.visit(node.expr)
+        self.code.emit(Op.UNARY_OP, OPERATOR_INDEX[node.op_fn])
+
+    def visit_BinOpNode(self, node):
+        op_type = node.op.type
+        if op_type in (Tk.AND, Tk.OR):
+            self.visit(node.left)
+            jump = Op.JUMP_IF_FALSE_OR_POP if op_type == Tk.AND else Op.JUMP_IF_TRUE_OR_POP
+            index = self.code.emit(jump)
+            self.visit(node.right)
+            self.code.patch(index, self.code.here())
+            return
+        self.visit(node.left)
+        self.visit(node.right)
+        self.code.emit(Op.BINARY_OP, OPERATOR_INDEX[node.op_fn])
+
+    def visit_ConditionalOpNode(self, node):
+        self.visit(node.condition_expr)
+        index = self.code.emit(Op.POP_JUMP_IF_FALSE)
+        if self.trace_branch:
+            self.code.emit(Op.TRACE_BRANCH, len(self.nodes))
+            self.nodes.append(node)
+        self.visit(node.block_node)
+        self.code.patch(index, self.code.here())
+
+    def visit_FunctionCallNode(self, node):
+        for argument_node in node.actual_params:
+            self.visit(argument_node)
+        self.code.emit(Op.CALL, self.function_index(node.fun_symbol))
@@ -0,0 +1,143 @@
+from interpreter.stack import CallStack, ActivationRecord, ARType
+from interpreter.events import EventHooks, CALL_ENTER, CALL_LEAVE, ASSIGN, BRANCH_TAKEN
+from interpreter.vm.compiler import BytecodeCompiler
+from interpreter.operators import OPERATOR_FUNCTIONS
+from interpreter.vm.opcodes import Opcode as Op
+from interpreter.memo import Memo, DEFAULT_MEMO_SIZE, MISSING
+
+LOAD_CONST = Op.LOAD_CONST.value
+LOAD_FAST = Op.LOAD_FAST.value
+STORE_FAST = Op.STORE_FAST.value
+BINARY_OP = Op.BINARY_OP.value
+UNARY_OP = Op.UNARY_OP.value
+POP_JUMP_IF_FALSE = Op.POP_JUMP_IF_FALSE.value
+JUMP_IF_FALSE_OR_POP = Op.JUMP_IF_FALSE_OR_POP.value
+JUMP_IF_TRUE_OR_POP = Op.JUMP_IF_TRUE_OR_POP.value
+CALL = Op.CALL.value
+RETURN = Op.RETURN.value
+POP_TOP = Op.POP_TOP.value
+TRACE_ASSIGN = Op.TRACE_ASSIGN.value
+TRACE_BRANCH = Op.TRACE_BRANCH.value
+
+
+class VirtualMachine:
+    def __init__(self, ast, hooks=None, memo_size=DEFAULT_MEMO_SIZE):
+        self.ast = ast
+        self.hooks = hooks if hooks is not None else EventHooks()
+        self.memo = Memo(0 if self.hooks.watch_execution() else memo_size)
+        self.program = None
+        self.call_stack = CallStack()
+
+    def compile(self):
+        if self.program is None:
+            self.program = BytecodeCompiler(self.ast, self.hooks).compile()
+        return self.program
+
+    def run(self):
+        program = self.compile()
+        ar = ActivationRecord(
+            name='main',
+            type=ARType.PROGRAM,
+            nesting_level=1,
+            scope=program.main.scope,
+        )
+        self.call_stack.push(ar)
+        if self.hooks.call_enter:
+            self.hooks.emit(CALL_ENTER, ar, self.call_stack)
+        self.execute(program.main, ar)
+        return ar
+
+    def execute(self, code, ar):
+        functions = self.program.functions
+        # per function index: its result cache, None if not memoized
+        caches = [
+            self.memo.cache(fun_symbol) for fun_symbol in self.program.symbols
+        ]
+        operators = OPERATOR_FUNCTIONS
+        call_stack = self.call_stack
+        hooks = self.hooks
+        trace_calls = bool(hooks.call_enter or hooks.call_leave)
+        frames = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        ops, args, consts = code.ops, code.args, code.consts
+        slots = ar.slots
+        pc = 0
+        while True:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+            # ordered roughly by how often each opcode runs
+            if op == LOAD_FAST:
+                push(slots[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == BINARY_OP:
+                right = pop()
+                stack[-1] = operators[arg](stack[-1], right)
+            elif op == STORE_FAST:
+                slots[arg] = pop()
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == CALL:
+                callee = functions[arg]
+                nparams = callee.nparams
+                cache = caches[arg]
+                memo_key = None
+                if cache is not None:
+                    memo_key = cache.key(stack[len(stack) - nparams:])
+                    value = cache.get(memo_key)
+                    if value is not MISSING:
+                        if nparams:
+                            del stack[-nparams:]
+                        push(value)
+                        continue
+                callee_ar = ActivationRecord(
+                    name=callee.name,
+                    type=ARType.PROCEDURE,
+                    nesting_level=callee.nesting_level,
+                    scope=callee.scope,
+                )
+                if nparams:
+                    callee_ar.slots[:nparams] = stack[-nparams:]
+                    del stack[-nparams:]
+                call_stack.push(callee_ar)
+                if trace_calls:
+                    hooks.emit(CALL_ENTER, callee_ar, call_stack)
+                frames.append((ops, args, consts, slots, pc, cache, memo_key))
+                ops, args, consts = callee.ops, callee.args, callee.consts
+                slots = callee_ar.slots
+                pc = 0
+            elif op == RETURN:
+                if trace_calls:
+                    hooks.emit(CALL_LEAVE, call_stack.peek(), call_stack)
+                call_stack.pop()
+                if not frames:
+                    return
+                ops, args, consts, slots, pc, cache, memo_key = frames.pop()
+                if cache is not None:
+                    cache.put(memo_key, stack[-1])
+            elif op == POP_TOP:
+                pop()
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            elif op == UNARY_OP:
+                stack[-1] = operators[arg](stack[-1])
+            elif op == TRACE_ASSIGN:
+                ar = call_stack.peek()
+                hooks.emit(ASSIGN, ar, ar.scope.slot_names[arg], slots[arg])
+            elif op == TRACE_BRANCH:
+                hooks.emit(BRANCH_TAKEN, call_stack.peek(), self.program.nodes[arg])
+            else:
+                raise Exception(f'Unknown opcode {op}')
@@ -0,0 +1,19 @@
+from enum import IntEnum
+
+class Opcode(IntEnum):
+    LOAD_CONST = 0
+    LOAD_FAST = 1
+    STORE_FAST = 2
+    BINARY_OP = 3
+    UNARY_OP = 4
+    POP_JUMP_IF_FALSE = 5
+    JUMP_IF_FALSE_OR_POP = 6
+    JUMP_IF_TRUE_OR_POP = 7
+    CALL = 8
+    # pops the return value and hands it to the caller
+    RETURN = 9
+    POP_TOP = 10
+    # only emitted when the matching event has subscribers
+    TRACE_ASSIGN = 11
+    TRACE_BRANCH = 12
+
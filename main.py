@@ -1,10 +1,79 @@
+from interpreter.tokens_type import TokenType as Tk
 from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.mmap_lexer import MmapLexer, open_source
 from interpreter.analyser import Analyser
+from interpreter.token_buffer import TokenBuffer
 from interpreter.ast.executor import Executor, ASTJsonBuilder
 from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.optimizer import Optimizer
+from interpreter.ast.inliner import Inliner, DEFAULT_INLINE_BUDGET
+from interpreter.ast.profiler import ProfilingExecutor
+from interpreter.ast.closure import ClosureExecutor
+from interpreter.ast import serializer
+from interpreter.ast import flat
+from interpreter.ast.serializer import BINARY_SUFFIX
+from interpreter.vm.machine import VirtualMachine
+from interpreter.cache import ProgramCache
+from interpreter.stats import Stats, NO_STATS
+from interpreter.sampler import Sampler, DEFAULT_INTERVAL
+from interpreter.events import EventHooks, print_stack, print_scopes
+from interpreter.memo import DEFAULT_MEMO_SIZE
+from interpreter.incremental import IncrementalProgram
+from interpreter.exceptions import Error
 
+from contextlib import nullcontext
 import argparse
 import json
+import math
+import os
+import sys
+import time
+
+LEXERS = {
+    'char': Lexer,
+    'regex': RegexLexer,
+    'mmap': MmapLexer,
+}
+
+ENGINES = {
+    'ast': Executor,
+    'closure': ClosureExecutor,
+    'vm': VirtualMachine,
+}
+
+WATCH_INTERVAL = 0.2
+
+def count_tokens(lexer):
+    token = lexer.current_token
+    count = 1
+    while token.type != Tk.EOF:
+        token = lexer.next_token()
+        count += 1
+    return count
+
+def analyse(text, args, hooks=None, stats=NO_STATS):
+    lexer_class = LEXERS[args.lexer]
+    if args.token_buffer:
+        with stats.phase('lex'):
+            tokens = TokenBuffer.from_lexer(lexer_class(text))
+        stats.count_tokens(len(tokens))
+        lexer = tokens.stream()
+    else:
+        if stats.enabled:
+            # a lexing pass of its own, only to measure it: the parser still
+            # pulls its tokens from a lexer, so the parse phase includes lexing
+            with stats.phase('lex'):
+                stats.count_tokens(count_tokens(lexer_class(text)))
+        lexer = lexer_class(text)
+    with stats.phase('parse'):
+        analyser = Analyser(lexer)
+        ast = analyser.parse()
+    stats.count_nodes(ast)
+    with stats.phase('analyse'):
+        symtab_builder = SemanticAnalyser(ast, hooks)
+        symtab_builder.run()
+    return ast
 
 def main():
     parser = argparse.ArgumentParser(
@@ -21,18 +90,307 @@ def main():
         help='Print call stack',
         action='store_true',
     )
+    parser.add_argument(
+        '--engine',
+        help='Execution engine: tree walker (ast, reference), compiled closures (closure) or bytecode VM (vm)',
+        choices=ENGINES,
+        default='ast',
+    )
+    parser.add_argument(
+        '--lexer',
+        help='Lexer: character scanner (char, reference), master regex (regex) '
+             'or master regex over the memory-mapped file (mmap, byte columns)',
+        choices=LEXERS,
+        default='char',
+    )
+    parser.add_argument(
+        '--token-buffer',
+        help='Lex the whole input before parsing and parse from the token buffer',
+        action='store_true',
+    )
+    parser.add_argument(
+        '-O',
+        dest='optimize',
+        help='Optimization level: 0 runs the tree as parsed, 1 folds constants '
+             'and removes dead branches and empty statements, 2 also inlines '
+             'calls of small pure functions',
+        type=int,
+        choices=[0, 1, 2],
+        default=0,
+    )
+    parser.add_argument(
+        '--inline-budget',
+        help='Largest function body, in nodes, that -O 2 inlines '
+             f'(default: {DEFAULT_INLINE_BUDGET})',
+        type=int,
+        default=DEFAULT_INLINE_BUDGET,
+    )
+    parser.add_argument(
+        '--memo-size',
+        help='Results cached per pure function, least recently used first out '
+             f'(default: {DEFAULT_MEMO_SIZE}, 0 disables; off while --stack traces calls)',
+        type=int,
+        default=DEFAULT_MEMO_SIZE,
+    )
+    parser.add_argument(
+        '--memo-stats',
+        help='Print the hits and misses of the result cache of each pure function to stderr',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--no-cache',
+        help='Do not read or write the compiled-program cache',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for the compiled-program cache '
+             '(default: __nscache__ next to the input file)',
+    )
+    parser.add_argument(
+        '--stats',
+        help='Print time, memory and counters for each phase to stderr',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--stats-json',
+        help='Write the --stats report as JSON to PATH (- for stdout)',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '--profile',
+        help='Profile the functions of the program and print a table to stderr '
+             '(ast engine only)',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--profile-out',
+        help='Write the --profile data to PATH in pstats format',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '--sample',
+        help='Sample the call stack while the program runs and print the '
+             'most frequent stacks to stderr',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--sample-out',
+        help='Write the --sample stacks to PATH in collapsed (flamegraph) format',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '--sample-interval',
+        help=f'Milliseconds between samples (default: {DEFAULT_INTERVAL * 1000:g})',
+        type=float,
+        default=DEFAULT_INTERVAL * 1000,
+    )
+    parser.add_argument(
+        '--emit-ast',
+        help='Write the analysed program as JSON to PATH (- or no PATH for stdout)',
+        nargs='?',
+        const='-',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '--compact',
+        help='Write --emit-ast JSON without indentation or spaces',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--emit-binary',
+        help=f'Write the analysed program to PATH in the binary AST format; '
+             f'an input file ending in {BINARY_SUFFIX} is loaded from that format',
+        metavar='PATH',
+    )
+    parser.add_argument(
+        '--flat',
+        help='Parse into the flat array-backed tree and run it with its own '
+             'executor (no cache, -O, --profile or --emit-*)',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--watch',
+        help='Run the program again whenever the input file changes, '
+             're-analysing only the functions that were edited',
+        action='store_true',
+    )
     args = parser.parse_args()
+    if (args.profile or args.profile_out) and args.engine != 'ast':
+        parser.error('--profile requires --engine ast')
+    if args.optimize >= 2 and (args.watch or args.emit_binary):
+        # inlined code adds variables SemanticAnalyser would not find in
+        # the source, and --watch keeps the nodes of unchanged functions
+        parser.error('-O 2 cannot be combined with --watch or --emit-binary')
+    if args.memo_size < 0:
+        parser.error('--memo-size must not be negative')
+    if not (args.sample_interval > 0 and math.isfinite(args.sample_interval)):
+        parser.error('--sample-interval must be a positive number')
+    if args.compact and not args.emit_ast:
+        parser.error('--compact requires --emit-ast')
+    if args.flat and (
+        args.optimize or args.profile or args.profile_out or args.emit_ast
+        or args.emit_binary or args.watch or args.inputfile.endswith(BINARY_SUFFIX)
+    ):
+        parser.error('--flat cannot be combined with -O, --profile, --emit-*, '
+                     '--watch or a binary input')
 
-    with open(args.inputfile, "r") as f :
-        text = f.read()
-        lexer = Lexer(text)
-        analyser = Analyser(lexer)
-        ast = analyser.parse()
-        executor = Executor(ast)
-        symtab_builder = SemanticAnalyser(ast)
-        # print(json.dumps(ast.dict(), indent = 4))
-        symtab_builder.run()
-        executor.run()
+    hooks = EventHooks()
+    if args.stack:
+        print_stack(hooks)
+    if args.scope:
+        print_scopes(hooks)
+
+    if args.watch:
+        try:
+            watch(args, hooks)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.inputfile.endswith(BINARY_SUFFIX):
+        with open(args.inputfile, "rb") as f :
+            source = nullcontext(f.read())
+    elif args.lexer == 'mmap':
+        # lexed in place, without reading the file into a str
+        source = open_source(args.inputfile)
+    else:
+        with open(args.inputfile, "r") as f :
+            source = nullcontext(f.read())
+
+    stats = Stats() if args.stats or args.stats_json else NO_STATS
+    with source as text, stats.instrument():
+        if args.flat:
+            run_flat(text, args, hooks, stats)
+        else:
+            run(text, args, hooks, stats)
+
+    if args.stats:
+        print(stats.report(), file=sys.stderr)
+    if args.stats_json == '-':
+        print(stats.json())
+    elif args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            f.write(stats.json())
+
+def watch(args, hooks):
+    program = IncrementalProgram(LEXERS[args.lexer], hooks)
+    mtime = None
+    while True:
+        try:
+            current = os.stat(args.inputfile).st_mtime_ns
+        except OSError:
+            current = None
+        if current is not None and current != mtime:
+            mtime = current
+            with open(args.inputfile, "r") as f :
+                text = f.read()
+            try:
+                start = time.perf_counter()
+                ast = program.update(text)
+                elapsed = time.perf_counter() - start
+                print(
+                    f'Analysed in {elapsed * 1000:.1f} ms: {program.reparsed} '
+                    f'functions parsed, {program.reanalysed} analysed',
+                    file=sys.stderr,
+                )
+                if args.optimize:
+                    Optimizer(ast).run()
+                ENGINES[args.engine](ast, hooks, memo_size=args.memo_size).run()
+            except Error as e:
+                print(e.message, file=sys.stderr)
+            except Exception as e:
+                print(f'{type(e).__name__}: {e}', file=sys.stderr)
+        time.sleep(WATCH_INTERVAL)
+
+def run_flat(text, args, hooks, stats):
+    # the flat tree is built by the same parser and analysed by the same
+    # SemanticAnalyser, then walked by node number
+    with stats.phase('parse'):
+        tree = flat.FlatAnalyser(LEXERS[args.lexer](text)).parse()
+    stats.count_kinds(tree)
+    with stats.phase('analyse'):
+        flat.analyse(tree, hooks)
+    execute(flat.FlatExecutor(tree, hooks, memo_size=args.memo_size), args, stats)
+
+def execute(executor, args, stats):
+    with stats.phase('execute'):
+        if args.sample or args.sample_out:
+            sampler = Sampler(executor.call_stack, args.sample_interval / 1000)
+            with sampler:
+                executor.run()
+        else:
+            executor.run()
+
+    if args.sample:
+        print(sampler.report(), file=sys.stderr)
+    if args.sample_out:
+        with open(args.sample_out, 'w') as f:
+            f.write(sampler.collapsed())
+    if args.memo_stats:
+        print(executor.memo.report(), file=sys.stderr)
+
+def run(text, args, hooks, stats):
+    cache = None if args.no_cache else ProgramCache(args.inputfile, args.cache_dir, args.lexer)
+    ast = None
+    if args.inputfile.endswith(BINARY_SUFFIX):
+        # already parsed, only the semantic analysis is left
+        cache = None
+        with stats.phase('load'):
+            ast = serializer.loads(text)
+        stats.count_nodes(ast)
+        with stats.phase('analyse'):
+            SemanticAnalyser(ast, hooks).run()
+    # the scopes are only reported while analysing, so --scope skips loading
+    elif cache and not args.scope:
+        with stats.phase('load'):
+            ast = cache.load(text)
+        if ast is not None:
+            stats.count_nodes(ast)
+    if ast is None:
+        ast = analyse(text, args, hooks, stats)
+        if cache:
+            with stats.phase('store'):
+                cache.store(text, ast)
+
+    if args.optimize:
+        with stats.phase('optimize'):
+            optimizer = Optimizer(ast)
+            optimizer.run()
+        stats.count_nodes(ast)
+        print(f'Optimizer: eliminated {optimizer.eliminated} nodes', file=sys.stderr)
+    if args.optimize >= 2:
+        if hooks.call_enter or hooks.call_leave:
+            # inlined calls would be missing from the reported stacks
+            print('Inliner: skipped, every call is traced', file=sys.stderr)
+        else:
+            with stats.phase('inline'):
+                inliner = Inliner(ast, args.inline_budget)
+                inliner.run()
+            stats.count_nodes(ast)
+            print(f'Inliner: inlined {inliner.inlined} calls', file=sys.stderr)
+    if args.emit_ast:
+        builder = ASTJsonBuilder(ast, indent=None if args.compact else 4)
+        if args.emit_ast == '-':
+            builder.write(sys.stdout)
+        else:
+            with open(args.emit_ast, 'w') as f:
+                builder.write(f)
+    if args.emit_binary:
+        with open(args.emit_binary, 'wb') as f:
+            serializer.dump(ast, f)
+    if args.profile or args.profile_out:
+        executor = ProfilingExecutor(
+            ast, hooks, filename=args.inputfile, memo_size=args.memo_size,
+        )
+    else:
+        executor = ENGINES[args.engine](ast, hooks, memo_size=args.memo_size)
+    execute(executor, args, stats)
+
+    if args.profile:
+        print(executor.report(), file=sys.stderr)
+    if args.profile_out:
+        executor.dump_stats(args.profile_out)
 
 if __name__ == '__main__':
     main()
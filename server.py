@@ -0,0 +1,194 @@
+from interpreter.stats import Stats, NO_STATS
+from batch import warm_up, run_source, error_dict
+from client import default_socket_path
+from main import LEXERS, ENGINES
+
+import argparse
+import gc
+import json
+import math
+import os
+import signal
+import socket
+import sys
+
+# a client that connects but does not send its request in time gives the
+# worker back
+REQUEST_TIMEOUT = 10
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+DEFAULTS = {
+    'engine': 'ast',
+    'lexer': 'char',
+    'optimize': 0,
+    'no_cache': False,
+    'cache_dir': None,
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_request(line):
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        raise BadRequest(f'Malformed request: {e}')
+    if not isinstance(message, dict):
+        raise BadRequest('A request must be a JSON object')
+    if ('source' in message) == ('path' in message):
+        raise BadRequest('A request needs exactly one of "source" and "path"')
+    options = argparse.Namespace(token_buffer=False, **DEFAULTS)
+    for name in DEFAULTS:
+        if message.get(name) is not None:
+            setattr(options, name, message[name])
+    if options.engine not in ENGINES:
+        raise BadRequest(f'Unknown engine {options.engine!r}')
+    if options.lexer not in LEXERS:
+        raise BadRequest(f'Unknown lexer {options.lexer!r}')
+    # seconds for setitimer; 0 or null means no limit
+    timeout = message.get('timeout')
+    if timeout is not None and (
+        isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+        or not (timeout >= 0 and math.isfinite(timeout))
+    ):
+        raise BadRequest(f'Invalid timeout {timeout!r}: seconds, 0 or more')
+    return message, options
+
+
+class TimeLimit(Exception):
+    pass
+
+
+def time_limit(signum, frame):
+    raise TimeLimit('the program ran for longer than its timeout')
+
+
+class Server:
+    # Pre-fork server: the parent imports and warms the interpreter once, then
+    # keeps `workers` forked children waiting on the socket. Every child
+    # serves a single connection and exits, so no state of one program (call
+    # stack, symbols, caches) ever reaches another; the parent forks the
+    # replacement while the next request is already served by a waiting child.
+    def __init__(self, socket_path, workers):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.children = set()
+        self.sock = None
+
+    def warm_up(self):
+        for lexer in LEXERS:
+            warm_up(argparse.Namespace(lexer=lexer, token_buffer=False))
+        # the warm objects are shared with every child; keeping them out of
+        # the collector stops it from touching (and copying) their pages
+        gc.freeze()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            self.remove_stale_socket()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(128)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            self.warm_up()
+            while True:
+                while len(self.children) < self.workers:
+                    self.children.add(self.spawn())
+                pid, status = os.wait()
+                self.children.discard(pid)
+        finally:
+            for pid in self.children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            self.sock.close()
+            os.unlink(self.socket_path)
+
+    def remove_stale_socket(self):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.unlink(self.socket_path)
+        else:
+            raise Exception(f'A server is already listening on {self.socket_path}')
+        finally:
+            probe.close()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            return pid
+        status = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            conn, _ = self.sock.accept()
+            self.sock.close()
+            with conn:
+                self.handle(conn)
+        except BaseException:
+            status = 1
+        finally:
+            # never return into the parent's loop
+            os._exit(status)
+
+    def handle(self, conn):
+        conn.settimeout(REQUEST_TIMEOUT)
+        with conn.makefile('rb') as f:
+            line = f.readline(MAX_REQUEST_SIZE)
+        conn.settimeout(None)
+        message = {}
+        try:
+            message, options = parse_request(line)
+            if 'path' in message:
+                path = message['path']
+                with open(path, 'r') as f:
+                    text = f.read()
+            else:
+                path, text = None, message['source']
+        except (BadRequest, OSError) as e:
+            reply = {
+                'path': message.get('path'),
+                'worker': os.getpid(),
+                'ok': False,
+                'error': error_dict(e),
+            }
+        else:
+            stats = Stats() if message.get('stats') else NO_STATS
+            if message.get('timeout'):
+                signal.signal(signal.SIGALRM, time_limit)
+                signal.setitimer(signal.ITIMER_REAL, message['timeout'])
+            reply = run_source(path, text, options, stats)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        conn.sendall(json.dumps(reply, default=repr).encode() + b'\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve program runs over a Unix socket from pre-warmed workers'
+    )
+    parser.add_argument('--socket', default=default_socket_path())
+    parser.add_argument(
+        '--workers',
+        help='Children waiting for a request (default: one per CPU)',
+        type=int,
+        default=os.cpu_count() or 1,
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    try:
+        Server(args.socket, args.workers).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
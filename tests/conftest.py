@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the interpreter runs from a checkout: make its packages importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
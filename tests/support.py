@@ -0,0 +1,38 @@
+from interpreter.lexer import Lexer
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.ast.closure import ClosureExecutor
+from interpreter.ast import flat
+from interpreter.ast.objects import iter_child_nodes
+from interpreter.vm.machine import VirtualMachine
+
+ENGINES = (Executor, ClosureExecutor, VirtualMachine)
+
+
+def analyse(source, lexer_class=Lexer):
+    tree = Analyser(lexer_class(source)).parse()
+    SemanticAnalyser(tree).run()
+    return tree
+
+
+def run(source, engine=Executor):
+    # the variables of main once the program has run
+    return engine(analyse(source)).run().members
+
+
+def run_flat(source, lexer_class=Lexer):
+    tree = flat.FlatAnalyser(lexer_class(source)).parse()
+    flat.analyse(tree)
+    return flat.FlatExecutor(tree).run().members
+
+
+def depth(node):
+    # levels below node, without recursing
+    deepest = 0
+    stack = [(node, 1)]
+    while stack:
+        node, level = stack.pop()
+        deepest = max(deepest, level)
+        stack.extend((child, level + 1) for child in iter_child_nodes(node))
+    return deepest
@@ -0,0 +1,66 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+
+import batch
+from support import run
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+
+
+def options(**overrides):
+    return argparse.Namespace(**{
+        'engine': 'ast', 'lexer': 'char', 'token_buffer': False,
+        'optimize': 0, 'no_cache': True, 'cache_dir': None, **overrides,
+    })
+
+
+def test_run_source():
+    result = batch.run_source(None, 'fun main do x: int; x = 6 * 7 end', options(engine='vm', optimize=2))
+    assert result['ok'] and result['globals'] == {'x': 42}
+    assert set(result['timings']) == {'analyse', 'execute', 'total'}
+    assert result['stdout'] == ''
+
+
+def test_errors_reported():
+    result = batch.run_source(None, 'fun main do x: int; x = y end', options())
+    assert not result['ok'] and result['error']['type'] == 'SemanticError'
+    assert set(result['timings']) == {'total'}
+    result = batch.run_source(None, 'fun main do x: float; x = 1 / 0 end', options())
+    assert result['error'] == {'type': 'ZeroDivisionError', 'message': 'ZeroDivisionError: division by zero'}
+
+
+def test_missing_file(monkeypatch):
+    monkeypatch.setattr(batch, '_options', options())
+    result = batch.run_program(os.path.join(PROGRAMS, 'missing.ns'))
+    assert result['error']['type'] == 'FileNotFoundError'
+
+
+def test_collect_paths(tmp_path):
+    manifest = tmp_path / 'list.txt'
+    manifest.write_text('# programs\na.ns  # first\n\nsub/b.ns\n')
+    paths = batch.collect_paths([PROGRAMS], str(manifest))
+    assert paths == sorted(glob.glob(os.path.join(PROGRAMS, '*.ns'))) + [
+        os.path.join(str(tmp_path), 'a.ns'), os.path.join(str(tmp_path), 'sub', 'b.ns'),
+    ]
+
+
+def test_run_batch_in_order():
+    paths = sorted(glob.glob(os.path.join(PROGRAMS, '*.ns')))
+    results = list(batch.run_batch(paths, options(), workers=2, chunksize=1))
+    assert [result['path'] for result in results] == paths
+    for path, result in zip(paths, results):
+        with open(path) as f:
+            assert result['globals'] == run(f.read())
+
+
+def test_rejects_bad_counts():
+    process = subprocess.run(
+        [sys.executable, 'batch.py', '--workers', '0', PROGRAMS],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert process.returncode == 2
+    assert '--workers must be at least 1' in process.stderr
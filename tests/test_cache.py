@@ -0,0 +1,56 @@
+import os
+
+from interpreter.cache import CACHE_DIRNAME, ProgramCache
+from interpreter.ast.executor import Executor
+
+from support import analyse
+
+SOURCE = 'fun main do x: int; x = 6 * 7 end'
+
+
+def write(path, text=SOURCE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_store_and_load(tmp_path):
+    cache = ProgramCache(write(tmp_path / 'a.ns'))
+    assert cache.load(SOURCE) is None
+    assert cache.store(SOURCE, analyse(SOURCE))
+    assert os.path.dirname(cache.path) == str(tmp_path / CACHE_DIRNAME)
+    tree = cache.load(SOURCE)
+    assert Executor(tree).run().members['x'] == 42
+
+
+def test_changed_source_misses(tmp_path):
+    cache = ProgramCache(write(tmp_path / 'a.ns'))
+    cache.store(SOURCE, analyse(SOURCE))
+    assert cache.load(SOURCE.replace('7', '8')) is None
+
+
+def test_lexers_do_not_share_entries(tmp_path):
+    path = write(tmp_path / 'a.ns')
+    ProgramCache(path, lexer='char').store(SOURCE, analyse(SOURCE))
+    assert ProgramCache(path, lexer='regex').load(SOURCE) is None
+
+
+def test_same_name_in_shared_cache_dir(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    other = SOURCE.replace('7', '8')
+    first = ProgramCache(write(tmp_path / 'a' / 'main.ns'), cache_dir)
+    second = ProgramCache(write(tmp_path / 'b' / 'main.ns', other), cache_dir)
+    assert first.path != second.path
+    assert first.store(SOURCE, analyse(SOURCE))
+    assert second.store(other, analyse(other))
+    assert Executor(first.load(SOURCE)).run().members['x'] == 42
+    assert Executor(second.load(other)).run().members['x'] == 48
+
+
+def test_corrupt_entry_misses(tmp_path):
+    cache = ProgramCache(write(tmp_path / 'a.ns'))
+    cache.store(SOURCE, analyse(SOURCE))
+    with open(cache.path, 'r+b') as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(b'\xff' * 8)
+    assert cache.load(SOURCE) is None
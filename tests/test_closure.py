@@ -0,0 +1,90 @@
+import pytest
+
+from interpreter.ast.closure import ClosureExecutor, _noop
+from interpreter.ast.executor import Executor
+
+from support import analyse, run
+
+NESTED_RETURNS = '''
+fun classify(n: int) do
+    if n > 0 do
+        if n > 100 do return 2 end;
+        return 1
+    end;
+    if n == 0 do return 0 end;
+    return -1
+end
+fun main do
+    a: int; b: int; c: int; d: int;
+    a = classify(500);
+    b = classify(5);
+    c = classify(0);
+    d = classify(-5)
+end
+'''
+
+CALLS_IN_ARGUMENTS = '''
+fun inc(n: int) do return n + 1 end
+fun add(a: int, b: int) do return a + b end
+fun main do
+    x: int;
+    x = add(inc(add(inc(1), inc(2))), add(inc(3), 10)) + inc(inc(0))
+end
+'''
+
+NO_VALUE = '''
+fun nothing(n: int) do
+    if n > 0 do return end;
+    n = 1
+end
+fun main do
+    x: int; y: int;
+    x = 1;
+    y = 2;
+    x = nothing(1);
+    y = nothing(0)
+end
+'''
+
+
+@pytest.mark.parametrize('source, expected', [
+    (NESTED_RETURNS, {'a': 2, 'b': 1, 'c': 0, 'd': -1}),
+    (CALLS_IN_ARGUMENTS, {'x': 22}),
+    (NO_VALUE, {'x': None, 'y': None}),
+], ids=['nested', 'arguments', 'no-value'])
+def test_returns(source, expected):
+    assert run(source, ClosureExecutor) == expected
+    assert run(source, Executor) == expected
+
+
+@pytest.mark.parametrize('memo_size', [0, 128])
+def test_returns_without_result_cache(memo_size):
+    executor = ClosureExecutor(analyse(CALLS_IN_ARGUMENTS), memo_size=memo_size)
+    assert executor.run().members == {'x': 22}
+
+
+def test_compiled_once():
+    executor = ClosureExecutor(analyse(NESTED_RETURNS))
+    program = executor.compile()
+    assert executor.compile() is program
+    first = executor.run().members
+    assert executor.run().members == first
+    assert executor.compile() is program
+
+
+def test_empty_main():
+    executor = ClosureExecutor(analyse('fun main do end'))
+    assert executor.compile() is _noop
+    assert executor.run().members == {}
+
+
+@pytest.mark.parametrize('expr, var_type', [
+    ('7 / 2', 'float'),
+    ('2.0 ** 3', 'float'),
+    ('2 ** -1', 'float'),
+    ('-7 // 2', 'int'),
+    ('!(1 == 2)', 'int'),
+])
+def test_specialized_operators(expr, var_type):
+    source = f'fun main do x: {var_type}; x = {expr} end'
+    assert run(source, ClosureExecutor) == run(source, Executor)
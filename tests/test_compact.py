@@ -0,0 +1,58 @@
+import glob
+import inspect
+import os
+
+import pytest
+
+from interpreter.ast import objects
+from interpreter.ast.objects import AST, BinOpNode, FactorNode, walk
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from benchmarks.bench_memory import lex_all, synthetic_program, traced
+from support import analyse
+
+PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'programs', '*.ns')))
+NODE_CLASSES = [
+    cls for _, cls in inspect.getmembers(objects, inspect.isclass)
+    if issubclass(cls, AST)
+]
+
+
+@pytest.mark.parametrize('cls', NODE_CLASSES, ids=lambda cls: cls.__name__)
+def test_node_classes_declare_slots(cls):
+    assert '__slots__' in vars(cls)
+
+
+@pytest.mark.parametrize('path', PROGRAMS, ids=os.path.basename)
+def test_no_instance_dicts(path):
+    with open(path) as f:
+        tree = analyse(f.read())
+    for node in walk(tree):
+        assert not hasattr(node, '__dict__'), type(node).__name__
+        token = getattr(node, 'token', None)
+        assert not hasattr(token, '__dict__')
+    for scope_symbol in tree.scope._symbols.values():
+        assert not hasattr(scope_symbol, '__dict__')
+
+
+def test_derived_fields():
+    tree = analyse('fun main do x: int; x = 2 + 3 end')
+    right = tree.init_block.statements[-1].right
+    assert isinstance(right, BinOpNode)
+    assert right.token is right.op
+    assert isinstance(right.left, FactorNode)
+    assert right.left.value == right.left.token.value == 2
+
+
+def test_lexer_tokens_without_dicts():
+    for lexer_class in (Lexer, RegexLexer):
+        assert not hasattr(lexer_class('x').current_token, '__dict__')
+
+
+def test_synthetic_program_measured():
+    text = synthetic_program(40)
+    assert len(text.splitlines()) >= 40
+    tokens, size = traced(lambda: lex_all(text))
+    assert tokens[-1].type.name == 'EOF'
+    assert size > 0
+    analyse(text)
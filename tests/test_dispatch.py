@@ -0,0 +1,65 @@
+import operator
+
+import pytest
+
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.ast.objects import BinOpNode, FactorNode, NoOpNode, UnaryOpNode, VarNode
+from interpreter.ast.executor import Executor
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.lexer import Token
+from interpreter.operators import BINARY_OPERATORS
+from interpreter.tokens_type import TokenType as Tk
+from support import ENGINES, run
+
+
+class Counter(NodeVisitor):
+    def visit_NoOpNode(self, node):
+        return 'noop'
+
+
+class Recounter(Counter):
+    def visit_NoOpNode(self, node):
+        return 'again'
+
+
+def test_table_per_class():
+    assert Counter().visit(NoOpNode()) == 'noop'
+    assert Recounter().visit(NoOpNode()) == 'again'
+    assert Counter._dispatch[NoOpNode] is Counter.visit_NoOpNode
+    assert Recounter._dispatch[NoOpNode] is Recounter.visit_NoOpNode
+    assert NoOpNode not in NodeVisitor._dispatch
+    assert Executor._dispatch is not SemanticAnalyser._dispatch
+
+
+def test_missing_visit_method():
+    with pytest.raises(Exception, match='No visit_VarNode method'):
+        Counter().visit(VarNode(Token(Tk.ID, 'x')))
+    assert Counter._dispatch[VarNode] == Counter.generic_visit
+
+
+def test_operator_resolved_on_node():
+    one = FactorNode(Token(Tk.INTEGER_VALUE, 1))
+    for op_type, function in BINARY_OPERATORS.items():
+        assert BinOpNode(one, Token(op_type, op_type.value), one).op_fn is function
+    assert BinOpNode(one, Token(Tk.AND, 'and'), one).op_fn is None
+    assert UnaryOpNode(Token(Tk.NOT, '!'), one).op_fn is operator.not_
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=lambda engine: engine.__name__)
+def test_short_circuit(engine):
+    members = run(
+        'fun main do x: float; y: float; z: int; w: int; '
+        'x = 0 and 1 / 0; y = 3 or 1 / 0; z = 2 and 5; w = 0 or 0 end',
+        engine,
+    )
+    assert members == {'x': 0, 'y': 3, 'z': 5, 'w': 0}
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=lambda engine: engine.__name__)
+def test_comparisons(engine):
+    members = run(
+        'fun main do a: int; b: int; c: int; d: int; '
+        'a = 2 >= 2; b = 1 != 1; c = 3 <= 2; d = \'a\' == \'a\' end',
+        engine,
+    )
+    assert members == {'a': True, 'b': False, 'c': False, 'd': True}
@@ -0,0 +1,98 @@
+import glob
+import os
+from argparse import Namespace
+
+import pytest
+
+import main
+from interpreter.events import EventHooks, ASSIGN, CALL_ENTER, CALL_LEAVE
+from interpreter.ast import flat
+from interpreter.ast.optimizer import Optimizer
+from interpreter.ast.inliner import Inliner
+from benchmarks.workload import WORKLOADS, generate
+from benchmarks.bench_memo import fibonacci_program
+from benchmarks.bench_inline import helpers_program
+from benchmarks.bench_engines import arithmetic_program, calls_program
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+PROGRAMS = {
+    os.path.basename(path): read(path)
+    for path in sorted(glob.glob(os.path.join(ROOT, 'tests', 'programs', '*.ns')))
+}
+PROGRAMS['program.ns'] = read(os.path.join(ROOT, 'program.ns'))
+PROGRAMS['fibonacci'] = fibonacci_program(12)
+PROGRAMS['helpers'] = helpers_program(4)
+PROGRAMS['calls'] = calls_program(4)
+PROGRAMS['arithmetic'] = arithmetic_program(3, 6)
+for name in ('base', 'fanout'):
+    PROGRAMS[f'workload-{name}'] = generate(WORKLOADS[name].scaled(functions=4), seed=1)
+
+CONFIGURATIONS = [
+    (engine, lexer, token_buffer, optimize)
+    for engine in main.ENGINES
+    for lexer in main.LEXERS
+    for token_buffer in (False, True)
+    for optimize in (0, 1, 2)
+] + [('flat', lexer, False, 0) for lexer in main.LEXERS]
+
+
+def configuration_id(configuration):
+    engine, lexer, token_buffer, optimize = configuration
+    return f'{engine}-{lexer}{"-buffer" if token_buffer else ""}-O{optimize}'
+
+
+def execute(text, engine='ast', lexer='char', token_buffer=False, optimize=0, hooks=None):
+    # the variables of main, run as main.py would
+    if engine == 'flat':
+        tree = flat.FlatAnalyser(main.LEXERS[lexer](text)).parse()
+        flat.analyse(tree, hooks)
+        return flat.FlatExecutor(tree, hooks).run().members
+    ast = main.analyse(text, Namespace(lexer=lexer, token_buffer=token_buffer), hooks)
+    if optimize >= 1:
+        Optimizer(ast).run()
+    if optimize >= 2:
+        Inliner(ast).run()
+    return main.ENGINES[engine](ast, hooks).run().members
+
+
+def traced(text, *configuration):
+    # every call and assignment as the program runs; tracing also turns off
+    # the result cache of pure functions
+    events = []
+    hooks = EventHooks()
+    hooks.subscribe(CALL_ENTER, lambda ar, call_stack: events.append(('enter', ar.name)))
+    hooks.subscribe(CALL_LEAVE, lambda ar, call_stack: events.append(('leave', ar.name)))
+    hooks.subscribe(ASSIGN, lambda ar, name, value: events.append((ar.name, name, value)))
+    members = execute(text, *configuration, hooks=hooks)
+    return members, events
+
+
+@pytest.fixture(scope='module')
+def expected():
+    # the tree-walking Executor on the parsed tree is the reference
+    return {name: traced(text) for name, text in PROGRAMS.items()}
+
+
+@pytest.mark.parametrize('configuration', CONFIGURATIONS, ids=configuration_id)
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_same_result_as_executor(expected, name, configuration):
+    members, events = expected[name]
+    text = PROGRAMS[name]
+    assert execute(text, *configuration) == members
+    optimize = configuration[3]
+    # inlined calls are neither entered nor left
+    if optimize < 2:
+        assert traced(text, *configuration) == (members, events)
+
+
+def test_programs_do_something(expected):
+    for name, (members, events) in expected.items():
+        assert events, name
+        assert any(value is not None for value in members.values()) or not members, name
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+from interpreter.analyser import Analyser
+from interpreter.lexer import Lexer
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.events import (
+    ASSIGN, BRANCH_TAKEN, CALL_ENTER, CALL_LEAVE, EVENTS, SCOPE_CLOSE, SCOPE_OPEN,
+    EventHooks, print_stack,
+)
+from support import ENGINES, analyse
+
+SOURCE = 'fun f(a: int) do if a do return a end end fun main do x: int; x = f(2) end'
+
+
+def test_subscribe_and_unsubscribe():
+    hooks = EventHooks()
+    assert not hooks
+    seen = []
+    callback = hooks.subscribe(ASSIGN, seen.append)
+    assert hooks and hooks.assign == [callback]
+    hooks.emit(ASSIGN, 1)
+    hooks.unsubscribe(ASSIGN, callback)
+    hooks.emit(ASSIGN, 2)
+    assert seen == [1] and not hooks
+
+
+def test_unknown_event():
+    hooks = EventHooks()
+    for method in (hooks.subscribe, hooks.unsubscribe):
+        with pytest.raises(ValueError, match="Unknown event 'assignment'"):
+            method('assignment', print)
+    with pytest.raises(ValueError):
+        hooks.emit('assignment')
+
+
+def test_scope_events_do_not_watch_execution():
+    hooks = EventHooks()
+    hooks.subscribe(SCOPE_OPEN, print)
+    assert hooks and not hooks.watch_execution()
+    hooks.subscribe(BRANCH_TAKEN, print)
+    assert hooks.watch_execution()
+
+
+def test_scopes_opened_and_closed():
+    hooks = EventHooks()
+    trace = []
+    hooks.subscribe(SCOPE_OPEN, lambda scope: trace.append(('open', scope.scope_name)))
+    hooks.subscribe(SCOPE_CLOSE, lambda scope: trace.append(('close', scope.scope_name)))
+    SemanticAnalyser(Analyser(Lexer(SOURCE)).parse(), hooks).run()
+    assert trace[0][0] == 'open' and trace[-1][0] == 'close'
+    assert ('open', 'f') in trace and ('close', 'f') in trace
+    assert len(trace) == 2 * len({name for _, name in trace})
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=lambda engine: engine.__name__)
+def test_execution_events(engine):
+    hooks = EventHooks()
+    trace = []
+    for event in EVENTS[:4]:
+        hooks.subscribe(event, lambda *args, event=event: trace.append(event))
+    hooks.subscribe(ASSIGN, lambda ar, name, value: trace.append((name, value)))
+    engine(analyse(SOURCE), hooks).run()
+    assert trace == [
+        CALL_ENTER, CALL_ENTER, BRANCH_TAKEN, CALL_LEAVE,
+        ASSIGN, ('x', 2), CALL_LEAVE,
+    ]
+
+
+def test_print_stack():
+    hooks = EventHooks()
+    out = io.StringIO()
+    print_stack(hooks, out)
+    ENGINES[0](analyse(SOURCE), hooks).run()
+    lines = [line for line in out.getvalue().splitlines() if line.startswith(('ENTER', 'LEAVE'))]
+    assert lines == ['ENTER: main', 'ENTER: PROCEDURE f', 'LEAVE: PROCEDURE f', 'LEAVE: main']
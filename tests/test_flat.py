@@ -0,0 +1,92 @@
+from collections import Counter
+
+import pytest
+
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.mmap_lexer import MmapLexer
+from interpreter.analyser import Analyser
+from interpreter.exceptions import SemanticError
+from interpreter.ast import flat
+from interpreter.ast.objects import walk
+
+from support import analyse, run, run_flat
+
+SOURCE = '''fun fact(n: int) do
+    if n > 1 do return n * fact(n - 1) end;
+    return 1
+end
+fun main do
+    x: int; y: float; s: string;
+    x = fact(10) % 1000;
+    y = x / 3 + 0.5;
+    s = 'n=' + 'x';
+    if x > 5 and !(x == 7) do x = -x end
+end
+'''
+
+LEXERS = [Lexer, RegexLexer, lambda text: MmapLexer(text.encode())]
+
+
+def preorder(tree, index):
+    stack = [index]
+    while stack:
+        index = stack.pop()
+        yield index
+        stack.extend(reversed(list(tree.children(index))))
+
+
+def build(source, lexer_class=Lexer):
+    return flat.FlatAnalyser(lexer_class(source)).parse()
+
+
+@pytest.mark.parametrize('lexer_class', LEXERS)
+def test_same_result_as_executor(lexer_class):
+    assert run_flat(SOURCE, lexer_class) == run(SOURCE)
+
+
+@pytest.mark.parametrize('lexer_class', LEXERS)
+def test_same_nodes_and_positions(lexer_class):
+    tree = build(SOURCE, lexer_class)
+    nodes = list(walk(Analyser(lexer_class(SOURCE)).parse()))
+    indexes = list(preorder(tree, tree.root))
+    assert [flat.KIND_NAMES[tree.kind[i]] for i in indexes] == [type(n).__name__ for n in nodes]
+    for index, node in zip(indexes, nodes):
+        token = getattr(node, 'token', None)
+        if token is None:
+            continue
+        flat_token = tree.token(index)
+        assert flat_token.type == token.type
+        assert (flat_token.lineno, flat_token.column) == (token.lineno, token.column)
+
+
+def test_kind_counts():
+    tree = build(SOURCE)
+    expected = Counter(type(node).__name__ for node in walk(analyse(SOURCE)))
+    # the declaration of main is kept, though its block moved to the program
+    expected['FunctionDeclarationNode'] += 1
+    assert tree.kind_counts() == expected
+    assert len(tree) == sum(expected.values())
+
+
+def test_slots_made_once_complete():
+    tree = build(SOURCE)
+    assert len(tree.slot) == len(tree)
+    assert set(tree.slot) == {flat.NONE}
+    flat.analyse(tree)
+    assert set(tree.slot) != {flat.NONE}
+
+
+def test_error_positions_match():
+    source = 'fun main do\n    x: int;\n    x = 1 + \'a\'\nend\n'
+    with pytest.raises(SemanticError) as expected:
+        analyse(source, RegexLexer)
+    with pytest.raises(SemanticError) as error:
+        flat.analyse(build(source, RegexLexer))
+    assert error.value.message == expected.value.message
+
+
+def test_smaller_than_objects():
+    tree = build(SOURCE)
+    # the columns take a few bytes per node
+    assert tree.nbytes() < 40 * len(tree)
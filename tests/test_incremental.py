@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from interpreter.exceptions import SemanticError
+from interpreter.incremental import IncrementalProgram, split_functions
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.ast.executor import Executor
+from support import run
+
+DOUBLE = 'fun g(a: int) do return a * 2 end\n'
+INCREMENT = 'fun h(a: int) do return a + 1 end\n'
+MAIN = 'fun main do x: int; y: int; x = g(3); y = h(x) end\n'
+SOURCE = DOUBLE + INCREMENT + MAIN
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEXERS = pytest.mark.parametrize('lexer_class', (Lexer, RegexLexer), ids=('char', 'regex'))
+
+
+def update(program, text):
+    members = Executor(program.update(text)).run().members
+    assert members == run(text)
+    return program.reparsed, program.reanalysed
+
+
+@LEXERS
+def test_only_changed_functions_redone(lexer_class):
+    program = IncrementalProgram(lexer_class)
+    assert update(program, SOURCE) == (3, 3)
+    assert update(program, SOURCE) == (0, 0)
+    assert update(program, DOUBLE + INCREMENT.replace('+ 1', '+ 5') + MAIN) == (1, 1)
+
+
+@LEXERS
+def test_changed_signature_reanalyses_callers(lexer_class):
+    program = IncrementalProgram(lexer_class)
+    update(program, SOURCE)
+    edited = DOUBLE.replace('a: int)', 'a: int, b: int)').replace('a * 2', 'a * b')
+    assert update(program, edited + INCREMENT + MAIN.replace('g(3)', 'g(3, 4)')) == (2, 2)
+
+
+@LEXERS
+def test_moved_functions_keep_nodes(lexer_class):
+    program = IncrementalProgram(lexer_class)
+    first = program.update(SOURCE)
+    moved = program.update('\n\n' + SOURCE)
+    assert (program.reparsed, program.reanalysed) == (0, 0)
+    assert moved.utils[1] is first.utils[1]
+    assert moved.utils[1].block_node.statements[0].token.lineno == 4
+
+
+@LEXERS
+def test_recovers_after_error(lexer_class):
+    program = IncrementalProgram(lexer_class)
+    update(program, SOURCE)
+    with pytest.raises(SemanticError):
+        program.update(SOURCE.replace('h(x)', 'h(z)'))
+    # nothing is parsed again, but everything is checked again
+    assert update(program, SOURCE) == (0, 3)
+
+
+def test_source_without_functions():
+    program = IncrementalProgram()
+    with pytest.raises(Exception):
+        program.update('x = 1')
+    assert program.update(SOURCE).utils
+
+
+def test_split_skips_strings_and_comments():
+    prefix, chunks = split_functions("{fun} x 'fun' fun a do end fun-b")
+    assert prefix == "{fun} x 'fun' "
+    assert chunks == [(14, 1, 'fun a do end fun-b')]
+    _, chunks = split_functions(SOURCE)
+    assert [lineno for _, lineno, _ in chunks] == [1, 2, 3]
+
+
+def test_watch(tmp_path):
+    path = tmp_path / 'program.ns'
+    path.write_text(SOURCE)
+    process = subprocess.Popen(
+        [sys.executable, 'main.py', '--watch', '--no-cache', str(path)],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        assert 'Analysed' in process.stderr.readline()
+        for text, expected in (
+            (DOUBLE + INCREMENT.replace('+ 1', '+ 5') + MAIN, '1 functions parsed, 1 analysed'),
+            (SOURCE.replace('h(x)', 'h(z)'), 'Identifier not found'),
+            (SOURCE, '0 functions parsed, 3 analysed'),
+        ):
+            path.write_text(text)
+            # a new mtime even on file systems with a coarse clock
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            line = process.stderr.readline()
+            assert expected in line
+    finally:
+        process.kill()
+        process.wait()
+        process.stderr.close()
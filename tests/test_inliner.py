@@ -0,0 +1,62 @@
+import pytest
+
+from interpreter.ast.inliner import Inliner
+from interpreter.ast.objects import FunctionCallNode, walk
+from support import ENGINES, analyse, run
+
+SQUARE = 'fun sq(a: int) do return a * a end '
+
+
+def inline(source, budget=None):
+    tree = analyse(source)
+    inliner = Inliner(tree) if budget is None else Inliner(tree, budget)
+    inliner.run()
+    calls = sum(isinstance(node, FunctionCallNode) for node in walk(tree.init_block))
+    return tree, inliner.inlined, calls
+
+
+@pytest.mark.parametrize('source, inlined, calls', [
+    (SQUARE + 'fun main do x: int; x = sq(3) end', 1, 0),
+    # the inner call becomes the assignment to the parameter of the outer one
+    (SQUARE + 'fun inc(a: int) do return a + 1 end fun main do x: int; x = sq(inc(2)) end', 2, 0),
+    # which must not overwrite the parameter of the same function
+    (SQUARE + 'fun main do x: int; x = sq(sq(2)) end', 1, 1),
+    (SQUARE + 'fun main do sq(2) end', 0, 1),
+    (
+        'fun fib(n: int) do if n < 2 do return n end; return fib(n - 1) + fib(n - 2) end '
+        'fun main do x: int; x = fib(10) end',
+        0, 1,
+    ),
+    (
+        'fun down(n: int) do if n > 0 do down(n - 1) end end '
+        'fun main do down(3) end',
+        0, 1,
+    ),
+], ids=['call', 'nested', 'nested-same', 'dropped-result', 'early-return', 'recursive'])
+def test_what_is_inlined(source, inlined, calls):
+    tree, count, remaining = inline(source)
+    assert (count, remaining) == (inlined, calls)
+    for engine in ENGINES:
+        assert engine(tree).run().members == run(source)
+
+
+def test_budget():
+    source = SQUARE + 'fun main do x: int; x = sq(3) end'
+    assert inline(source, budget=3)[1:] == (0, 1)
+    assert inline(source, budget=5)[1:] == (1, 0)
+
+
+def test_locals_start_empty_for_every_call():
+    source = (
+        'fun f(a: int) do b: int; if a do b = a end; return b end '
+        'fun main do x: int; y: int; x = f(1); y = f(0) end'
+    )
+    tree, count, _ = inline(source)
+    assert count == 2
+    members = ENGINES[0](tree).run().members
+    assert members == run(source) == {'x': 1, 'y': None}
+
+
+def test_inlined_slots_named_after_function():
+    tree, _, _ = inline(SQUARE + 'fun main do x: int; x = sq(3) end')
+    assert tree.scope.slot_names == ['x', 'sq.a']
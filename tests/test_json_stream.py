@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from interpreter.lexer import Token
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.ast import json_stream, objects
+from interpreter.ast.executor import ASTJsonBuilder
+from interpreter.ast.objects import AST, BlockNode, FactorNode
+
+from support import analyse
+
+SOURCE = '''fun add(a: int, b: int) do
+    return a + b
+end
+fun main do
+    x: int = 1; s: string; f: float;
+    s = 'a\\n"b"';
+    f = 2.5;
+    if x > 0 and !(x == 5) do x = add(x, -2) end;
+    x = add(x, 3) ** 2
+end
+'''
+
+NODE_CLASSES = [
+    cls for cls in vars(objects).values()
+    if isinstance(cls, type) and issubclass(cls, AST) and cls is not AST
+]
+
+
+@pytest.mark.parametrize('indent', [None, 0, 2, 4])
+def test_stream_matches_json_dumps(indent):
+    tree = analyse(SOURCE)
+    streamed = ''.join(json_stream.iterencode(tree, indent))
+    # without an indent, nothing separates the items at all
+    separators = (',', ':') if indent is None else None
+    assert streamed == json.dumps(tree.dict(), indent=indent, separators=separators)
+
+
+def test_dump_writes_in_batches():
+    tree = analyse(SOURCE)
+    out = io.StringIO()
+    ASTJsonBuilder(tree).write(out)
+    assert out.getvalue() == ASTJsonBuilder(tree).run() + '\n'
+    assert json.loads(out.getvalue()) == tree.dict()
+
+
+def test_long_expression():
+    count = 100000
+    tree = analyse('fun main do x: int; x = ' + ' + '.join(['1'] * count) + ' end')
+    data = json.loads(ASTJsonBuilder(tree, indent=None).run())
+    assert data == tree.dict()
+
+
+@pytest.mark.parametrize('cls', NODE_CLASSES, ids=lambda cls: cls.__name__)
+def test_every_node_class_has_a_shape(cls):
+    tree = analyse(SOURCE)
+    nodes = [node for node in objects.walk(tree) if type(node) is cls]
+    assert nodes or cls is objects.NoOpNode
+    for node in nodes:
+        json.dumps(objects.to_dict(node))
+
+
+def test_default_shape():
+    class PairNode(AST):
+        __slots__ = ('first', 'second', 'scope')
+        _fields = ('first', 'second')
+
+        def __init__(self, first, second):
+            self.first = first
+            self.second = second
+            self.scope = object()
+
+    class NameNode(AST):
+        __slots__ = ('token',)
+
+        def __init__(self, token):
+            self.token = token
+
+    one = FactorNode(Token(Tk.INTEGER_VALUE, 1, 1, 1))
+    node = PairNode(one, BlockNode([NameNode(Token(Tk.ID, 'n', 1, 1))]))
+    assert node.dict() == {'first': 1, 'second': ['n']}
+    assert ''.join(json_stream.iterencode(node, None)) == '{"first":1,"second":["n"]}'
@@ -0,0 +1,82 @@
+import glob
+import os
+import pickle
+
+import pytest
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.exceptions import LexerError
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import LineTable, RegexLexer
+
+TRICKY = (
+    "fun Main DO x-y--z: int; {c\nomment} s = 'a b' + 1.5 + 2. + 10 ** 3 // 2"
+    " >= <= != == ! end\n{ a } { b }\n 'unterminated"
+)
+PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'programs', '*.ns')))
+
+
+def tokens(lexer):
+    token = lexer.current_token
+    out = [token]
+    while token.type != Tk.EOF:
+        token = lexer.next_token()
+        out.append(token)
+    return out
+
+
+def sources():
+    yield TRICKY
+    for path in PROGRAMS:
+        with open(path) as f:
+            yield f.read()
+
+
+@pytest.mark.parametrize('source', list(sources()), ids=['tricky'] + [os.path.basename(p) for p in PROGRAMS])
+def test_same_tokens_as_char_lexer(source):
+    expected = tokens(Lexer(source))
+    actual = tokens(RegexLexer(source))
+    assert [(t.type, t.value) for t in actual] == [(t.type, t.value) for t in expected]
+    for token, reference in zip(actual, expected):
+        # the char lexer leaves some positions out
+        if reference.lineno is not None:
+            assert (token.lineno, token.column) == (reference.lineno, reference.column)
+
+
+def test_identifiers_interned():
+    first, _, second = tokens(RegexLexer('some-name + some-name'))[:3]
+    assert first.type == Tk.ID
+    assert first.value is second.value
+
+
+def test_keywords_case_insensitive():
+    assert [token.type for token in tokens(RegexLexer('If iF IF'))] == [Tk.IF] * 3 + [Tk.EOF]
+
+
+def test_peek_does_not_advance():
+    lexer = RegexLexer('a = 1 + 2')
+    assert lexer.peek_token().type == Tk.ASSIGN
+    assert lexer.peek_token(3).type == Tk.PLUS
+    assert lexer.next_token().type == Tk.ASSIGN
+
+
+def test_error_message_matches_char_lexer():
+    messages = []
+    for lexer_class in (Lexer, RegexLexer):
+        with pytest.raises(LexerError) as error:
+            tokens(lexer_class('x = 1\ny = 2 $ 3'))
+        messages.append(error.value.message)
+    assert messages[0] == messages[1]
+    assert 'line: 2 column: 7' in messages[1]
+
+
+def test_first_line():
+    token = RegexLexer('\n  x', lineno=10).current_token
+    assert (token.lineno, token.column) == (11, 3)
+
+
+def test_line_table_pickles_without_text():
+    table = LineTable('a\nbb\nccc\n')
+    clone = pickle.loads(pickle.dumps(table))
+    assert clone.text is None
+    assert clone.position(5) == table.position(5) == (3, 1)
@@ -0,0 +1,70 @@
+import pytest
+
+from interpreter.events import ASSIGN, EventHooks
+from interpreter.memo import MISSING, LRUCache, Memo
+from support import ENGINES, analyse
+
+FIB = (
+    'fun fib(n: int) do if n < 2 do return n end; return fib(n - 1) + fib(n - 2) end '
+    'fun main do x: int; x = fib(20) end'
+)
+ENGINE_IDS = [engine.__name__ for engine in ENGINES]
+
+
+def test_lru_eviction():
+    cache = LRUCache('f', 2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    assert cache.get(1) == 'a'
+    cache.put(3, 'c')
+    # 2 was used least recently
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == 'a' and cache.get(3) == 'c'
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_key_keeps_types_apart():
+    keys = {LRUCache.key(arguments) for arguments in ([1], [1.0], [True], ['1'])}
+    assert len(keys) == 4
+
+
+class Symbol:
+    def __init__(self, name, pure):
+        self.name = name
+        self.pure = pure
+
+
+def test_only_pure_functions():
+    pure = Symbol('f', True)
+    memo = Memo()
+    assert memo.cache(pure) is memo.cache(pure)
+    assert memo.cache(Symbol('g', False)) is None
+    assert Memo(0).cache(pure) is None
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=ENGINE_IDS)
+def test_hits(engine):
+    executor = engine(analyse(FIB))
+    assert executor.run().members == {'x': 6765}
+    stats = executor.memo.stats()['fib']
+    # each of fib(0) .. fib(20) is computed once; fib(n - 2) is a hit for
+    # n from 3 up
+    assert stats['misses'] == 21
+    assert stats['hits'] == 18
+    assert 'fib' in executor.memo.report()
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=ENGINE_IDS)
+def test_off(engine):
+    executor = engine(analyse(FIB), memo_size=0)
+    assert executor.run().members == {'x': 6765}
+    assert executor.memo.stats() == {}
+
+
+@pytest.mark.parametrize('engine', ENGINES, ids=ENGINE_IDS)
+def test_off_while_watched(engine):
+    hooks = EventHooks()
+    hooks.subscribe(ASSIGN, lambda ar, name, value: None)
+    executor = engine(analyse(FIB), hooks)
+    executor.run()
+    assert executor.memo.stats() == {}
@@ -0,0 +1,53 @@
+import pytest
+
+from interpreter.exceptions import LexerError
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.regex_lexer import RegexLexer
+from interpreter.mmap_lexer import MmapLexer, open_source
+from interpreter.analyser import Analyser
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from test_lexers import PROGRAMS, sources, tokens
+from support import run
+
+
+def fields(token):
+    return token.type, token.value, token.lineno, token.column
+
+
+@pytest.mark.parametrize('source', list(sources()))
+def test_same_tokens_as_regex_lexer(source):
+    assert list(map(fields, tokens(MmapLexer(source)))) == list(map(fields, tokens(RegexLexer(source))))
+
+
+def test_columns_count_bytes():
+    mapped = tokens(MmapLexer("fun é-x do end"))
+    assert mapped[1].value == 'é-x'
+    assert [token.column for token in mapped] == [1, 5, 10, 13, 16]
+    assert tokens(RegexLexer("fun é-x do end"))[2].column == 9
+
+
+def test_invalid_utf8():
+    with pytest.raises(LexerError) as error:
+        tokens(MmapLexer(b'fun \xff do end'))
+    assert 'line: 1 column: 5' in error.value.message
+
+
+def test_open_source(tmp_path):
+    path = tmp_path / 'program.ns'
+    source = PROGRAMS[0]
+    with open(source, 'rb') as f:
+        path.write_bytes(f.read())
+    with open_source(str(path)) as data:
+        tree = Analyser(MmapLexer(data)).parse()
+    SemanticAnalyser(tree).run()
+    with open(source) as f:
+        assert Executor(tree).run().members == run(f.read())
+
+
+def test_open_empty_file(tmp_path):
+    path = tmp_path / 'empty.ns'
+    path.write_bytes(b'')
+    with open_source(str(path)) as data:
+        assert data == b''
+        assert MmapLexer(data).current_token.type == Tk.EOF
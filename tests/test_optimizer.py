@@ -0,0 +1,73 @@
+import pytest
+
+from interpreter.ast.objects import BinOpNode, FactorNode, FunctionCallNode
+from interpreter.ast.optimizer import MAX_FOLDED_SIZE, Optimizer, too_large
+from interpreter.tokens_type import TokenType as Tk
+from support import analyse, run
+
+
+def optimize(source):
+    tree = analyse(source)
+    optimizer = Optimizer(tree)
+    optimizer.run()
+    return optimizer, tree.init_block.statements
+
+
+def test_constants_folded():
+    optimizer, statements = optimize('fun main do x: int; x = (2 * 3 + 1) ** 2 - -1 end')
+    assert isinstance(statements[-1].right, FactorNode)
+    assert statements[-1].right.value == 50
+    assert optimizer.eliminated == 9
+
+
+def test_variables_not_folded():
+    _, statements = optimize('fun main do x: int; y: int; y = 1; x = y + 2 * 3 end')
+    right = statements[-1].right
+    assert isinstance(right, BinOpNode)
+    assert right.right.value == 6
+
+
+def test_dead_branches():
+    optimizer, statements = optimize(
+        'fun main do x: int; x = 1; if 1 > 2 do x = 5 end; if 2 > 1 do x = 7; x = x + 1 end end'
+    )
+    assert [statement.right.value for statement in statements[1:3]] == [1, 7]
+    assert isinstance(statements[3].right, BinOpNode)
+    assert len(statements) == 4
+
+
+def test_short_circuit_folded():
+    _, statements = optimize('fun main do x: int; y: int; x = 0 and y; y = 1 or x end')
+    assert [statement.right.value for statement in statements[2:]] == [0, 1]
+
+
+def test_code_after_return_dropped():
+    tree = analyse('fun f do return 1; return 2 end fun main do y: int; y = f() end')
+    Optimizer(tree).run()
+    assert len(tree.utils[0].block_node.statements) == 1
+    assert isinstance(tree.init_block.statements[-1].right, FunctionCallNode)
+
+
+def test_errors_left_for_run_time():
+    source = 'fun main do x: float; x = 1 / 0 end'
+    _, statements = optimize(source)
+    assert isinstance(statements[-1].right, BinOpNode)
+    with pytest.raises(ZeroDivisionError):
+        run(source)
+
+
+@pytest.mark.parametrize('op_type, left, right, large', [
+    (Tk.EXPONENT, 2, 5000, True),
+    (Tk.EXPONENT, 2, 100, False),
+    (Tk.EXPONENT, 1, 10 ** 9, False),
+    (Tk.MUL, 'ab', MAX_FOLDED_SIZE, True),
+    (Tk.MUL, MAX_FOLDED_SIZE // 2, 'ab', False),
+    (Tk.MUL, 10 ** 9, 10 ** 9, False),
+])
+def test_too_large(op_type, left, right, large):
+    assert too_large(op_type, left, right) == large
+
+
+def test_large_power_not_folded():
+    _, statements = optimize('fun main do x: int; x = 2 ** 5000 end')
+    assert isinstance(statements[-1].right, BinOpNode)
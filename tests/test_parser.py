@@ -0,0 +1,139 @@
+import os
+import sys
+
+import pytest
+
+from interpreter.analyser import LONGEST_CHAIN, Analyser
+from interpreter.incremental import IncrementalProgram
+from interpreter.lexer import Lexer
+from interpreter.ast import serializer
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from interpreter.cache import PICKLE_RECURSION_LIMIT, ProgramCache
+
+from support import ENGINES, analyse, depth, run, run_flat
+
+
+def program(expr, var_type='int'):
+    return f'fun main do x: {var_type}; x = {expr} end'
+
+
+def value(expr, var_type='int'):
+    return run(program(expr, var_type))['x']
+
+
+def expression(source):
+    # the right side of the assignment in main
+    return analyse(source).init_block.statements[-1].right
+
+
+@pytest.mark.parametrize('expr, expected', [
+    ('10 - 2 + 3', 11),
+    ('10 - 2 - 3', 5),
+    ('1 + 2 - 3 + 4', 4),
+    ('2 * 3 % 4', 2),
+    ('12 // 2 * 3', 18),
+    ('2 ** 3 ** 2', 512),
+    ('-2 ** 2', 4),
+    ('1 + 2 * 3 + 4', 11),
+])
+def test_grouping(expr, expected):
+    assert value(expr) == expected
+
+
+def test_short_runs_keep_left_to_right_rounding():
+    terms = ['0.1'] * LONGEST_CHAIN
+    expected = 0.0
+    for _ in terms:
+        expected += 0.1
+    assert value(' + '.join(terms), 'float') == expected
+
+
+def test_short_run_is_left_leaning():
+    node = expression(program(' + '.join(['1'] * LONGEST_CHAIN)))
+    assert depth(node) == LONGEST_CHAIN
+
+
+def test_long_run_is_balanced():
+    count = 100000
+    source = program(' + '.join(['1'] * count))
+    node = expression(source)
+    assert depth(node) <= 20
+    assert run(source)['x'] == count
+
+
+def test_long_string_run():
+    parts = [f"'{i % 10}'" for i in range(100)]
+    expected = ''.join(str(i % 10) for i in range(100))
+    assert value(' + '.join(parts), 'string') == expected
+
+
+def test_long_run_stops_at_other_operator():
+    expr = ' + '.join(['1'] * 100) + ' - 50 + ' + ' + '.join(['2'] * 100)
+    assert value(expr) == 250
+
+
+@pytest.mark.parametrize('expr, expected', [
+    (' + '.join(['1'] * 300), 300),
+    (' - '.join(['1'] * 300), -298),
+    ('-' * 300 + '1', 1),
+    ('-' * 301 + '1', -1),
+    ('(' * 300 + '1' + ' + 1)' * 300, 301),
+    ('1' + ' + 2 - 1' * 300, 301),
+])
+@pytest.mark.parametrize('engine', ENGINES)
+def test_deep_expressions(engine, expr, expected):
+    assert run(program(expr), engine)['x'] == expected
+
+
+def test_deep_expressions_flat():
+    assert run_flat(program('-' * 300 + '1'))['x'] == 1
+
+
+def test_recursion_limit_fits_nesting():
+    count = 3000
+    tree = Analyser(Lexer(program(' - '.join(['1'] * count)))).parse()
+    assert tree.nesting == count
+    assert sys.getrecursionlimit() > 2 * count
+
+
+def test_incremental_deep_function():
+    count = 3000
+    source = (
+        'fun f(a: int) do return a' + ' - 1' * count + ' end\n'
+        'fun main do x: int; x = f(0) end'
+    )
+    tree = IncrementalProgram().update(source)
+    assert Executor(tree).run().members['x'] == -count
+
+
+def test_serializer_keeps_nesting():
+    count = 3000
+    source = program(' - '.join(['1'] * count))
+    tree = serializer.loads(serializer.dumps(Analyser(Lexer(source)).parse()))
+    assert tree.nesting == count
+    SemanticAnalyser(tree).run()
+    assert Executor(tree).run().members['x'] == 2 - count
+
+
+def test_cache_skips_trees_too_deep_to_pickle(tmp_path):
+    source = program('-' * PICKLE_RECURSION_LIMIT + '1')
+    path = tmp_path / 'deep.ns'
+    path.write_text(source)
+    cache = ProgramCache(str(path))
+    tree = analyse(source)
+    limit = sys.getrecursionlimit()
+    assert not cache.store(source, tree)
+    assert sys.getrecursionlimit() == limit
+    assert not os.path.exists(cache.path)
+
+
+def test_cache_restores_nesting(tmp_path):
+    source = program(' - '.join(['1'] * 200))
+    path = tmp_path / 'a.ns'
+    path.write_text(source)
+    cache = ProgramCache(str(path))
+    assert cache.store(source, analyse(source))
+    tree = cache.load(source)
+    assert tree.nesting == 200
+    assert Executor(tree).run().members['x'] == -198
@@ -0,0 +1,55 @@
+import itertools
+import pstats
+
+from interpreter.ast.profiler import ProfilingExecutor
+from support import analyse
+
+SOURCE = (
+    'fun down(n: int) do if n > 0 do down(n - 1) end end '
+    'fun twice do down(2); down(1) end '
+    'fun main do twice() end'
+)
+
+
+def profile(source):
+    # every reading of the clock is one tick later
+    ticks = itertools.count()
+    profiler = ProfilingExecutor(analyse(source), timer=lambda: float(next(ticks)), memo_size=0)
+    profiler.run()
+    return profiler
+
+
+def test_call_counts():
+    profiler = profile(SOURCE)
+    counts = {
+        name: (stats.calls, stats.primitive_calls)
+        for name, stats in profiler.functions.items()
+    }
+    # down(2) recurses twice and down(1) once
+    assert counts == {'main': (1, 1), 'twice': (1, 1), 'down': (5, 2)}
+    assert {edge: stats.calls for edge, stats in profiler.edges.items()} == {
+        ('main', 'twice'): 1, ('twice', 'down'): 2, ('down', 'down'): 3,
+    }
+
+
+def test_times_add_up():
+    profiler = profile(SOURCE)
+    main = profiler.functions['main']
+    assert main.inclusive == sum(stats.exclusive for stats in profiler.functions.values())
+    assert main.inclusive >= profiler.functions['twice'].inclusive + main.exclusive
+
+
+def test_report_sorted_by_exclusive():
+    lines = profile(SOURCE).report().splitlines()
+    assert lines[1].endswith('down') and lines[1].split()[0] == '5/2'
+    assert 'caller -> callee' in lines[lines.index('') + 1]
+    assert any(line.endswith('main -> twice') for line in lines)
+
+
+def test_pstats_file(tmp_path):
+    path = tmp_path / 'profile.out'
+    profile(SOURCE).dump_stats(path)
+    stats = pstats.Stats(str(path))
+    entries = {name: entry for (_, _, name), entry in stats.stats.items()}
+    assert entries['down'][:2] == (2, 5)
+    assert {caller[2] for caller in entries['down'][4]} == {'twice', 'down'}
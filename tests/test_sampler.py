@@ -0,0 +1,56 @@
+import threading
+from types import SimpleNamespace
+
+from interpreter.stack import CallStack
+from interpreter.sampler import Sampler
+from interpreter.ast.executor import Executor
+from benchmarks.workload import BASE, generate
+from support import analyse
+
+
+def stack_of(*names):
+    call_stack = CallStack()
+    for name in names:
+        call_stack.push(SimpleNamespace(name=name))
+    return call_stack
+
+
+def visit_BinOpNode(sampler):
+    sampler.sample()
+
+
+def sampler_here(call_stack):
+    # samples the calling thread without starting the timer thread
+    sampler = Sampler(call_stack)
+    sampler._target = threading.get_ident()
+    return sampler
+
+
+def test_sample_records_names_and_node():
+    sampler = sampler_here(stack_of('main', 'f'))
+    visit_BinOpNode(sampler)
+    visit_BinOpNode(sampler)
+    sampler.sample()
+    assert sampler.samples == {('main', 'f', 'BinOpNode'): 2, ('main', 'f'): 1}
+
+
+def test_empty_stack_not_sampled():
+    sampler = sampler_here(stack_of())
+    visit_BinOpNode(sampler)
+    assert not sampler.samples
+
+
+def test_collapsed_format():
+    sampler = sampler_here(stack_of('main'))
+    sampler.samples.update({('main', 'f'): 3, ('main',): 1})
+    assert sampler.collapsed() == 'main 1\nmain;f 3\n'
+    assert sampler.report().splitlines()[:2] == ['4 samples every 5 ms', '       3   75.0%  main;f']
+
+
+def test_samples_running_program():
+    tree = analyse(generate(BASE.scaled(functions=6, statements=20)))
+    executor = Executor(tree)
+    with Sampler(executor.call_stack, interval=0.0005) as sampler:
+        executor.run()
+    assert not sampler._thread.is_alive()
+    assert all(stack[0] == 'main' for stack in sampler.samples)
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.analyser import Analyser
+from interpreter.ast import serializer
+from interpreter.ast.serializer import SerializationError
+from interpreter.ast.objects import FactorNode, walk
+from interpreter.ast.optimizer import Optimizer
+from interpreter.ast.symbol import SemanticAnalyser
+from interpreter.ast.executor import Executor
+from test_lexers import sources
+from support import analyse, run
+
+SOURCE = "fun main do x: int; y: float; s: string; x = 1 + 2; y = 1.0; s = 'a' end"
+
+
+def reload(tree):
+    tree = serializer.loads(serializer.dumps(tree))
+    SemanticAnalyser(tree).run()
+    return tree
+
+
+def positions(tree):
+    return [
+        (type(node).__name__, node.token.type, node.token.value, node.token.lineno, node.token.column)
+        for node in walk(tree) if getattr(node, 'token', None) is not None
+    ]
+
+
+# the first source is only lexed, never parsed
+@pytest.mark.parametrize('source', list(sources())[1:])
+@pytest.mark.parametrize('lexer_class', (Lexer, RegexLexer), ids=('char', 'regex'))
+def test_round_trip(source, lexer_class):
+    tree = Analyser(lexer_class(source)).parse()
+    loaded = reload(tree)
+    assert positions(loaded) == positions(tree)
+    assert Executor(loaded).run().members == run(source)
+
+
+def test_optimized_constants_keep_types():
+    tree = analyse('fun main do a: int; b: float; c: int; a = 2 > 1; b = 3 / 1; c = 2 ** 70 end')
+    Optimizer(tree).run()
+    values = [
+        node.value for node in walk(serializer.loads(serializer.dumps(tree)))
+        if isinstance(node, FactorNode)
+    ]
+    assert values == [True, 3.0, 2 ** 70]
+    assert list(map(type, values)) == [bool, float, int]
+
+
+def test_deterministic():
+    tree = Analyser(Lexer(SOURCE)).parse()
+    data = serializer.dumps(tree)
+    assert data.startswith(serializer.MAGIC)
+    assert serializer.dumps(Analyser(Lexer(SOURCE)).parse()) == data
+
+
+def test_file_functions():
+    out = io.BytesIO()
+    serializer.dump(Analyser(Lexer(SOURCE)).parse(), out)
+    tree = serializer.load(io.BytesIO(out.getvalue()))
+    SemanticAnalyser(tree).run()
+    assert Executor(tree).run().members == {'x': 3, 'y': 1.0, 's': 'a'}
+
+
+@pytest.mark.parametrize('mutate, error', [
+    (lambda data: b'NSB\x02' + data[4:], 'Not a serialized program'),
+    (lambda data: data[:-3], 'Corrupt'),
+    (lambda data: data + b'\x00', 'trailing data'),
+    (lambda data: data[:4], 'Corrupt'),
+])
+def test_corrupt_data(mutate, error):
+    data = serializer.dumps(Analyser(Lexer(SOURCE)).parse())
+    with pytest.raises(SerializationError, match=error):
+        serializer.loads(mutate(data))
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import client
+from server import BadRequest, parse_request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAM = os.path.join(ROOT, 'tests', 'programs', 'calls.ns')
+# 2 ** 18 calls with distinct arguments, so memoization does not help
+SLOW = (
+    'fun f(n: int, k: int) do if n > 0 do f(n - 1, 2 * k); f(n - 1, 2 * k + 1) end end '
+    'fun main do f(18, 1) end'
+)
+
+
+@pytest.mark.parametrize('message, error', [
+    ('not json', 'Malformed request'),
+    ('[1]', 'must be a JSON object'),
+    ('{}', 'exactly one of'),
+    ('{"source": "", "path": "a.ns"}', 'exactly one of'),
+    ('{"source": "", "engine": "jit"}', "Unknown engine 'jit'"),
+    ('{"source": "", "lexer": "fast"}', "Unknown lexer 'fast'"),
+    ('{"source": "", "timeout": -1}', 'Invalid timeout -1'),
+    ('{"source": "", "timeout": true}', 'Invalid timeout True'),
+    ('{"source": "", "timeout": "1"}', "Invalid timeout '1'"),
+    ('{"source": "", "timeout": 1e999}', 'Invalid timeout inf'),
+])
+def test_bad_requests(message, error):
+    with pytest.raises(BadRequest, match=error):
+        parse_request(message.encode())
+
+
+def test_request_options():
+    message, options = parse_request(b'{"path": "a.ns", "engine": "vm", "lexer": null, "timeout": 0}')
+    assert message['path'] == 'a.ns'
+    assert (options.engine, options.lexer, options.optimize) == ('vm', 'char', 0)
+
+
+def test_default_socket_path(monkeypatch):
+    monkeypatch.setenv(client.SOCKET_ENV, '/run/ns.sock')
+    assert client.default_socket_path() == '/run/ns.sock'
+    monkeypatch.delenv(client.SOCKET_ENV)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1')
+    assert client.default_socket_path() == '/run/user/1/ns-server.sock'
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('server') / 'ns.sock')
+    process = subprocess.Popen(
+        [sys.executable, 'server.py', '--socket', path, '--workers', '2'], cwd=ROOT,
+    )
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            client.request(path, {'source': 'fun main do end'})
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            assert time.monotonic() < deadline and process.poll() is None
+            time.sleep(0.05)
+    yield path
+    process.terminate()
+    process.wait(10)
+    assert not os.path.exists(path)
+
+
+def test_runs_source_and_path(server):
+    reply = client.request(server, {'source': 'fun main do x: int; x = 6 * 7 end', 'engine': 'closure'})
+    assert reply['ok'] and reply['globals'] == {'x': 42}
+    reply = client.request(server, {'path': PROGRAM, 'no_cache': True, 'stats': True})
+    assert reply['ok'] and reply['path'] == PROGRAM
+    assert 'execute' in reply['stats']['phases']
+
+
+def test_each_request_in_a_new_worker(server):
+    workers = {client.request(server, {'source': 'fun main do end'})['worker'] for _ in range(4)}
+    assert len(workers) == 4
+
+
+def test_errors_replied(server):
+    reply = client.request(server, {'path': os.path.join(ROOT, 'missing.ns')})
+    assert not reply['ok'] and reply['error']['type'] == 'FileNotFoundError'
+    reply = client.request(server, {'source': '', 'timeout': -1})
+    assert reply['error']['type'] == 'BadRequest'
+
+
+def test_timeout(server):
+    start = time.monotonic()
+    reply = client.request(server, {'source': SLOW, 'timeout': 0.2})
+    assert time.monotonic() - start < 3
+    assert reply['error']['type'] == 'TimeLimit'
+
+
+def test_client_script(server):
+    process = subprocess.run(
+        [sys.executable, 'client.py', '--socket', server, '--json', PROGRAM],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert process.returncode == 0
+    assert json.loads(process.stdout)['ok']
@@ -0,0 +1,61 @@
+import pytest
+
+from interpreter.ast.objects import AssignNode, VarNode, walk
+from interpreter.events import CALL_ENTER, EventHooks
+from interpreter.ast.executor import Executor
+from interpreter.stack import ActivationRecord, ARType
+from interpreter.ast.symbol import ScopedSymbolTable, VarSymbol
+from support import analyse
+
+SOURCE = (
+    'fun f(a: int, b: int) do c: int; c = a + b; return c end '
+    'fun main do x: int; y: int; y = 2; x = f(y, 3) end'
+)
+
+
+def scope(*names):
+    table = ScopedSymbolTable('f', 2)
+    for name in names:
+        table.insert(VarSymbol(name, None))
+    return table
+
+
+def test_references_resolved_to_slots():
+    tree = analyse(SOURCE)
+    addresses = {
+        (node.value if isinstance(node, VarNode) else node.left.value, node.depth, node.slot)
+        for node in walk(tree)
+        if isinstance(node, (VarNode, AssignNode)) and node.slot is not None
+    }
+    # parameters take the first slots of their function
+    assert addresses == {('x', 1, 0), ('y', 1, 1), ('a', 2, 0), ('b', 2, 1), ('c', 2, 2)}
+
+
+def test_record_per_call():
+    records = []
+    hooks = EventHooks()
+    hooks.subscribe(CALL_ENTER, lambda ar, call_stack: records.append(ar))
+    tree = analyse(SOURCE)
+    main = Executor(tree, hooks).run()
+    assert main.members == {'x': 5, 'y': 2}
+    call = records[-1]
+    assert call.slots == [2, 3, 5]
+    assert call.get('c') == 5 and call.get('z') is None
+
+
+def test_record_by_name():
+    ar = ActivationRecord('f', ARType.PROCEDURE, 2, scope('a', 'b'))
+    assert ar.slots == [None, None]
+    ar['b'] = 7
+    assert ar['b'] == 7 and ar.slots == [None, 7]
+    with pytest.raises(ValueError):
+        ar['z'] = 1
+    assert not hasattr(ar, '__dict__')
+
+
+def test_inlined_slots_hidden():
+    ar = ActivationRecord('main', ARType.PROGRAM, 1, scope('x', 'f.a'))
+    ar['f.a'] = 1
+    ar['x'] = 2
+    assert ar.members == {'x': 2}
+    assert 'f.a' not in str(ar)
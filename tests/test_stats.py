@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from interpreter.ast.visitor import NodeVisitor
+from interpreter.ast.executor import Executor
+from interpreter.ast.symbol import ScopedSymbolTable
+from interpreter.stack import ActivationRecord
+from interpreter.stats import NO_STATS, Stats
+from support import analyse, run
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = 'fun f(a: int) do return a + 1 end fun main do x: int; x = f(f(1)) end'
+
+
+def test_counts_per_phase():
+    stats = Stats()
+    with stats.instrument():
+        with stats.phase('analyse'):
+            tree = analyse(SOURCE)
+        stats.count_nodes(tree)
+        with stats.phase('execute'):
+            Executor(tree).run()
+    analysed, executed = stats.phases
+    assert analysed.lookups > 0
+    assert analysed.nodes['FunctionCallNode'] == 2
+    # main and two calls of f
+    assert executed.activation_records == 3
+    assert executed.visits['FunctionCallNode'] == 2
+    assert executed.wall >= 0 and executed.peak_memory > 0
+
+
+def test_instrument_restores_classes():
+    visit = NodeVisitor.visit
+    with Stats().instrument():
+        assert NodeVisitor.visit is not visit
+    assert NodeVisitor.visit is visit
+    assert ScopedSymbolTable.lookup.__name__ == 'lookup'
+    assert ActivationRecord.__init__.__name__ == '__init__'
+
+
+def test_nothing_counted_outside_phases():
+    stats = Stats()
+    with stats.instrument():
+        run(SOURCE)
+    assert stats.phases == []
+
+
+def test_report_and_json():
+    stats = Stats()
+    with stats.instrument():
+        with stats.phase('lex'):
+            pass
+        stats.count_tokens(12)
+    assert 'lex: 12 tokens' in stats.report()
+    data = json.loads(stats.json())
+    assert data['phases']['lex']['tokens'] == 12
+    assert 'nodes' not in data['phases']['lex']
+    assert set(data['total']) == {'wall', 'cpu'}
+
+
+def test_no_stats():
+    assert not NO_STATS.enabled
+    with NO_STATS.instrument() as stats, stats.phase('lex'):
+        stats.count_tokens(1)
+    assert NodeVisitor.visit.__name__ == 'visit'
+
+
+def test_stats_json_from_main():
+    output = subprocess.run(
+        [sys.executable, 'main.py', os.path.join('tests', 'programs', 'calls.ns'), '--stats-json', '-', '--no-cache'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    phases = json.loads(output)['phases']
+    assert {'lex', 'parse', 'analyse'} <= set(phases)
+    assert phases['lex']['tokens'] > 0
@@ -0,0 +1,46 @@
+import pytest
+
+from interpreter.tokens_type import TokenType as Tk
+from interpreter.lexer import Lexer
+from interpreter.regex_lexer import RegexLexer
+from interpreter.mmap_lexer import MmapLexer
+from interpreter.token_buffer import TokenBuffer
+from test_lexers import TRICKY, tokens
+
+
+def fields(token):
+    return token.type, token.value, token.lineno, token.column
+
+
+@pytest.mark.parametrize('lexer_class', (Lexer, RegexLexer, MmapLexer))
+def test_stream_replays_lexer(lexer_class):
+    expected = tokens(lexer_class(TRICKY))
+    buffer = TokenBuffer.from_lexer(lexer_class(TRICKY))
+    assert len(buffer) == len(expected)
+    assert [fields(token) for token in tokens(buffer.stream())] == [fields(token) for token in expected]
+
+
+def test_char_lexer_keeps_missing_positions():
+    buffer = TokenBuffer.from_lexer(Lexer("x = 'a'"))
+    assert buffer.offsets is None
+    token = buffer.token(2)
+    assert token.type == Tk.STRING and token.lineno is None
+
+
+def test_stream_stays_on_eof():
+    stream = TokenBuffer.from_lexer(RegexLexer('a')).stream()
+    assert stream.peek_token(5).type == Tk.EOF
+    assert stream.next_token().type == Tk.EOF
+    assert stream.next_token().type == Tk.EOF
+    assert stream.index == 1
+
+
+def test_mark_and_reset():
+    stream = TokenBuffer.from_lexer(RegexLexer('a = 1 + 2')).stream()
+    mark = stream.mark()
+    stream.next_token()
+    stream.next_token()
+    assert stream.peek_token().type == Tk.PLUS
+    stream.reset(mark)
+    assert stream.current_token.type == Tk.ID
+    assert stream.peek_token(2).type == Tk.INTEGER_VALUE
@@ -0,0 +1,140 @@
+import pytest
+
+from interpreter.exceptions import SemanticError
+from interpreter.ast.symbol import FunctionSymbol
+from support import analyse, run
+
+
+def return_type(source, fun_name):
+    tree = analyse(source)
+    symbol = tree.scope.lookup(fun_name)
+    assert isinstance(symbol, FunctionSymbol)
+    return symbol.return_type
+
+
+def test_recursion_before_the_base_case():
+    source = '''
+    fun fact(n: int) do
+        if n > 1 do return n * fact(n - 1) end;
+        return 1
+    end
+    fun main do
+        x: int;
+        x = fact(5)
+    end
+    '''
+    assert return_type(source, 'fact') == 'INT'
+    assert run(source) == {'x': 120}
+
+
+def test_recursion_after_the_base_case():
+    source = '''
+    fun fib(n: int) do
+        if n < 2 do return n end;
+        return fib(n - 1) + fib(n - 2)
+    end
+    fun main do
+        x: int;
+        x = fib(10)
+    end
+    '''
+    assert run(source) == {'x': 55}
+
+
+def test_recursion_widening_the_return_type():
+    source = '''
+    fun half(n: int) do
+        if n > 0 do return half(n - 1) * 0.5 end;
+        return 1
+    end
+    fun main do
+        x: float;
+        x = half(3)
+    end
+    '''
+    assert return_type(source, 'half') == 'FLOAT'
+    assert run(source) == {'x': 0.125}
+    with pytest.raises(SemanticError):
+        analyse(source.replace('x: float', 'x: int'))
+
+
+def test_recursion_without_a_base_case_has_no_value():
+    source = '''
+    fun loop(n: int) do
+        return loop(n)
+    end
+    fun main do
+        x: int;
+        x = loop(1)
+    end
+    '''
+    with pytest.raises(SemanticError):
+        analyse(source)
+
+
+def test_int_power_with_a_literal_exponent_is_an_int():
+    assert run('fun main do x: int; x = 2 ** 3 ** 2 + (-2) ** 2 end') == {'x': 516}
+
+
+def test_int_power_with_another_exponent_is_a_float():
+    assert run('fun main do x: float; x = 2 ** -1 end') == {'x': 0.5}
+    with pytest.raises(SemanticError):
+        analyse('fun main do x: int; x = 2 ** -1 end')
+    with pytest.raises(SemanticError):
+        analyse('fun main do n: int; x: int; n = 2; x = 2 ** n end')
+
+
+def test_float_power_is_a_float():
+    assert run('fun main do x: float; x = 2.0 ** 2 end') == {'x': 4.0}
+    with pytest.raises(SemanticError):
+        analyse('fun main do x: int; x = 2.0 ** 2 end')
+
+
+def test_non_fits_any_variable():
+    assert run("fun main do x: int; s: string; x = non; s = non end") == {
+        'x': 'NON', 's': 'NON',
+    }
+    with pytest.raises(SemanticError):
+        analyse('fun main do x: int; x = non + 1 end')
+
+
+def test_result_of_a_function_that_may_not_return():
+    source = '''
+    fun f(n: int) do
+        if n > 0 do return 1 end
+    end
+    fun main do
+        x: int;
+        y: int;
+        x = f(1);
+        y = f(0)
+    end
+    '''
+    assert run(source) == {'x': 1, 'y': None}
+
+
+def test_result_of_a_function_that_never_returns_a_value():
+    source = '''
+    fun f(n: int) do
+        n = 1
+    end
+    fun main do
+        x: int;
+        x = f(1) + 1
+    end
+    '''
+    with pytest.raises(SemanticError):
+        analyse(source)
+
+
+@pytest.mark.parametrize('source', [
+    "fun main do x: string; y: string; x = 2 ** 3; y = x + 'a' end",
+    "fun f(n: int) do return n + 1 end fun main do x: string; x = f(1) end",
+    "fun main do x: string; x = 'abc' % 5 end",
+    "fun main do x: int; x = 1 < 2 and 'a' end",
+    "fun f(n: int) do if n > 0 do return 'a' end; return 1 end "
+    "fun main do x: int; x = f(1) end",
+])
+def test_mismatch(source):
+    with pytest.raises(SemanticError):
+        analyse(source)
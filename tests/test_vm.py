@@ -0,0 +1,93 @@
+import sys
+
+import pytest
+
+from interpreter.events import EventHooks, ASSIGN
+from interpreter.ast.executor import Executor
+from interpreter.vm.compiler import BytecodeCompiler, CodeObject
+from interpreter.vm.machine import VirtualMachine
+from interpreter.vm.opcodes import Opcode as Op
+
+from support import analyse, run
+
+
+def ops(code):
+    return [Op(op) for op in code.ops]
+
+
+def test_only_called_functions_are_compiled():
+    program = BytecodeCompiler(analyse('''
+fun unused(a: int) do return a end
+fun used(a: int) do return a + 1 end
+fun main do x: int; x = used(1) end
+''')).compile()
+    assert [code.name for code in program.functions] == ['used']
+
+
+def test_call_statement_drops_its_result():
+    program = BytecodeCompiler(analyse('''
+fun f(a: int) do return a end
+fun main do f(1); f(2) end
+''')).compile()
+    assert ops(program.main) == [
+        Op.LOAD_CONST, Op.CALL, Op.POP_TOP,
+        Op.LOAD_CONST, Op.CALL, Op.POP_TOP,
+        Op.LOAD_CONST, Op.RETURN,
+    ]
+
+
+@pytest.mark.parametrize('expr', ['0 or 5', '3 and 0', '0 and 1 // 0', '2 or 1 // 0', '1 and 2 or 3'])
+def test_short_circuit(expr):
+    source = f'fun main do x: int; x = {expr} end'
+    assert run(source, VirtualMachine) == run(source, Executor)
+
+
+def test_runtime_errors_propagate():
+    source = 'fun main do x: int; y: int; y = 0; x = 1 // y end'
+    with pytest.raises(ZeroDivisionError):
+        run(source, VirtualMachine)
+
+
+def test_call_stack_is_empty_after_run():
+    vm = VirtualMachine(analyse('fun f() do return 1 end\nfun main do x: int; x = f() end'))
+    vm.run()
+    assert vm.call_stack._records == []
+
+
+def test_deep_recursion_does_not_recurse_in_python():
+    source = '''
+fun down(n: int) do
+    if n > 0 do return down(n - 1) end;
+    return 0
+end
+fun main do x: int; x = down(50000) end
+'''
+    tree = analyse(source)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        assert VirtualMachine(tree).run().members == {'x': 0}
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def test_trace_ops_only_with_subscribers():
+    tree = analyse('fun main do x: int; x = 1 end')
+    assert Op.TRACE_ASSIGN not in ops(BytecodeCompiler(tree).compile().main)
+    hooks = EventHooks()
+    hooks.subscribe(ASSIGN, lambda ar, name, value: None)
+    assert Op.TRACE_ASSIGN in ops(BytecodeCompiler(tree, hooks).compile().main)
+
+
+def test_constants_keep_their_type():
+    code = CodeObject('f', 0, 1, None)
+    indexes = [code.add_const(value) for value in (1, 1.0, True, 1)]
+    assert indexes == [0, 1, 2, 0]
+    assert [type(value) for value in code.consts] == [int, float, bool]
+
+
+def test_disassemble_names_operator_functions():
+    program = BytecodeCompiler(analyse('fun main do x: float; x = 1.5 * 2 end')).compile()
+    listing = program.disassemble()
+    assert 'code main()' in listing
+    assert 'BINARY_OP' in listing and 'mul' in listing
@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.workload import BASE, WORKLOADS, Workload, generate
+from benchmarks.suite import STAGES, compare_reports, time_stages
+from interpreter.lexer import Lexer
+from interpreter.ast.executor import Executor
+from support import run
+
+
+def test_deterministic():
+    assert generate(BASE, seed=3) == generate(BASE, seed=3)
+    assert generate(BASE, seed=3) != generate(BASE, seed=4)
+
+
+def test_scaled_changes_one_axis():
+    workload = BASE.scaled(depth=5)
+    assert workload.params() == {**BASE.params(), 'depth': 5}
+    assert BASE.depth == Workload().depth
+
+
+@pytest.mark.parametrize('name', list(WORKLOADS))
+def test_workloads_run(name):
+    # the big axes are scaled down to keep the run short
+    workload = WORKLOADS[name].scaled(functions=3, statements=min(WORKLOADS[name].statements, 10))
+    text = generate(workload)
+    assert text.count('fun work-') == workload.functions
+    assert run(text) == {}
+
+
+def test_literal_size():
+    text = generate(BASE.scaled(functions=1, literal_size=40, depth=0))
+    assert any(len(word.strip('();')) == 40 for word in text.split())
+
+
+def test_time_stages():
+    timings = time_stages(generate(BASE.scaled(functions=2)), Lexer, Executor)
+    assert tuple(timings) == STAGES
+    assert all(elapsed >= 0 for elapsed in timings.values())
+
+
+def report(timings, workload=BASE):
+    return {'workloads': {'base': workload.params()}, 'results': {'base': timings}}
+
+
+def test_compare_flags_regressions(capsys):
+    baseline = report({'lex': 1.0, 'parse': 1.0})
+    assert compare_reports(baseline, report({'lex': 1.05, 'parse': 0.5}), 0.10) == 0
+    assert compare_reports(baseline, report({'lex': 1.2, 'parse': 1.0}), 0.10) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
+
+
+def test_compare_skips_changed_workloads(capsys):
+    baseline = report({'lex': 1.0})
+    current = report({'lex': 9.0}, BASE.scaled(depth=5))
+    assert compare_reports(baseline, current, 0.10) == 0
+    assert 'skipped' in capsys.readouterr().out